@@ -1,27 +1,96 @@
+import math
 from Bio import pairwise2
 from Bio.Seq import Seq
 
 
-def pourcentage_identite(sequence1: str, sequence2: str) -> float:
+def masques(sequence: str) -> dict:
     """
-    Fonction qui crée et initialise une matrice 2D avec l'algorithme de Needleman et Wunsch.
-    Renvoie le %id entre les 2 séquences.
+    Fonction qui calcule, pour chaque caractère d'une séquence, l'entier dont le bit i vaut 1
+    si le caractère est présent à la position i.
+
+    Argument:
+        - sequence (str): La séquence à encoder.
+
+    Return:
+        - (dict): structure caractère:masque.
+    """
+    inverse = sequence[::-1]
+    return {
+        caractere: int(inverse.translate({ord(c): '1' if c == caractere else '0' for c in set(sequence)}), 2)
+        for caractere in set(sequence)
+    }
+
+
+def score_lcs(sequence1: str, sequence2: str, minimum: int = None) -> int:
+    """
+    Fonction de calcul du score d'un alignement global avec les paramètres:
+        - identité: +1
+        - substitution: 0
+        - gap: 0
+    Ce score est la longueur de la plus longue sous-séquence commune (LCS).
+
+    Algorithme bit-parallèle (Allison-Dix, Hyyrö): une colonne de la matrice est codée dans un entier,
+    la mémoire est linéaire et chaque opération traite 64 cellules à la fois.
+    Si un minimum est donné, le calcul s'arrête dès qu'il devient inatteignable.
+
+    Arguments:
+        - sequence1 (str): Première séquence.
+        - sequence2 (str): Deuxième séquence.
+        - minimum (int): Score à atteindre, None pour un calcul complet.
+
+    Return:
+        - (int): Le score, ou un majorant strictement inférieur au minimum en cas d'arrêt anticipé.
+    """
+    m, n = len(sequence1), len(sequence2)
+    if m == 0 or n == 0:
+        return 0
+
+    masque = (1 << m) - 1
+    peq = masques(sequence1)
+    colonne = masque
+
+    for j, caractere in enumerate(sequence2):
+        u = colonne & peq.get(caractere, 0)
+        colonne = ((colonne + u) | (colonne - u)) & masque
+        if minimum is not None and j % 64 == 63:
+            majorant = m - colonne.bit_count() + n - j - 1
+            if majorant < minimum:
+                return majorant
+
+    return m - colonne.bit_count()
+
+
+def pourcentage_identite(sequence1: str, sequence2: str, seuil: float = None) -> float:
+    """
+    Fonction de calcul du %id entre 2 séquences à partir du score de l'alignement global de Needleman et Wunsch.
     Les paramètres sont fixes:
         - identité: +1
         - substitution: 0
         - gap: 0
 
+    Seul le score est calculé (voir score_lcs), aucun alignement n'est construit.
+    Si un seuil est donné, le calcul s'arrête dès que ce seuil ne peut plus être dépassé: la valeur renvoyée
+    est alors un majorant inférieur ou égal au seuil.
+
     Arguments:
         - sequence1 (str): Première séquence à aligner.
         - sequence2 (str): Deuxième séquence à aligner.
+        - seuil (float): %id à dépasser, None pour un calcul exact.
 
     Return:
         - pourc_id (float): Le pourcentage d'identité entre les 2 séquences.
     """
-    alignments = pairwise2.align.globalxx(Seq(sequence1), Seq(sequence2))
-    alignment = alignments[0]
     taille = max(len(sequence1), len(sequence2))
-    id_match = alignment[-3]
+    if taille == 0:
+        return 0.0
+
+    minimum = None
+    if seuil is not None:
+        minimum = math.floor(seuil * taille / 100) + 1
+        if min(len(sequence1), len(sequence2)) < minimum:
+            return min(len(sequence1), len(sequence2)) / taille * 100
+
+    id_match = score_lcs(sequence1, sequence2, minimum)
     pourc_id = (id_match / taille) * 100
     return pourc_id
 
@@ -43,5 +112,28 @@ def sequences(sequence1: str, sequence2: str) -> tuple:
         - (tuple): Les deux séquences alignées.
     """
     sequence1, sequence2 = Seq(sequence1), Seq(sequence2)
-    return pairwise2.align.globalxx(sequence1, sequence2)[0][0], pairwise2.align.globalxx(sequence1, sequence2)[0][1]
+    alignment = pairwise2.align.globalxx(sequence1, sequence2, one_alignment_only=True)[0]
+    return alignment[0], alignment[1]
+
+
+def sequences_ponderees(sequence1: str, sequence2: str, identite: int = 2, substitution: int = -1, gap: int = -2) -> tuple:
+    """
+    Fonction qui aligne deux séquences avec l'algorithme de Needleman et Wunsch en pénalisant substitutions et gaps.
+    Les paramètres par défaut sont ceux de l'alignement triple (voir alignement_triple.alignement_global):
+        - identité: +2
+        - substitution: -1
+        - gap: -2
+
+    Arguments:
+        - sequence1 (str): Première séquence à aligner.
+        - sequence2 (str): Deuxième séquence à aligner.
+        - identite (int): Score d'une identité.
+        - substitution (int): Score d'une substitution.
+        - gap (int): Score d'un gap.
 
+    Return:
+        - (tuple): Les deux séquences alignées.
+    """
+    sequence1, sequence2 = Seq(sequence1), Seq(sequence2)
+    alignment = pairwise2.align.globalms(sequence1, sequence2, identite, substitution, gap, gap, one_alignment_only=True)[0]
+    return alignment[0], alignment[1]
@@ -1,164 +1,221 @@
 import numpy as np
 
 
-def lecture_triple(matrice: np.array, sequence1: str, sequence2: str, sequence3: str, sid: int, ssub: int, sgap: int) -> tuple:
+SID, SSUB, SGAP = 2, -1, -2
+INFINI = -(1 << 30)
+DEPLACEMENTS = {
+    1: (1, 1, 1),
+    2: (1, 1, 0),
+    3: (1, 0, 1),
+    4: (0, 1, 1),
+    5: (1, 0, 0),
+    6: (0, 1, 0),
+    7: (0, 0, 1),
+}
+
+
+def encodage(sequence: str) -> np.ndarray:
     """
-    Fonction qui permet la lecture de la  matrice 3D avec l'algorithme de Needleman et Wunsch.
+    Fonction qui encode une séquence en tableau d'octets précédé d'une sentinelle.
+    La case i contient ainsi le caractère i-1, ce qui évite les décalages d'indices dans la matrice.
+
+    Argument:
+        - sequence (str): La séquence à encoder.
+
+    Return:
+        - (np.ndarray): La séquence encodée (uint8).
+    """
+    return np.frombuffer(b"\0" + sequence.encode('ascii'), np.uint8)
+
+
+def remplissage(sequence1: str, sequence2: str, sequence3: str, directions: np.ndarray = None,
+                couche: bool = False) -> tuple:
+    """
+    Fonction qui remplit la matrice 3D de Needleman et Wunsch plan anti-diagonal par plan anti-diagonal.
+    Toutes les cellules du plan i+j+k = d ne dépendent que des plans d-1, d-2 et d-3:
+    chaque plan est calculé en une seule fois par NumPy et seuls 4 plans sont gardés en mémoire.
+
+    Voisins de la cellule (i, j, k):
+        - (i-1, j-1, k-1): identité ou substitution des 3 nucléotides.
+        - (i-1, j-1, k), (i-1, j, k-1), (i, j-1, k-1): un gap.
+        - (i-1, j, k), (i, j-1, k), (i, j, k-1): deux gaps.
+
+    Arguments:
+        - sequence1 (str): Première séquence à aligner.
+        - sequence2 (str): Deuxième séquence à aligner.
+        - sequence3 (str): Troisième séquence à aligner.
+        - directions (np.ndarray): Cube int8 (n1+1, n2+1, n3+1) recevant le voisin choisi (1 à 7), ou None.
+        - couche (bool): Si vrai, renvoie aussi les scores de la dernière couche i = n1.
+
+    Return:
+        - (tuple): Le score optimal et la dernière couche (n2+1, n3+1) ou None.
+    """
+    n1, n2, n3 = len(sequence1), len(sequence2), len(sequence3)
+    a, b, c = encodage(sequence1), encodage(sequence2), encodage(sequence3)
+
+    plans = [np.full((n1 + 2, n2 + 2), INFINI, np.int32) for _ in range(4)]
+    boites = [None] * 4
+    derniere = np.full((n2 + 1, n3 + 1), INFINI, np.int32) if couche else None
+
+    plans[0][1, 1] = 0
+    boites[0] = (0, 0, 0, 0)
+    if couche and n1 == 0:
+        derniere[0, 0] = 0
+
+    for d in range(1, n1 + n2 + n3 + 1):
+        ideb, ifin = max(0, d - n2 - n3), min(n1, d)
+        jdeb, jfin = max(0, d - n1 - n3), min(n2, d)
+
+        plan = plans[d % 4]
+        if boites[d % 4] is not None:
+            pi, pf, pj, pk = boites[d % 4]
+            plan[pi + 1:pf + 2, pj + 1:pk + 2] = INFINI
+        boites[d % 4] = (ideb, ifin, jdeb, jfin)
+        p1, p2, p3 = plans[(d - 1) % 4], plans[(d - 2) % 4], plans[(d - 3) % 4]
+
+        i = np.arange(ideb, ifin + 1)[:, None]
+        j = np.arange(jdeb, jfin + 1)[None, :]
+        k = d - i - j
+        valide = (k >= 0) & (k <= n3)
+
+        ca, cb, cc = a[i], b[j], c[np.clip(k, 0, n3)]
+        ab, ac, bc = ca == cb, ca == cc, cb == cc
+        identite, substitution = np.int32(SID), np.int32(SSUB)
+
+        lignes, colonnes = slice(ideb + 1, ifin + 2), slice(jdeb + 1, jfin + 2)
+        lignes_p, colonnes_p = slice(ideb, ifin + 1), slice(jdeb, jfin + 1)
+
+        voisins = np.stack([
+            p3[lignes_p, colonnes_p] + np.where(ab & ac, identite, substitution),
+            p2[lignes_p, colonnes_p] + SGAP + np.where(ab, identite, substitution),
+            p2[lignes_p, colonnes] + SGAP + np.where(ac, identite, substitution),
+            p2[lignes, colonnes_p] + SGAP + np.where(bc, identite, substitution),
+            p1[lignes_p, colonnes] + 2 * SGAP,
+            p1[lignes, colonnes_p] + 2 * SGAP,
+            p1[lignes, colonnes] + 2 * SGAP,
+        ])
+        choix = voisins.argmax(axis=0)
+        scores = np.take_along_axis(voisins, choix[None], axis=0)[0]
+        scores[~valide] = INFINI
+        plan[lignes, colonnes] = scores
+
+        if directions is not None:
+            ii, jj = np.nonzero(valide)
+            directions[ii + ideb, jj + jdeb, k[ii, jj]] = choix[ii, jj] + 1
+
+        if couche and ifin == n1:
+            jj = np.nonzero(valide[-1])[0]
+            derniere[jj + jdeb, d - n1 - jj - jdeb] = scores[-1, jj]
+
+    return int(plans[(n1 + n2 + n3) % 4][n1 + 1, n2 + 1]), derniere
+
+
+def lecture_triple(directions: np.ndarray, sequence1: str, sequence2: str, sequence3: str) -> tuple:
+    """
+    Fonction qui permet la lecture de la matrice 3D des directions de Needleman et Wunsch.
     Renvoie les trois séquences alignées.
 
     Arguments:
-        - matrice (np.array) Matrice remplie.
+        - directions (np.ndarray): Cube des voisins choisis, rempli par la fonction remplissage.
         - sequence1 (str): Première séquence à aligner.
         - sequence2 (str): Deuxième séquence à aligner.
         - sequence3 (str): Troisième séquence à aligner.
-        - sid (int): Score d'une identité.
-        - ssub (int): Score d'une substitution.
-        - sgap (int): Score d'un gap.
 
     Return:
         - (tuple): Les trois séquences alignées.
     """
-    align1, align2, align3 = "", "", ""
+    align1, align2, align3 = [], [], []
     i, j, k = len(sequence1), len(sequence2), len(sequence3)
 
     while i > 0 or j > 0 or k > 0:
+        di, dj, dk = DEPLACEMENTS[int(directions[i, j, k])]
+        align1.append(sequence1[i - 1] if di else '-')
+        align2.append(sequence2[j - 1] if dj else '-')
+        align3.append(sequence3[k - 1] if dk else '-')
+        i, j, k = i - di, j - dj, k - dk
+
+    return "".join(reversed(align1)), "".join(reversed(align2)), "".join(reversed(align3))
+
+
+def alignement_complet(sequence1: str, sequence2: str, sequence3: str) -> tuple:
+    """
+    Fonction qui aligne 3 séquences en gardant l'ensemble des directions en mémoire.
+    Seul le voisin choisi est conservé pour chaque cellule (1 octet), les scores ne sont jamais stockés en 3D.
+
+    Arguments:
+        - sequence1 (str): Première séquence à aligner.
+        - sequence2 (str): Deuxième séquence à aligner.
+        - sequence3 (str): Troisième séquence à aligner.
+
+    Return:
+        - (tuple): Les trois séquences alignées.
+    """
+    directions = np.zeros((len(sequence1) + 1, len(sequence2) + 1, len(sequence3) + 1), np.int8)
+    remplissage(sequence1, sequence2, sequence3, directions)
+
+    return lecture_triple(directions, sequence1, sequence2, sequence3)
+
 
-        voisin1 = matrice[i - 1, j - 1, k - 1]
-        voisin1 += sid if sequence1[i - 1] == sequence2[j - 1] == sequence3[k - 1] else ssub
-        voisin2 = matrice[i - 1, j - 1, k] + sgap
-        voisin2 += sid if sequence1[i - 1] == sequence2[j - 1] else ssub
-        voisin3 = matrice[i - 1, j, k - 1] + sgap
-        voisin3 += sid if sequence1[i - 1] == sequence3[k - 1] else ssub
-        voisin4 = matrice[i, j - 1, k - 1] + sgap
-        voisin4 += sid if sequence2[j - 1] == sequence3[k - 1] else ssub
-        voisin5 = matrice[i - 1, j, k] + 2 * sgap
-        voisin6 = matrice[i, j - 1, k] + 2 * sgap
-        voisin7 = matrice[i, j, k - 1] + 2 * sgap
-
-        if i > 0 and j > 0 and k > 0:
-            suivant = max(voisin1, voisin2, voisin3, voisin4, voisin5, voisin6, voisin7)
-
-            if suivant == voisin1:
-                align1, align2, align3 = sequence1[i - 1] + align1, sequence2[j - 1] + align2, sequence3[k - 1] + align3
-                i, j, k = i - 1, j - 1, k - 1
-            elif suivant == voisin2:
-                align1, align2, align3 = sequence1[i - 1] + align1, sequence2[j - 1] + align2, '-' + align3
-                i, j = i - 1, j - 1
-            elif suivant == voisin3:
-                align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, sequence3[k - 1] + align3
-                i, k = i - 1, k - 1
-            elif suivant == voisin4:
-                align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, sequence3[k - 1] + align3
-                j, k = j - 1, k - 1
-            elif suivant == voisin5:
-                align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, '-' + align3
-                i -= 1
-            elif suivant == voisin6:
-                align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, '-' + align3
-                j -= 1
-            else:
-                align1, align2, align3 = '-' + align1, '-' + align2, sequence3[k - 1] + align3
-                k -= 1
-
-        elif i > 0 and k > 0:
-            suivant = max(voisin3, voisin5, voisin7)
-
-            if suivant == voisin3:
-                align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, sequence3[k - 1] + align3
-                i, k = i - 1, k - 1
-            elif suivant == voisin5:
-                align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, '-' + align3
-                i -= 1
-            else:
-                align1, align2, align3 = '-' + align1, '-' + align2, sequence3[k - 1] + align3
-                k -= 1
-
-        elif i > 0 and j > 0:
-            suivant = max(voisin2, voisin5, voisin6)
-
-            if suivant == voisin2:
-                align1, align2, align3 = sequence1[i - 1] + align1, sequence2[j - 1] + align2, '-' + align3
-                i, j = i - 1, j - 1
-            elif suivant == voisin5:
-                align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, '-' + align3
-                i -= 1
-            elif suivant == voisin6:
-                align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, '-' + align3
-                j -= 1
-
-        elif j > 0 and k > 0:
-            suivant = max(voisin4, voisin6, voisin7)
-
-            if suivant == voisin4:
-                align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, sequence3[k - 1] + align3
-                j, k = j - 1, k - 1
-            elif suivant == voisin6:
-                align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, '-' + align3
-                j -= 1
-            else:
-                align1, align2, align3 = '-' + align1, '-' + align2, sequence3[k - 1] + align3
-                k -= 1
-
-        elif i > 0:
-            align1, align2, align3 = sequence1[i - 1] + align1, '-' + align2, '-' + align3
-            i -= 1
-
-        elif j > 0:
-            align1, align2, align3 = '-' + align1, sequence2[j - 1] + align2, '-' + align3
-            j -= 1
-
-        elif k > 0:
-            align1, align2, align3 = '-' + align1, '-' + align2, sequence3[k - 1] + align3
-            k -= 1
-
-    return align1, align2, align3
-
-
-def alignement_global(sequence1: str, sequence2: str, sequence3: str) -> tuple:
+def alignement_hirschberg(sequence1: str, sequence2: str, sequence3: str, memoire_max: int = 1 << 28) -> tuple:
     """
-    Fonction qui crée et initialise une matrice 3D avec l'algorithme de Needleman et Wunsch.
-    Réalise ainsi un alignement global de 3 séquences simultanément.
+    Fonction qui aligne 3 séquences en espace réduit (méthode de Hirschberg).
+    La plus longue séquence est coupée en son milieu. Le score du préfixe et celui du suffixe (calculé sur les
+    séquences renversées) sont obtenus pour toute la couche du milieu sans garder les directions.
+    Le meilleur point de passage découpe le problème en deux sous-problèmes indépendants,
+    résolus de la même façon jusqu'à ce que leur cube de directions tienne dans memoire_max octets.
+
+    Arguments:
+        - sequence1 (str): Première séquence à aligner.
+        - sequence2 (str): Deuxième séquence à aligner.
+        - sequence3 (str): Troisième séquence à aligner.
+        - memoire_max (int): Taille maximale (en octets) d'un cube de directions.
+
+    Return:
+        - (tuple): Les trois séquences alignées.
+    """
+    sequences = [sequence1, sequence2, sequence3]
+    taille = np.prod([len(seq) + 1 for seq in sequences], dtype=np.int64)
+    if taille <= memoire_max or max(len(seq) for seq in sequences) <= 1:
+        return alignement_complet(sequence1, sequence2, sequence3)
+
+    ordre = sorted(range(3), key=lambda x: -len(sequences[x]))
+    s1, s2, s3 = (sequences[x] for x in ordre)
+    milieu = len(s1) // 2
+
+    _, prefixe = remplissage(s1[:milieu], s2, s3, couche=True)
+    _, suffixe = remplissage(s1[milieu:][::-1], s2[::-1], s3[::-1], couche=True)
+    j, k = np.unravel_index(np.argmax(prefixe + suffixe[::-1, ::-1]), prefixe.shape)
+
+    gauche = alignement_hirschberg(s1[:milieu], s2[:j], s3[:k], memoire_max)
+    droite = alignement_hirschberg(s1[milieu:], s2[j:], s3[k:], memoire_max)
+    aligne = [g + d for g, d in zip(gauche, droite)]
+
+    resultat = [""] * 3
+    for position, x in enumerate(ordre):
+        resultat[x] = aligne[position]
+
+    return tuple(resultat)
+
+
+def alignement_global(sequence1: str, sequence2: str, sequence3: str, memoire_max: int = 1 << 28) -> tuple:
+    """
+    Fonction qui réalise un alignement global de 3 séquences simultanément avec l'algorithme de Needleman et Wunsch.
     Renvoie les trois séquences alignées.
     Les paramètres sont fixes:
         - identité: +2
         - substitution: -1
         - gap: -2
 
+    La matrice est remplie plan par plan (voir remplissage). Tant que le cube des directions tient dans memoire_max
+    octets il est gardé entièrement, sinon l'alignement passe en espace réduit (voir alignement_hirschberg).
+
     Arguments:
         - sequence1 (str): Première séquence à aligner.
         - sequence2 (str): Deuxième séquence à aligner.
         - sequence3 (str): Troisième séquence à aligner.
+        - memoire_max (int): Taille maximale (en octets) du cube des directions.
 
     Return:
         - (tuple): Les trois séquences alignées.
     """
-    matrice = np.full((len(sequence1)+1, len(sequence2)+1, len(sequence3)+1), 0)
-
-    sid, ssub, sgap = 2, -1, -2
-
-    for i in range(1, len(sequence1)+1):
-        matrice[i, 0, 0] = matrice[i-1, 0, 0] + sgap
-
-    for j in range(1, len(sequence2)+1):
-        matrice[0, j, 0] = matrice[0, j-1, 0] + sgap
-
-    for k in range(1, len(sequence3)+1):
-        matrice[0, 0, k] = matrice[0, 0, k-1] + sgap
-
-    for i in range(1, len(sequence1)+1):
-        for j in range(1, len(sequence2)+1):
-            for k in range(1, len(sequence3)+1):
-                voisin1 = matrice[i-1, j-1, k-1]
-                voisin1 += sid if sequence1[i-1] == sequence2[j-1] == sequence3[k-1] else ssub
-                voisin2 = matrice[i-1, j-1, k] + sgap
-                voisin2 += sid if sequence1[i-1] == sequence2[j-1] else ssub
-                voisin3 = matrice[i-1, j, k-1] + sgap
-                voisin3 += sid if sequence1[i-1] == sequence3[k-1] else ssub
-                voisin4 = matrice[i, j-1, k-1] + sgap
-                voisin4 += sid if sequence2[j-1] == sequence3[k-1] else ssub
-                voisin5 = matrice[i-1, j, k] + 2*sgap
-                voisin6 = matrice[i, j-1, k] + 2*sgap
-                voisin7 = matrice[i, j, k-1] + 2*sgap
-                matrice[i, j, k] = max(voisin1, voisin2, voisin3, voisin4, voisin5, voisin6, voisin7)
-
-    return lecture_triple(matrice, sequence1, sequence2, sequence3, sid, ssub, sgap)
+    return alignement_hirschberg(sequence1, sequence2, sequence3, memoire_max)
@@ -0,0 +1,225 @@
+import urllib.parse
+
+import numpy as np
+
+import fasta
+
+
+COMPLEMENT = bytes.maketrans(b"ACGTRYKMBVDHNacgtrykmbvdhn", b"TGCAYRMKVBHDNtgcayrmkvbhdn")
+memoire = {}
+
+
+def lecture_gff(chemin: str) -> dict:
+    """
+    Fonction qui lit les CDS d'un fichier GFF3 et construit leur index d'intervalles.
+    Une CDS en plusieurs segments (décalage de cadre programmé, jonction) regroupe toutes les lignes de même ID.
+    Les CDS sont rangées par contig puis par position de départ.
+
+    L'index est un dictionnaire:
+        - contigs: identifiants des contigs, dans l'ordre d'apparition.
+        - contig: indice du contig de chaque CDS (np.ndarray).
+        - debut, fin: intervalle [debut, fin[ couvert par chaque CDS, à partir de 0 (np.ndarray).
+        - brin: +1 ou -1 (np.ndarray).
+        - phase: nombre de nucléotides à ignorer au début de la CDS (CDS partielle), dans le sens de lecture.
+        - segments: pour chaque CDS, la liste de ses segments [debut, fin[ dans l'ordre du brin +.
+        - locus_tag, protein_id: identifiants de chaque CDS (None si absent).
+
+    Argument:
+        - chemin (str): Chemin du fichier GFF3.
+
+    Return:
+        - index (dict): L'index des CDS.
+    """
+    contigs, cds = [], {}
+
+    with open(chemin, 'r') as fil:
+        for ligne in fil:
+            if ligne.startswith('##FASTA'):
+                break
+            if ligne.startswith('#') or not ligne.strip():
+                continue
+
+            colonnes = ligne.rstrip('\n').split('\t')
+            if len(colonnes) < 9 or colonnes[2] != 'CDS':
+                continue
+
+            attributs = dict(champ.split('=', 1) for champ in colonnes[8].split(';') if '=' in champ)
+            attributs = {cle: urllib.parse.unquote(valeur) for cle, valeur in attributs.items()}
+            if colonnes[0] not in contigs:
+                contigs.append(colonnes[0])
+            identifiant = (colonnes[0], attributs.get('ID', f"{colonnes[0]}:{colonnes[3]}"))
+
+            if identifiant not in cds:
+                cds[identifiant] = {
+                    'contig': contigs.index(colonnes[0]),
+                    'brin': -1 if colonnes[6] == '-' else 1,
+                    'segments': [],
+                    'phases': {},
+                    'locus_tag': attributs.get('locus_tag'),
+                    'protein_id': attributs.get('protein_id'),
+                }
+            cds[identifiant]['segments'].append((int(colonnes[3]) - 1, int(colonnes[4])))
+            cds[identifiant]['phases'][int(colonnes[3]) - 1] = int(colonnes[7]) if colonnes[7].isdigit() else 0
+
+    elements = list(cds.values())
+    for element in elements:
+        element['segments'].sort()
+    elements.sort(key=lambda element: (element['contig'], element['segments'][0][0]))
+
+    return {
+        'contigs': contigs,
+        'contig': np.array([element['contig'] for element in elements], np.int64),
+        'debut': np.array([element['segments'][0][0] for element in elements], np.int64),
+        'fin': np.array([max(fin for _, fin in element['segments']) for element in elements], np.int64),
+        'brin': np.array([element['brin'] for element in elements], np.int8),
+        'phase': np.array([
+            element['phases'][element['segments'][0 if element['brin'] > 0 else -1][0]] for element in elements
+        ], np.int8),
+        'segments': [element['segments'] for element in elements],
+        'locus_tag': [element['locus_tag'] for element in elements],
+        'protein_id': [element['protein_id'] for element in elements],
+    }
+
+
+def projection_genome(chemin: str) -> dict:
+    """
+    Fonction qui prépare l'accès direct aux contigs d'un fichier FASTA projeté en mémoire (voir fasta.lecture_fasta).
+    Les lignes d'un contig ayant toutes la même longueur (sauf la dernière), la position d'un nucléotide dans le fichier
+    se calcule directement: seule la portion demandée est lue.
+
+    Argument:
+        - chemin (str): Chemin du fichier FASTA.
+
+    Return:
+        - (dict): structure identifiant du contig:(bloc, nucléotides par ligne, octets par ligne).
+    """
+    genome = {}
+    for enregistrement in fasta.lecture_fasta(chemin):
+        bloc = enregistrement['bloc']
+        premiere = bytes(bloc[:4096]).split(b'\n', 1)[0]
+        largeur = len(premiere.rstrip(b'\r'))
+        genome[enregistrement['identifiant']] = (bloc, max(largeur, 1), len(premiere) + 1)
+
+    return genome
+
+
+def tranche(genome: dict, contig: str, debut: int, fin: int) -> str:
+    """
+    Fonction qui lit l'intervalle [debut, fin[ d'un contig sans lire le reste du fichier.
+
+    Arguments:
+        - genome (dict): Le génome projeté en mémoire (voir projection_genome).
+        - contig (str): Identifiant du contig.
+        - debut (int): Première position (à partir de 0).
+        - fin (int): Position suivant la dernière.
+
+    Return:
+        - (str): La séquence de l'intervalle.
+    """
+    bloc, largeur, octets = genome[contig]
+    position1 = (debut // largeur) * octets + debut % largeur
+    position2 = (fin // largeur) * octets + fin % largeur
+
+    return bytes(bloc[position1:position2]).translate(None, b'\r\n').decode()
+
+
+def complement_inverse(sequence: str) -> str:
+    """
+    Fonction qui renvoie le brin complémentaire inverse d'une séquence (codes IUPAC compris).
+
+    Argument:
+        - sequence (str): La séquence.
+
+    Return:
+        - (str): Le complémentaire inverse.
+    """
+    return sequence.encode().translate(COMPLEMENT)[::-1].decode()
+
+
+def ouvrir(strain: str, repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui ouvre l'annotation d'un génome: index des CDS (genomic.gff) et génome projeté en mémoire
+    (genomic.fna). Le GFF n'est lu qu'une fois par processus.
+
+    Arguments:
+        - strain (str): Nom du génome.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): index (voir lecture_gff) et genome (voir projection_genome).
+    """
+    cle = (repertoire, strain)
+    if cle not in memoire:
+        memoire[cle] = {
+            'index': lecture_gff(f"{repertoire}/{strain}/genomic.gff"),
+            'genome': projection_genome(f"{repertoire}/{strain}/genomic.fna"),
+        }
+
+    return memoire[cle]
+
+
+def sequence_cds(annotation: dict, indice: int) -> str:
+    """
+    Fonction qui extrait une CDS du génome: ses segments sont mis bout à bout puis, sur le brin -,
+    remplacés par leur complémentaire inverse. Les nucléotides précédant le premier codon complet
+    (phase d'une CDS partielle) sont retirés.
+
+    Arguments:
+        - annotation (dict): L'annotation du génome (voir ouvrir).
+        - indice (int): Indice de la CDS dans l'index.
+
+    Return:
+        - (str): La CDS, dans le sens de lecture.
+    """
+    index = annotation['index']
+    contig = index['contigs'][index['contig'][indice]]
+    sequence = "".join(tranche(annotation['genome'], contig, debut, fin) for debut, fin in index['segments'][indice])
+
+    if index['brin'][indice] < 0:
+        sequence = complement_inverse(sequence)
+
+    return sequence[index['phase'][indice]:]
+
+
+def chevauchantes(annotation: dict, contig: str, debut: int, fin: int) -> np.ndarray:
+    """
+    Fonction qui renvoie les CDS chevauchant l'intervalle [debut, fin[ d'un contig.
+
+    Arguments:
+        - annotation (dict): L'annotation du génome (voir ouvrir).
+        - contig (str): Identifiant du contig.
+        - debut (int): Première position (à partir de 0).
+        - fin (int): Position suivant la dernière.
+
+    Return:
+        - (np.ndarray): Indices des CDS, par position croissante.
+    """
+    index = annotation['index']
+    if contig not in index['contigs']:
+        return np.empty(0, np.int64)
+
+    numero = index['contigs'].index(contig)
+    gauche, droite = np.searchsorted(index['contig'], [numero, numero + 1])
+    candidates = np.arange(gauche, min(droite, gauche + np.searchsorted(index['debut'][gauche:droite], fin)))
+
+    return candidates[index['fin'][candidates] > debut]
+
+
+def voisins(annotation: dict, indice: int, fenetre: int = 5) -> np.ndarray:
+    """
+    Fonction qui renvoie les CDS voisines d'une CDS: les 'fenetre' précédentes et suivantes sur le même contig.
+
+    Arguments:
+        - annotation (dict): L'annotation du génome (voir ouvrir).
+        - indice (int): Indice de la CDS.
+        - fenetre (int): Nombre de voisines de chaque côté.
+
+    Return:
+        - (np.ndarray): Indices des voisines, par position croissante.
+    """
+    index = annotation['index']
+    numero = index['contig'][indice]
+    gauche, droite = np.searchsorted(index['contig'], [numero, numero + 1])
+    voisines = np.arange(max(gauche, indice - fenetre), min(droite, indice + fenetre + 1))
+
+    return voisines[voisines != indice]
@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import alignement_pair
+import alignement_triple
+import distance
+import extraction
+import fasta
+import phylogenie
+import prefiltre
+
+
+REFERENCE = "Rapports/benchmark_reference.json"
+
+
+def sequence_aleatoire(longueur: int, generateur: random.Random) -> str:
+    """
+    Fonction qui tire une séquence nucléique uniforme.
+
+    Arguments:
+        - longueur (int): Longueur de la séquence.
+        - generateur (random.Random): Générateur pseudo-aléatoire.
+
+    Return:
+        - (str): La séquence.
+    """
+    return "".join(generateur.choices("ACGT", k=longueur))
+
+
+def muter(sequence: str, divergence: float, generateur: random.Random, indels: float = 0.1) -> str:
+    """
+    Fonction qui fait diverger une séquence: chaque position est modifiée avec une probabilité 'divergence',
+    la modification étant une insertion ou une délétion dans une proportion 'indels', une substitution sinon.
+
+    Arguments:
+        - sequence (str): La séquence d'origine.
+        - divergence (float): Proportion de positions modifiées.
+        - generateur (random.Random): Générateur pseudo-aléatoire.
+        - indels (float): Proportion d'insertions et délétions parmi les modifications.
+
+    Return:
+        - (str): La séquence modifiée.
+    """
+    resultat = []
+    for nucleotide in sequence:
+        if generateur.random() >= divergence:
+            resultat.append(nucleotide)
+        elif generateur.random() >= indels:
+            resultat.append(generateur.choice("ACGT".replace(nucleotide, "")))
+        elif generateur.random() < 0.5:
+            resultat.append(nucleotide + generateur.choice("ACGT"))
+
+    return "".join(resultat)
+
+
+def cds_synthetiques(nb_souches: int = 3, nb_cds: int = 200, longueur: int = 900, divergence: float = 0.03,
+                     graine: int = 0) -> dict:
+    """
+    Fonction qui génère des génomes synthétiques: chaque CDS ancestrale est copiée avec divergence dans chaque
+    génome, la longueur de chaque CDS étant tirée autour de la longueur demandée.
+
+    Arguments:
+        - nb_souches (int): Nombre de génomes.
+        - nb_cds (int): Nombre de CDS par génome.
+        - longueur (int): Longueur moyenne des CDS.
+        - divergence (float): Divergence de chaque copie à l'ancêtre.
+        - graine (int): Graine du générateur.
+
+    Return:
+        - (dict): structure Nom du génome:liste des CDS.
+    """
+    generateur = random.Random(graine)
+    ancetres = [sequence_aleatoire(max(30, int(generateur.gauss(longueur, longueur / 3))), generateur) for _ in range(nb_cds)]
+
+    return {f"S{x}": [muter(ancetre, divergence, generateur) for ancetre in ancetres] for x in range(nb_souches)}
+
+
+def alignement_synthetique(nb_souches: int = 10, longueur: int = 100_000, divergence: float = 0.05,
+                           gaps: float = 0.01, graine: int = 0) -> dict:
+    """
+    Fonction qui génère un alignement synthétique: substitutions et gaps indépendants sur une séquence ancestrale.
+
+    Arguments:
+        - nb_souches (int): Nombre de génomes.
+        - longueur (int): Nombre de colonnes.
+        - divergence (float): Proportion de substitutions.
+        - gaps (float): Proportion de gaps.
+        - graine (int): Graine du générateur.
+
+    Return:
+        - (dict): structure Nom du génome:séquence alignée.
+    """
+    generateur = np.random.default_rng(graine)
+    alphabet = np.frombuffer(b"ACGT-", np.uint8)
+    ancetre = generateur.integers(0, 4, longueur)
+
+    alignement = {}
+    for x in range(nb_souches):
+        codes = ancetre.copy()
+        substitutions = generateur.random(longueur) < divergence
+        codes[substitutions] = (codes[substitutions] + generateur.integers(1, 4, substitutions.sum())) % 4
+        codes[generateur.random(longueur) < gaps] = 4
+        alignement[f"S{x}"] = alphabet[codes].tobytes().decode()
+
+    return alignement
+
+
+def matrice_synthetique(taille: int = 300, graine: int = 0) -> np.ndarray:
+    """
+    Fonction qui génère une matrice des distances (points aléatoires du plan, distance euclidienne).
+
+    Arguments:
+        - taille (int): Nombre de taxons.
+        - graine (int): Graine du générateur.
+
+    Return:
+        - (np.ndarray): La matrice.
+    """
+    points = np.random.default_rng(graine).random((taille, 2))
+    return np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+
+
+def caracteres_fichier(alignement: dict) -> tuple:
+    """
+    Fonction qui mesure extraction.caracteres dans un répertoire temporaire (la fonction écrit dans CoreGenome).
+
+    Argument:
+        - alignement (dict): structure Nom du génome:séquence alignée.
+
+    Return:
+        - (tuple): Le résultat de extraction.caracteres.
+    """
+    dossier = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporaire:
+        os.chdir(temporaire)
+        try:
+            os.makedirs("CoreGenome")
+            with open("CoreGenome/core_genome_alignement.txt", 'w') as fil:
+                fil.write("\n".join(f">{nom}\n{sequence}" for nom, sequence in alignement.items()))
+            return extraction.caracteres()
+        finally:
+            os.chdir(dossier)
+
+
+def cas_synthetiques() -> list:
+    """
+    Fonction qui construit les cas mesurés sur données synthétiques.
+    Chaque cas est un tuple (nom, fonction, arguments, unités traitées, nom des unités).
+
+    Argument:
+        - None.
+
+    Return:
+        - (list): Les cas.
+    """
+    generateur = random.Random(0)
+    cds = cds_synthetiques(3, 200, 900, 0.03)
+    s1, s2, s3 = (cds[nom][0][:200] for nom in cds)
+    paire = sequence_aleatoire(3000, generateur)
+    paire = (paire, muter(paire, 0.05, generateur))
+    alignement = alignement_synthetique()
+    sequences = list(alignement.values())
+    matrice = matrice_synthetique()
+    index = prefiltre.index_kmers(cds["S1"])
+
+    return [
+        ("alignement_pair.pourcentage_identite", alignement_pair.pourcentage_identite, paire,
+         len(paire[0]) * len(paire[1]), "cellules"),
+        ("alignement_triple.alignement_global", alignement_triple.alignement_global, (s1, s2, s3),
+         len(s1) * len(s2) * len(s3), "cellules"),
+        ("prefiltre.candidats", lambda: [prefiltre.candidats(sequence, index) for sequence in cds["S0"]], (),
+         len(cds["S0"]), "requetes"),
+        ("distance.matrice_distances[hamming]", distance.matrice_distances, (sequences, 'hamming'),
+         len(sequences) ** 2 * len(sequences[0]), "sites"),
+        ("distance.matrice_distances[jukes_cantor]", distance.matrice_distances, (sequences, 'jukes_cantor'),
+         len(sequences) ** 2 * len(sequences[0]), "sites"),
+        ("distance.matrice_distances[jaccard]", distance.matrice_distances, (sequences, 'jaccard'),
+         len(sequences) ** 2 * len(sequences[0]), "sites"),
+        ("distance.matrice_distances[levenshtein]", distance.matrice_distances, ([s[:5000] for s in sequences], 'levenshtein'),
+         len(sequences) ** 2 * 5000 ** 2, "cellules"),
+        ("extraction.caracteres", caracteres_fichier, (alignement,),
+         len(sequences) * len(sequences[0]), "sites"),
+        ("phylogenie.neighbor_joining", phylogenie.neighbor_joining_matrice, ([f"T{x}" for x in range(len(matrice))], matrice),
+         len(matrice), "taxons"),
+        ("phylogenie.neighbor_joining[rapide]", phylogenie.neighbor_joining_matrice,
+         ([f"T{x}" for x in range(len(matrice))], matrice, True), len(matrice), "taxons"),
+        ("phylogenie.upgma", phylogenie.upgma_matrice, ([f"T{x}" for x in range(len(matrice))], matrice),
+         len(matrice), "taxons"),
+    ]
+
+
+def cas_reels(repertoire: str = 'Donnees', nb_cds: int = 50) -> list:
+    """
+    Fonction qui construit les cas mesurés sur un échantillon des données réelles (premières CDS des génomes).
+    Aucun cas n'est renvoyé si le répertoire ne contient pas au moins 3 génomes.
+
+    Arguments:
+        - repertoire (str): Répertoire des données.
+        - nb_cds (int): Nombre de CDS requêtes.
+
+    Return:
+        - (list): Les cas (voir cas_synthetiques).
+    """
+    if not os.path.isdir(repertoire) or len(fasta.souches(repertoire)) < 3:
+        return []
+
+    g1, g2, g3 = list(extraction.cds(repertoire).values())[:3]
+    requetes = g1[:nb_cds]
+    index = prefiltre.index_kmers(g2)
+    couples = [(requete, g2[j]) for requete in requetes for j in prefiltre.candidats(requete, index)]
+    triplet = (g1[0][:300], g2[0][:300], g3[0][:300])
+
+    return [
+        ("reel.prefiltre.candidats", lambda: [prefiltre.candidats(requete, index) for requete in requetes], (),
+         len(requetes), "requetes"),
+        ("reel.alignement_pair.pourcentage_identite",
+         lambda: [alignement_pair.pourcentage_identite(a, b) for a, b in couples], (),
+         sum(len(a) * len(b) for a, b in couples), "cellules"),
+        ("reel.alignement_triple.alignement_global", alignement_triple.alignement_global, triplet,
+         int(np.prod([len(seq) for seq in triplet], dtype=float)), "cellules"),
+    ]
+
+
+def mesurer(fonction, arguments: tuple, repetitions: int = 3) -> dict:
+    """
+    Fonction qui mesure le temps (meilleur de plusieurs exécutions) et le pic de mémoire d'un appel.
+    La mémoire est mesurée lors d'une exécution séparée (tracemalloc ralentit le calcul).
+
+    Arguments:
+        - fonction (callable): La fonction mesurée.
+        - arguments (tuple): Ses arguments.
+        - repetitions (int): Nombre d'exécutions chronométrées.
+
+    Return:
+        - (dict): secondes et memoire (pic en octets).
+    """
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(*arguments)
+        durees.append(time.perf_counter() - debut)
+
+    tracemalloc.start()
+    try:
+        fonction(*arguments)
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'secondes': min(durees), 'memoire': pic}
+
+
+def comparer(resultats: dict, reference: dict, tolerance: float = 0.25) -> list:
+    """
+    Fonction qui compare les mesures à la référence.
+    Une régression est signalée si le temps ou la mémoire dépasse la référence de plus de 'tolerance'.
+
+    Arguments:
+        - resultats (dict): Mesures courantes, structure nom:mesure.
+        - reference (dict): Mesures de référence.
+        - tolerance (float): Dépassement relatif toléré.
+
+    Return:
+        - (list): Les régressions, sous la forme (nom, grandeur, référence, mesure).
+    """
+    regressions = []
+    for nom, mesure in resultats.items():
+        if nom not in reference:
+            continue
+        for grandeur in ('secondes', 'memoire'):
+            if mesure[grandeur] > reference[nom][grandeur] * (1 + tolerance):
+                regressions.append((nom, grandeur, reference[nom][grandeur], mesure[grandeur]))
+
+    return regressions
+
+
+def executer(reel: bool = True, repetitions: int = 3, reference: str = REFERENCE, enregistrer: bool = False,
+             tolerance: float = 0.25, filtre: str = None) -> list:
+    """
+    Fonction qui mesure tous les cas, affiche le débit et le pic de mémoire de chacun, puis compare à la référence.
+
+    Arguments:
+        - reel (bool): Mesure aussi l'échantillon des données réelles.
+        - repetitions (int): Nombre d'exécutions chronométrées par cas.
+        - reference (str): Fichier JSON des mesures de référence.
+        - enregistrer (bool): Remplace la référence par les mesures courantes.
+        - tolerance (float): Dépassement relatif toléré (voir comparer).
+        - filtre (str): Ne mesure que les cas dont le nom contient ce texte.
+
+    Return:
+        - regressions (list): Les régressions (voir comparer).
+    """
+    cas = cas_synthetiques() + (cas_reels() if reel else [])
+    resultats = {}
+
+    print(f"{'cas':<45} {'secondes':>10} {'débit':>22} {'mémoire (Mo)':>13}")
+    for nom, fonction, arguments, unites, nom_unites in cas:
+        if filtre and filtre not in nom:
+            continue
+        mesure = mesurer(fonction, arguments, repetitions)
+        mesure['debit'] = unites / mesure['secondes'] if mesure['secondes'] else float('inf')
+        resultats[nom] = mesure
+        print(f"{nom:<45} {mesure['secondes']:>10.4f} {mesure['debit']:>12.3g} {nom_unites + '/s':<9} "
+              f"{mesure['memoire'] / 2 ** 20:>13.2f}")
+
+    anciennes = {}
+    if os.path.exists(reference):
+        with open(reference, 'r') as fil:
+            anciennes = json.load(fil)
+
+    regressions = comparer(resultats, anciennes, tolerance)
+    for nom, grandeur, avant, apres in regressions:
+        print(f"REGRESSION {nom} [{grandeur}]: {avant:.4g} -> {apres:.4g}")
+
+    if enregistrer:
+        os.makedirs(os.path.dirname(reference) or '.', exist_ok=True)
+        with open(reference, 'w') as fil:
+            json.dump({**anciennes, **resultats}, fil, indent=1)
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parametres = argparse.ArgumentParser(description="Mesure du temps et de la mémoire des fonctions principales.")
+    parametres.add_argument('--synthetique', action='store_true', help="ne mesure pas les données réelles")
+    parametres.add_argument('--repetitions', type=int, default=3)
+    parametres.add_argument('--reference', default=REFERENCE)
+    parametres.add_argument('--enregistrer', action='store_true', help="enregistre les mesures comme référence")
+    parametres.add_argument('--tolerance', type=float, default=0.25)
+    parametres.add_argument('--filtre', default=None, help="ne mesure que les cas dont le nom contient ce texte")
+    options = parametres.parse_args()
+
+    regressions = executer(not options.synthetique, options.repetitions, options.reference, options.enregistrer,
+                           options.tolerance, options.filtre)
+    raise SystemExit(1 if regressions else 0)
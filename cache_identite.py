@@ -0,0 +1,180 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import alignement_pair
+import mesures
+
+
+configuration = {'taille_max': 1_000_000, 'chemin': None}
+memoire = OrderedDict()
+verrou = threading.Lock()
+connexions = threading.local()
+
+
+def configurer(taille_max: int = 1_000_000, chemin: str = None) -> None:
+    """
+    Fonction qui paramètre le cache des %id et le vide.
+    Une entrée occupe environ 150 octets: 1 000 000 d'entrées représentent environ 150 Mo.
+
+    Si un chemin est donné, les %id sont aussi conservés dans une base SQLite partagée entre threads et processus,
+    ce qui permet de reprendre un calcul interrompu sans refaire les alignements.
+
+    Arguments:
+        - taille_max (int): Nombre maximal d'entrées gardées en mémoire (éviction LRU).
+        - chemin (str): Fichier SQLite de persistance, None pour un cache uniquement en mémoire.
+
+    Return:
+        - None.
+    """
+    with verrou:
+        configuration['taille_max'] = taille_max
+        configuration['chemin'] = chemin
+        memoire.clear()
+
+
+def cle(sequence1: str, sequence2: str) -> bytes:
+    """
+    Fonction qui calcule la clé d'un couple de séquences.
+    Le %id étant symétrique, la clé ne dépend pas de l'ordre des séquences.
+
+    Arguments:
+        - sequence1 (str): Première séquence.
+        - sequence2 (str): Deuxième séquence.
+
+    Return:
+        - (bytes): L'empreinte SHA-1 du couple.
+    """
+    sequence1, sequence2 = sorted((sequence1, sequence2))
+    return hashlib.sha1(f"{sequence1};{sequence2}".encode()).digest()
+
+
+def connexion() -> sqlite3.Connection:
+    """
+    Fonction qui renvoie la connexion SQLite du thread courant, ouverte à la demande.
+    Une nouvelle connexion est ouverte après un fork ou un changement de chemin.
+
+    Argument:
+        - None.
+
+    Return:
+        - (sqlite3.Connection): La connexion, None si la persistance est désactivée.
+    """
+    chemin = configuration['chemin']
+    if chemin is None:
+        return None
+
+    if getattr(connexions, 'ident', None) != (os.getpid(), chemin):
+        base = sqlite3.connect(chemin, timeout=60)
+        base.execute("PRAGMA journal_mode=WAL")
+        base.execute("PRAGMA synchronous=NORMAL")
+        base.execute("CREATE TABLE IF NOT EXISTS identites (cle BLOB PRIMARY KEY, pourcentage REAL)")
+        base.execute("CREATE TABLE IF NOT EXISTS majorants (cle BLOB PRIMARY KEY, pourcentage REAL)")
+        base.commit()
+        connexions.base = base
+        connexions.ident = (os.getpid(), chemin)
+
+    return connexions.base
+
+
+def memoriser(empreinte: bytes, pourc_id: float, exact: bool = True) -> None:
+    """
+    Fonction qui ajoute un %id au cache mémoire en évinçant les entrées les moins récemment utilisées.
+    Un majorant ne remplace jamais un %id exact.
+
+    Arguments:
+        - empreinte (bytes): Clé du couple.
+        - pourc_id (float): Le %id du couple.
+        - exact (bool): False si pourc_id n'est qu'un majorant (alignement interrompu, voir pourcentage_identite).
+
+    Return:
+        - None.
+    """
+    with verrou:
+        if not exact and memoire.get(empreinte, (0.0, False))[1]:
+            return
+        memoire[empreinte] = (pourc_id, exact)
+        memoire.move_to_end(empreinte)
+        while len(memoire) > configuration['taille_max']:
+            memoire.popitem(last=False)
+
+
+def utilisable(valeur: tuple, seuil: float) -> bool:
+    """
+    Fonction qui indique si une valeur du cache répond à la demande: un %id exact répond toujours,
+    un majorant seulement s'il montre déjà que le seuil demandé n'est pas dépassé.
+
+    Arguments:
+        - valeur (tuple): Le %id et s'il est exact (voir memoriser).
+        - seuil (float): %id à dépasser, None pour un %id exact.
+
+    Return:
+        - (bool): True si la valeur peut être renvoyée.
+    """
+    pourc_id, exact = valeur
+    return exact or (seuil is not None and pourc_id <= seuil)
+
+
+def pourcentage_identite(sequence1: str, sequence2: str, seuil: float = None) -> float:
+    """
+    Fonction qui renvoie le %id entre 2 séquences en passant par le cache.
+    Cherche d'abord en mémoire, puis sur disque, et ne réalise l'alignement qu'en dernier recours.
+    Les accès au cache et les alignements sont comptés, et une partie des alignements chronométrée (voir mesures).
+
+    Si un seuil est donné, l'alignement s'arrête dès que ce seuil ne peut plus être dépassé
+    (voir alignement_pair.pourcentage_identite): un résultat inférieur ou égal au seuil n'est alors qu'un majorant.
+    Il est conservé à part, et ne sert qu'aux demandes dont le seuil est au moins aussi grand;
+    les demandes sans seuil obtiennent toujours un %id exact.
+
+    Arguments:
+        - sequence1 (str): Première séquence à aligner.
+        - sequence2 (str): Deuxième séquence à aligner.
+        - seuil (float): %id à dépasser, None pour un %id exact.
+
+    Return:
+        - pourc_id (float): Le pourcentage d'identité entre les 2 séquences, ou un majorant inférieur ou égal au seuil.
+    """
+    empreinte = cle(sequence1, sequence2)
+
+    with verrou:
+        if empreinte in memoire and utilisable(memoire[empreinte], seuil):
+            memoire.move_to_end(empreinte)
+            mesures.compter('cache_memoire')
+            return memoire[empreinte][0]
+
+    base = connexion()
+    if base is not None:
+        ligne = base.execute("SELECT pourcentage FROM identites WHERE cle = ?", (empreinte,)).fetchone()
+        if ligne is not None:
+            memoriser(empreinte, ligne[0])
+            mesures.compter('cache_disque')
+            return ligne[0]
+
+        if seuil is not None:
+            ligne = base.execute("SELECT pourcentage FROM majorants WHERE cle = ?", (empreinte,)).fetchone()
+            if ligne is not None and ligne[0] <= seuil:
+                memoriser(empreinte, ligne[0], False)
+                mesures.compter('cache_disque')
+                return ligne[0]
+
+    mesures.compter('alignements')
+    if mesures.echantillonner():
+        debut = time.perf_counter()
+        pourc_id = alignement_pair.pourcentage_identite(sequence1, sequence2, seuil)
+        mesures.duree(max(len(sequence1), len(sequence2)), time.perf_counter() - debut)
+    else:
+        pourc_id = alignement_pair.pourcentage_identite(sequence1, sequence2, seuil)
+
+    exact = seuil is None or pourc_id > seuil
+    if base is not None:
+        if exact:
+            base.execute("INSERT OR IGNORE INTO identites VALUES (?, ?)", (empreinte, pourc_id))
+        else:
+            base.execute("INSERT OR REPLACE INTO majorants VALUES (?, ?)", (empreinte, pourc_id))
+        base.commit()
+    memoriser(empreinte, pourc_id, exact)
+
+    return pourc_id
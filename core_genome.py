@@ -1,225 +1,925 @@
 import alignement_pair
 import alignement_triple
+import cache_identite
 import extraction
+import hashlib
+import json
+import mesures
+import numpy as np
+import os
+import prefiltre
+import queue
 import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
-def clustering(g1: list, g2: list, g3: list, n1: str, n2: str, n3: str, tppfid: int) -> None:
+etat_worker = {}
+
+
+def filtre_proteique(proteine: str, candidats: np.ndarray, index: dict, proteines: list, seuil: float = 94) -> np.ndarray:
+    """
+    Fonction qui écarte les candidats dont la protéine est trop différente de celle de la requête.
+    Les protéines étant 3 fois plus courtes que les CDS, la recherche (index des kmers de l'alphabet réduit,
+    puis score seul de l'alignement) coûte bien moins que le %id nucléique.
+    Le %id protéique demandé est déduit du %id nucléique (voir prefiltre.seuil_proteique).
+
+    Les CDS sans protéine ne sont pas filtrées.
+
+    Arguments:
+        - proteine (str): Protéine de la requête, ou None.
+        - candidats (np.ndarray): Indices des CDS candidates.
+        - index (dict): Index des kmers des protéines cibles.
+        - proteines (list): Protéines cibles (None si absente).
+        - seuil (float): %id nucléique à dépasser.
+
+    Return:
+        - (np.ndarray): Indices des candidats retenus.
+    """
+    if proteine is None or len(candidats) == 0:
+        return candidats
+
+    seuil_proteines = prefiltre.seuil_proteique(seuil)
+    proches = set(prefiltre.candidats(proteine, index, seuil_proteines).tolist())
+    retenus = [
+        j for j in candidats.tolist()
+        if proteines[j] is None
+        or (j in proches and alignement_pair.pourcentage_identite(proteine, proteines[j], seuil_proteines) > seuil_proteines)
+    ]
+    mesures.compter('couples_ecartes_proteines', len(candidats) - len(retenus))
+
+    return np.array(retenus, np.int64)
+
+
+def index_proteines(proteines: list, k: int = 5) -> dict:
+    """
+    Fonction qui construit l'index des kmers (alphabet réduit) des protéines d'un génome.
+
+    Argument:
+        - proteines (list): Les protéines (None si absente).
+        - k (int): Taille des mers considérés.
+
+    Return:
+        - (dict): L'index inversé (voir prefiltre.index_kmers).
+    """
+    return prefiltre.index_kmers([proteine or "" for proteine in proteines], k, 'proteines')
+
+
+def recherche(i1: int, g1: list, g2: list, g3: list, index2: dict, index3: dict,
+              proteines: list = None, index_proteiques: list = None) -> tuple:
+    """
+    Fonction qui cherche, dans l'ensemble des Génomes 2 et 3, le premier couple de CDS formant avec la CDS i1
+    du Génome 1 un cluster de 3 CDS à plus de 94%id deux à deux.
+    Seuls les couples retenus par le préfiltre (longueurs compatibles et kmers partagés) sont alignés.
+    Les %id passent par le cache partagé: un couple n'est jamais aligné deux fois.
+    Si les protéines sont données, les candidats passent aussi par le filtre protéique (voir filtre_proteique).
+
+    Argument:
+        - i1 (int): indice de la CDS du Génome 1.
+        - g1 (list): contient les CDS du Génome 1.
+        - g2 (list): contient les CDS du Génome 2.
+        - g3 (list): contient les CDS du Génome 3.
+        - index2 (dict): index des kmers du Génome 2.
+        - index3 (dict): index des kmers du Génome 3.
+        - proteines (list): protéines des 3 génomes, dans l'ordre des CDS, ou None.
+        - index_proteiques (list): index des kmers des protéines de chaque génome, ou None.
+
+    Return:
+        - (tuple): le triplet (i1, i2, i3) trouvé, None sinon.
+    """
+    seq1 = g1[i1]
+    candidats2 = prefiltre.candidats(seq1, index2)
+    candidats3 = prefiltre.candidats(seq1, index3)
+    if proteines is not None:
+        candidats2 = filtre_proteique(proteines[0][i1], candidats2, index_proteiques[1], proteines[1])
+        candidats3 = filtre_proteique(proteines[0][i1], candidats3, index_proteiques[2], proteines[2])
+    candidats3 = set(candidats3.tolist())
+    mesures.compter('cds')
+    mesures.compter('couples_hors_fenetre', prefiltre.hors_fenetre(len(seq1), index2))
+    mesures.compter('couples_hors_fenetre', prefiltre.hors_fenetre(len(seq1), index3))
+    mesures.compter('couples_ecartes', len(g2) - len(candidats2) + len(g3) - len(candidats3))
+
+    for i2 in candidats2:
+        seq2 = g2[i2]
+
+        if cache_identite.pourcentage_identite(seq1, seq2, 94) > 94:
+
+            suivants = prefiltre.candidats(seq2, index3)
+            if proteines is not None:
+                suivants = filtre_proteique(proteines[1][i2], suivants, index_proteiques[2], proteines[2])
+
+            for i3 in suivants:
+                if i3 not in candidats3:
+                    continue
+                seq3 = g3[i3]
+
+                if cache_identite.pourcentage_identite(seq1, seq3, 94) > 94 and cache_identite.pourcentage_identite(seq2, seq3, 94) > 94:
+                    mesures.compter('clusters')
+                    return (i1, int(i2), int(i3))
+
+    return None
+
+
+def clustering(g1: list, g2: list, g3: list, index2: dict, index3: dict, debut: int, fin: int,
+               proteines: list = None, index_proteiques: list = None) -> list:
     """
     Fonction qui crée des clusters de 3 protéines si le %id est supérieur à 94%.
     Utilise l'alignement global de Needleman et Wunsch pour déduire un alignement global de score maximum.
     Si Alignement(seq1, seq2) > 94%id et Alignement(seq1, seq3) > 94%id et Alignement(seq2, seq3) > 94%id:
         Alors les 3 protéines sont considérés dans le CoreGenome.
 
-    Les résultats sont disponibles dans le dossier CoreGenome/coregenome_clusters.txt, les cds de gauches appartiennent
-    au Génome 1, celles du milieu au Génome 2 et celles de gauche au Génome 3.
+    Seules les CDS g1[debut:fin] sont traitées, chacune contre l'ensemble des Génomes 2 et 3 (voir recherche).
+    L'avancement est compté en mémoire et publié périodiquement (voir mesures.publier).
 
-    Un fichier texte comprenant le Core Génome du Génome spécifique est aussi créée.
+    Argument:
+        - g1 (list): contient les CDS du Génome 1.
+        - g2 (list): contient les CDS du Génome 2.
+        - g3 (list): contient les CDS du Génome 3.
+        - index2 (dict): index des kmers du Génome 2.
+        - index3 (dict): index des kmers du Génome 3.
+        - debut (int): indice de la première CDS du Génome 1 à traiter.
+        - fin (int): indice suivant la dernière CDS du Génome 1 à traiter.
+        - proteines (list): protéines des 3 génomes, dans l'ordre des CDS, ou None.
+        - index_proteiques (list): index des kmers des protéines de chaque génome, ou None.
+
+    Return:
+        - clusters (list): les triplets (i1, i2, i3) d'indices de CDS trouvés, dans l'ordre de g1.
+    """
+    clusters = []
+
+    for i1 in range(debut, fin):
+        cluster = recherche(i1, g1, g2, g3, index2, index3, proteines, index_proteiques)
+        if cluster is not None:
+            clusters.append(cluster)
+        mesures.publier()
+
+    return clusters
+
+
+def ordre_genomique(positions: list) -> dict:
+    """
+    Fonction qui range les CDS d'un génome dans l'ordre du génome: par contig (dans l'ordre d'apparition),
+    puis par position de départ.
+
+    L'ordre est un dictionnaire:
+        - ordre: indices des CDS dans l'ordre du génome (np.ndarray).
+        - rang: rang de chaque CDS dans cet ordre (np.ndarray).
+        - contig: numéro du contig de chaque CDS (np.ndarray).
 
     Argument:
+        - positions (list): les couples (contig, début) de chaque CDS (voir extraction.positions).
+
+    Return:
+        - (dict): L'ordre des CDS.
+    """
+    numeros = {}
+    contigs = np.array([numeros.setdefault(contig, len(numeros)) for contig, _ in positions], np.int64)
+    debuts = np.array([debut for _, debut in positions], np.int64)
+    ordre = np.lexsort((debuts, contigs))
+
+    rang = np.empty(len(ordre), np.int64)
+    rang[ordre] = np.arange(len(ordre))
+
+    return {'ordre': ordre, 'rang': rang, 'contig': contigs}
+
+
+def voisinage(ordre: dict, indice: int, fenetre: int) -> np.ndarray:
+    """
+    Fonction qui renvoie une CDS et ses voisines à moins de 'fenetre' CDS de distance sur le même contig,
+    des plus proches aux plus éloignées. Les deux sens sont parcourus: un bloc de gènes peut être inversé.
+
+    Arguments:
+        - ordre (dict): L'ordre des CDS du génome (voir ordre_genomique).
+        - indice (int): Indice de la CDS.
+        - fenetre (int): Distance maximale, en nombre de CDS.
+
+    Return:
+        - (np.ndarray): Indices des CDS du voisinage.
+    """
+    decalages = np.repeat(np.arange(1, fenetre + 1), 2) * np.tile([1, -1], fenetre)
+    rangs = ordre['rang'][indice] + np.concatenate([[0], decalages]).astype(np.int64)
+    voisines = ordre['ordre'][rangs[(rangs >= 0) & (rangs < len(ordre['ordre']))]]
+
+    return voisines[ordre['contig'][voisines] == ordre['contig'][indice]]
+
+
+def recherche_locale(i1: int, ancre: tuple, g1: list, g2: list, g3: list, index2: dict, index3: dict,
+                     ordres: list, fenetre: int, proteines: list = None, index_proteiques: list = None) -> tuple:
+    """
+    Fonction qui cherche un cluster pour la CDS i1 du Génome 1 parmi les seules voisines des CDS
+    d'un cluster proche (l'ancre) dans les Génomes 2 et 3. Les génomes conservant l'ordre de leurs gènes
+    sur de longues régions, les orthologues de i1 sont le plus souvent à quelques CDS de ceux de l'ancre.
+    Les candidats passent par le même préfiltre que la recherche globale (voir recherche).
+
+    Argument:
+        - i1 (int): indice de la CDS du Génome 1.
+        - ancre (tuple): le triplet (a1, a2, a3) du dernier cluster trouvé.
         - g1 (list): contient les CDS du Génome 1.
         - g2 (list): contient les CDS du Génome 2.
         - g3 (list): contient les CDS du Génome 3.
-        - n1 (str): nom du Génome 1.
-        - n2 (str): nom du Génome 2.
-        - n3 (str): nom du Génome 3.
-        - tpfid (int): ID du thread petit fils.
+        - index2 (dict): index des kmers du Génome 2.
+        - index3 (dict): index des kmers du Génome 3.
+        - ordres (list): ordre des CDS de chaque génome (voir ordre_genomique).
+        - fenetre (int): Distance maximale à l'ancre, en nombre de CDS.
+        - proteines (list): protéines des 3 génomes, dans l'ordre des CDS, ou None.
+        - index_proteiques (list): index des kmers des protéines de chaque génome, ou None.
 
     Return:
-        - None.
+        - (tuple): le triplet (i1, i2, i3) trouvé, None sinon.
     """
-    cpt1 = 0
-    for seq1 in g1:
-        cpt1 += 1
-        cpt2 = 0
-        for seq2 in g2:
-            cpt2 += 1
-            cpt3 = 0
-            trouver = False
-
-            if alignement_pair.pourcentage_identite(seq1, seq2) > 94:
-
-                for seq3 in g3:
-                    cpt3 += 1
-
-                    with open(f"Rapports/threads_{tppfid}.txt", 'a') as fil:
-                        fil.write(f'{cpt1}/{len(g1)}   {cpt2}/{len(g2)}   {cpt3}/{len(g3)}\n')
-
-                    if alignement_pair.pourcentage_identite(seq1, seq3) > 94 and alignement_pair.pourcentage_identite(seq2, seq3) > 94:
-                        with open(f"CoreGenome/core_genome_{n1}.txt", 'a') as fil:
-                            fil.write(f"{seq1}\n")
-                        with open(f"CoreGenome/core_genome_{n2}.txt", 'a') as fil:
-                            fil.write(f"{seq2}\n")
-                        with open(f"CoreGenome/core_genome_{n3}.txt", 'a') as fil:
-                            fil.write(f"{seq3}\n")
-                        with open("CoreGenome/core_genome_clusters.txt", 'a') as fil:
-                            fil.write(f"{seq1};{seq2};{seq3}\n")
-                        trouver = True
-                        break
-
-                if trouver:
-                    break
+    seq1 = g1[i1]
+    candidats2 = prefiltre.candidats(seq1, index2, parmi=voisinage(ordres[1], ancre[1], fenetre))
+    candidats3 = prefiltre.candidats(seq1, index3, parmi=voisinage(ordres[2], ancre[2], fenetre))
+    if proteines is not None:
+        candidats2 = filtre_proteique(proteines[0][i1], candidats2, index_proteiques[1], proteines[1])
+        candidats3 = filtre_proteique(proteines[0][i1], candidats3, index_proteiques[2], proteines[2])
 
-            else:
-                with open(f"Rapports/threads_{tppfid}.txt", 'a') as fil:
-                    fil.write(f'{cpt1}/{len(g1)}   {cpt2}/{len(g2)}   {cpt3}/{len(g3)}\n')
+    for i2 in candidats2.tolist():
+        if cache_identite.pourcentage_identite(seq1, g2[i2], 94) > 94:
+            for i3 in candidats3.tolist():
+                if cache_identite.pourcentage_identite(seq1, g3[i3], 94) > 94 and cache_identite.pourcentage_identite(g2[i2], g3[i3], 94) > 94:
+                    return (i1, i2, i3)
 
+    return None
 
-def petitpetitfils(g1: list, g2: list, g3: list, n1: str, n2: str, n3: str, tpfid: int) -> None:
+
+def syntenie(g1: list, g2: list, g3: list, index2: dict, index3: dict, ordres: list, debut: int, fin: int,
+             fenetre: int = 10, proteines: list = None, index_proteiques: list = None) -> list:
     """
-    Fonction qui crée des threads petit petit fils pour paralléliser le clustering.
-    Chaque threads prendra une partie des CDS du Génome 1 pour les comparer avec une partie du Génome 2 et une partie
-    du Génome 3.
+    Fonction de clustering guidée par la synténie: les CDS du Génome 1 sont parcourues dans l'ordre du génome,
+    et chacune est d'abord cherchée au voisinage du dernier cluster trouvé (voir recherche_locale).
+    Les clusters s'étendent ainsi de proche en proche à partir de chaque ancre.
+    Seules les CDS restées sans cluster passent par la recherche dans l'ensemble des Génomes 2 et 3
+    (voir recherche), dont le résultat sert d'ancre à la suite.
+
+    Les critères sont ceux de clustering (3 CDS à plus de 94%id deux à deux), mais un orthologue voisin de l'ancre
+    est préféré à un paralogue d'indice plus petit.
 
     Argument:
         - g1 (list): contient les CDS du Génome 1.
         - g2 (list): contient les CDS du Génome 2.
         - g3 (list): contient les CDS du Génome 3.
-        - n1 (str): nom du Génome 1.
-        - n2 (str): nom du Génome 2.
-        - n3 (str): nom du Génome 3.
-        - tfid (int): ID du thread petit fils.
+        - index2 (dict): index des kmers du Génome 2.
+        - index3 (dict): index des kmers du Génome 3.
+        - ordres (list): ordre des CDS de chaque génome (voir ordre_genomique).
+        - debut (int): rang (dans l'ordre du Génome 1) de la première CDS à traiter.
+        - fin (int): rang suivant la dernière CDS à traiter.
+        - fenetre (int): Distance maximale à l'ancre, en nombre de CDS.
+        - proteines (list): protéines des 3 génomes, dans l'ordre des CDS, ou None.
+        - index_proteiques (list): index des kmers des protéines de chaque génome, ou None.
 
     Return:
-        - None.
+        - clusters (list): les triplets (i1, i2, i3) d'indices de CDS trouvés, dans l'ordre du Génome 1.
     """
-    nb_petitpetitfils = 4
+    clusters, ancre = [], None
 
-    sous_tab = len(g3) // nb_petitpetitfils
-    restant = len(g3) % nb_petitpetitfils
+    for i1 in ordres[0]['ordre'][debut:fin].tolist():
+        cluster = None
+        if ancre is not None:
+            cluster = recherche_locale(i1, ancre, g1, g2, g3, index2, index3, ordres, fenetre, proteines, index_proteiques)
+            if cluster is not None:
+                mesures.compter('cds')
+                mesures.compter('clusters')
+                mesures.compter('clusters_synteniques')
 
-    t1 = threading.Thread()
+        if cluster is None:
+            mesures.compter('recherches_globales')
+            cluster = recherche(i1, g1, g2, g3, index2, index3, proteines, index_proteiques)
 
-    cpt = 0
+        if cluster is not None:
+            clusters.append(cluster)
+            ancre = cluster
+        mesures.publier()
 
-    for i in range(0, len(g3), sous_tab):
-        cpt += 1
-        if i == len(g3) - sous_tab - restant:
-            t1 = threading.Thread(target=clustering, args=(g1, g2, g3[i:], n1, n2, n3, tpfid+cpt))
-        else:
-            t1 = threading.Thread(target=clustering, args=(g1, g2, g3[i:i+sous_tab], n1, n2, n3, tpfid+cpt))
-        t1.start()
-    t1.join()
+    return clusters
 
 
-def petitfils(g1: list, g2: list, g3: list, n1: str, n2: str, n3: str, tfid: int) -> None:
+def initialiser_worker(g1: list, g2: list, g3: list, chemin_cache: str, proteines: list = None,
+                       ordres: list = None, fenetre: int = 10) -> None:
     """
-    Fonction qui crée des threads petit fils pour paralléliser le clustering.
-    Chaque threads prendra une partie des CDS du Génome 1 pour les comparer avec une partie du Génome 2 et l'ensemble
-    du Génome 3.
+    Fonction exécutée une fois par processus: garde les CDS et construit les index des kmers.
+    Les tâches n'ont ainsi à transmettre que leurs bornes.
 
     Argument:
         - g1 (list): contient les CDS du Génome 1.
         - g2 (list): contient les CDS du Génome 2.
         - g3 (list): contient les CDS du Génome 3.
-        - n1 (str): nom du Génome 1.
-        - n2 (str): nom du Génome 2.
-        - n3 (str): nom du Génome 3.
-        - tfid (int): ID du thread fils.
+        - chemin_cache (str): Fichier SQLite du cache des %id, None pour un cache en mémoire.
+        - proteines (list): protéines des 3 génomes, None pour ne pas utiliser le filtre protéique.
+        - ordres (list): ordre des CDS de chaque génome pour le clustering guidé par la synténie
+          (voir syntenie), None pour le clustering CDS par CDS.
+        - fenetre (int): Distance maximale à l'ancre, en nombre de CDS.
 
     Return:
         - None.
     """
-    nb_petitfils = 4
+    cache_identite.configurer(chemin=chemin_cache)
+    mesures.configurer()
+    etat_worker.update(g1=g1, g2=g2, g3=g3, index2=prefiltre.index_kmers(g2), index3=prefiltre.index_kmers(g3))
+    etat_worker.update(proteines=proteines, index_proteiques=None, ordres=ordres, fenetre=fenetre)
+    if proteines is not None:
+        etat_worker['index_proteiques'] = [None, index_proteines(proteines[1]), index_proteines(proteines[2])]
 
-    sous_tab = len(g2) // nb_petitfils
-    restant = len(g2) % nb_petitfils
 
-    t1 = threading.Thread()
+def tache(debut: int, fin: int) -> list:
+    """
+    Fonction exécutée par un processus: clustering d'une tranche du Génome 1.
+    En mode synténie, les bornes sont des rangs dans l'ordre du Génome 1 (voir syntenie).
 
-    cpt = 0
+    Argument:
+        - debut (int): indice de la première CDS du Génome 1 à traiter.
+        - fin (int): indice suivant la dernière CDS du Génome 1 à traiter.
 
-    for i in range(0, len(g2), sous_tab):
-        cpt += 1
-        if i == len(g2) - sous_tab - restant:
-            t1 = threading.Thread(target=petitpetitfils, args=(g1, g2[i:], g3, n1, n2, n3, tfid+cpt*10))
-        else:
-            t1 = threading.Thread(target=petitpetitfils, args=(g1, g2[i:i+sous_tab], g3, n1, n2, n3, tfid+cpt*10))
-        t1.start()
-    t1.join()
+    Return:
+        - (list): les triplets (i1, i2, i3) trouvés.
+    """
+    if etat_worker['ordres'] is not None:
+        clusters = syntenie(etat_worker['g1'], etat_worker['g2'], etat_worker['g3'],
+                            etat_worker['index2'], etat_worker['index3'], etat_worker['ordres'], debut, fin,
+                            etat_worker['fenetre'], etat_worker['proteines'], etat_worker['index_proteiques'])
+    else:
+        clusters = clustering(etat_worker['g1'], etat_worker['g2'], etat_worker['g3'],
+                              etat_worker['index2'], etat_worker['index3'], debut, fin,
+                              etat_worker['proteines'], etat_worker['index_proteiques'])
+    mesures.publier(forcer=True)
+
+    return clusters
 
 
-def fils() -> None:
+def decoupage(sequences: list, nb_taches: int) -> list:
     """
-    Fonction qui crée des threads pour paralléliser le clustering.
-    Chaque threads prendra une partie des CDS du Génome 1 pour les comparer avec l'ensemble des Génome 2 et Génome 3.
+    Fonction qui découpe une liste de séquences en tranches contiguës de longueur cumulée équivalente.
+    Le coût d'une CDS étant proportionnel à sa longueur, les tâches sont ainsi équilibrées.
 
     Argument:
+        - sequences (list): les séquences à découper.
+        - nb_taches (int): nombre de tranches souhaité.
+
+    Return:
+        - (list): les bornes (debut, fin) de chaque tranche non vide.
+    """
+    cumul = np.cumsum([len(seq) for seq in sequences])
+    if len(cumul) == 0:
+        return []
+
+    cibles = cumul[-1] * np.arange(1, nb_taches) / nb_taches
+    bornes = [0, *np.searchsorted(cumul, cibles, 'right').tolist(), len(sequences)]
+
+    return [(debut, fin) for debut, fin in zip(bornes[:-1], bornes[1:]) if debut < fin]
+
+
+def ecrire_clusters(noms: list, clusters: list) -> None:
+    """
+    Fonction qui écrit les clusters dans le dossier CoreGenome (les fichiers précédents sont remplacés):
+        - core_genome_clusters.txt: une ligne par cluster, les CDS de chaque génome séparées par ';'.
+        - core_genome_<nom>.txt: les CDS du génome, une par ligne, dans l'ordre des clusters.
+
+    Argument:
+        - noms (list): noms des génomes, dans l'ordre des colonnes.
+        - clusters (list): les clusters, chacun étant la liste des CDS de chaque génome.
+
+    Return:
+        - None.
+    """
+    for x, nom in enumerate(noms):
+        with open(f"CoreGenome/core_genome_{nom}.txt", 'w') as fil:
+            fil.write("".join(f"{cluster[x]}\n" for cluster in clusters))
+    with open("CoreGenome/core_genome_clusters.txt", 'w') as fil:
+        fil.write("".join(f"{';'.join(cluster)}\n" for cluster in clusters))
+
+
+def lire_clusters(chemin: str = "CoreGenome/core_genome_clusters.txt") -> list:
+    """
+    Fonction qui lit les clusters écrits par ecrire_clusters.
+
+    Argument:
+        - chemin (str): Fichier des clusters.
+
+    Return:
+        - (list): les clusters, chacun étant la liste des CDS de chaque génome.
+    """
+    with open(chemin, 'r') as fil:
+        return [ligne.replace('\n', '').split(';') for ligne in fil if ligne.strip()]
+
+
+def vidage(fichiers: list, genomes: list, tampon: list) -> None:
+    """
+    Fonction qui écrit un lot de clusters dans les fichiers de sortie, puis les vide sur disque.
+    Chaque cluster ajoute une ligne à chacun des fichiers: ils restent alignés ligne à ligne.
+
+    Argument:
+        - fichiers (list): fichiers ouverts des CDS de chaque génome, suivis du fichier des clusters.
+        - genomes (list): CDS de chaque génome.
+        - tampon (list): les clusters (indices des CDS de chaque génome) à écrire.
+
+    Return:
         - None.
+    """
+    for x, genome in enumerate(genomes):
+        fichiers[x].write("".join(f"{genome[cluster[x]]}\n" for cluster in tampon))
+    fichiers[-1].write("".join(f"{';'.join(genome[i] for genome, i in zip(genomes, cluster))}\n" for cluster in tampon))
+
+    for fichier in fichiers:
+        fichier.flush()
+
+
+def ecrivain(genomes: list, noms: list, file: queue.Queue, reprise: str = None, taille_tampon: int = 1000,
+             erreurs: list = None) -> None:
+    """
+    Fonction exécutée par le thread d'écriture: seul ce thread écrit les résultats du clustering.
+    Les tâches envoient leurs clusters dans la file sous la forme (tid, clusters, nouveau), None termine l'écriture.
+
+    Les résultats arrivent dans un ordre quelconque: ils sont mis en attente jusqu'à ce que toutes les tâches
+    précédentes soient arrivées, puis écrits par lots de taille_tampon clusters (voir vidage).
+    Le contenu des fichiers suit ainsi l'ordre du Génome 1, quel que soit l'ordonnancement.
+
+    Les résultats nouveaux sont aussi notés dans le fichier de reprise dès leur arrivée.
+
+    Une exception ne ferait qu'arrêter le thread: elle est ajoutée à la liste des erreurs, que le thread principal
+    relance (voir fils), et la file est vidée jusqu'au bout pour ne pas bloquer l'envoi des résultats.
+
+    Argument:
+        - genomes (list): CDS de chaque génome.
+        - noms (list): noms des génomes.
+        - file (queue.Queue): file des résultats.
+        - reprise (str): Fichier JSON Lines des tâches terminées, None pour ne pas en garder.
+        - taille_tampon (int): nombre de clusters écrits à la fois.
+        - erreurs (list): reçoit l'exception qui a interrompu l'écriture.
 
     Return:
         - None.
     """
-    nb_fils = 4
+    fichiers, termine = [], False
+    en_attente, suivant, tampon = {}, 1, []
+
+    try:
+        chemins = [f"CoreGenome/core_genome_{nom}.txt" for nom in noms] + ["CoreGenome/core_genome_clusters.txt"]
+        fichiers = [open(chemin, 'w') for chemin in chemins]
+
+        for tid, clusters, nouveau in iter(file.get, None):
+            if nouveau and reprise is not None:
+                with open(reprise, 'a') as fil:
+                    fil.write(json.dumps({'tache': tid, 'clusters': clusters}) + '\n')
+
+            en_attente[tid] = clusters
+            while suivant in en_attente:
+                tampon.extend(en_attente.pop(suivant))
+                suivant += 1
+
+            if len(tampon) >= taille_tampon:
+                vidage(fichiers, genomes, tampon)
+                tampon = []
+        termine = True
+
+        vidage(fichiers, genomes, tampon)
+    except Exception as erreur:
+        if erreurs is None:
+            raise
+        erreurs.append(erreur)
+        if not termine:
+            for _ in iter(file.get, None):
+                pass
+    finally:
+        for fichier in fichiers:
+            fichier.close()
+
+
+def fils(nb_workers: int = None, chemin_cache: str = None, noms: list = None, reprise: str = None,
+         proteique: bool = False, fenetre: int = None) -> list:
+    """
+    Fonction qui répartit le clustering sur un ensemble de processus.
+    Le Génome 1 est découpé en tranches équilibrées (plusieurs par processus), chacune comparée à l'ensemble
+    des Génomes 2 et 3. Toutes les tâches sont attendues et leurs résultats fusionnés dans l'ordre du Génome 1,
+    le résultat ne dépend donc pas de l'ordonnancement.
+
+    Si une fenêtre est donnée, le Génome 1 est découpé dans l'ordre du génome et chaque tranche est parcourue
+    de proche en proche (voir syntenie): les résultats suivent alors l'ordre du Génome 1 sur ses contigs.
+
+    Si un fichier de reprise est donné, chaque tâche terminée y est notée: après une interruption,
+    seules les tâches manquantes sont relancées.
+
+    Les résultats sont écrits dans le dossier CoreGenome par un unique thread d'écriture (voir ecrivain).
+
+    Argument:
+        - nb_workers (int): nombre de processus, par défaut le nombre de coeurs.
+        - chemin_cache (str): Fichier SQLite conservant les %id déjà calculés, None pour un cache en mémoire.
+        - noms (list): noms des 3 génomes à comparer, par défaut les 3 premiers.
+        - reprise (str): Fichier JSON Lines des tâches terminées, None pour ne pas en garder.
+        - proteique (bool): Filtre aussi les candidats sur leurs protéines (voir filtre_proteique).
+        - fenetre (int): Distance maximale à l'ancre (en nombre de CDS) du clustering guidé par la synténie,
+          None pour le clustering CDS par CDS.
+
+    Return:
+        - clusters (list): les clusters trouvés.
+    """
+    nb_workers = nb_workers or os.cpu_count()
 
     cds = extraction.cds()
 
-    n1, n2, n3 = cds.keys()
-    g1, g2, g3 = cds.values()
+    n1, n2, n3 = noms or list(cds.keys())[:3]
+    g1, g2, g3 = cds[n1], cds[n2], cds[n3]
+    proteines = None
+    if proteique:
+        faa = extraction.proteines()
+        proteines = [faa[n1], faa[n2], faa[n3]]
+    ordres = None
+    if fenetre is not None:
+        positions = extraction.positions()
+        ordres = [ordre_genomique(positions[nom]) for nom in (n1, n2, n3)]
+
+    taches, faits = None, {}
+    if reprise is not None and os.path.exists(reprise):
+        with open(reprise, 'r') as fil:
+            taches = [tuple(bornes) for bornes in json.loads(fil.readline())['taches']]
+            for ligne in fil:
+                if ligne.endswith('\n'):
+                    resultat = json.loads(ligne)
+                    faits[resultat['tache']] = [tuple(cluster) for cluster in resultat['clusters']]
+
+    if taches is None:
+        taches = decoupage(g1 if ordres is None else [g1[i] for i in ordres[0]['ordre']], nb_workers * 8)
+
+    if reprise is not None:
+        # Réécriture sans l'éventuelle ligne tronquée par l'interruption, remplacée d'un coup:
+        # une nouvelle interruption ne peut pas perdre les tâches déjà faites
+        with open(f"{reprise}.{os.getpid()}", 'w') as fil:
+            fil.write(json.dumps({'taches': taches}) + '\n')
+            fil.write("".join(json.dumps({'tache': tid, 'clusters': faits[tid]}) + '\n' for tid in sorted(faits)))
+        os.replace(f"{reprise}.{os.getpid()}", reprise)
+
+    mesures.vider()
+    file, erreurs = queue.Queue(), []
+    ecriture = threading.Thread(target=ecrivain, args=([g1, g2, g3], [n1, n2, n3], file, reprise, 1000, erreurs))
+    ecriture.start()
+    for tid in sorted(faits):
+        file.put((tid, faits[tid], False))
+
+    try:
+        with ProcessPoolExecutor(nb_workers, initializer=initialiser_worker,
+                                 initargs=(g1, g2, g3, chemin_cache, proteines, ordres, fenetre)) as executeur:
+            futures = {
+                executeur.submit(tache, debut, fin): tid
+                for tid, (debut, fin) in enumerate(taches, 1) if tid not in faits
+            }
+            for future in as_completed(futures):
+                faits[futures[future]] = future.result()
+                file.put((futures[future], faits[futures[future]], True))
+                mesures.agreger(progression={'taches': len(faits), 'total': len(taches)})
+    finally:
+        file.put(None)
+        ecriture.join()
+
+    if erreurs:
+        # Fichiers de sortie incomplets: le fichier de reprise est gardé et le manifeste n'est pas mis à jour
+        raise erreurs[0]
+
+    mesures.agreger(progression={'taches': len(faits), 'total': len(taches)})
+    clusters = [[g1[i1], g2[i2], g3[i3]] for tid in sorted(faits) for i1, i2, i3 in faits[tid]]
+
+    return clusters
+
+
+def extension(clusters: list, seuil: float = 94) -> list:
+    """
+    Fonction exécutée par un processus: cherche, pour chaque cluster reçu, une CDS du nouveau génome
+    dépassant le %id demandé avec chacun des membres du cluster. La première CDS trouvée est retenue.
+
+    Argument:
+        - clusters (list): la tranche des clusters existants confiée à ce processus.
+        - seuil (float): %id à dépasser.
+
+    Return:
+        - (list): pour chaque cluster, l'indice de la CDS retenue ou None.
+    """
+    g, index = etat_worker['g'], etat_worker['index']
+    trouves = []
+
+    for cluster in clusters:
+        candidats = set(prefiltre.candidats(cluster[0], index, seuil).tolist())
+        for membre in cluster[1:]:
+            candidats &= set(prefiltre.candidats(membre, index, seuil).tolist())
+
+        trouve = None
+        for indice in sorted(candidats):
+            if all(cache_identite.pourcentage_identite(membre, g[indice], seuil) > seuil for membre in cluster):
+                trouve = indice
+                break
+        trouves.append(trouve)
+        mesures.compter('clusters_etendus' if trouve is not None else 'clusters_perdus')
+        mesures.publier()
 
-    sous_tab = len(g1) // nb_fils
-    restant = len(g1) % nb_fils
+    mesures.publier(forcer=True)
+    return trouves
 
-    t1 = threading.Thread()
 
-    cpt = 0
+def initialiser_extension(g: list, chemin_cache: str) -> None:
+    """
+    Fonction exécutée une fois par processus: garde les CDS du nouveau génome et construit leur index des kmers.
+
+    Argument:
+        - g (list): contient les CDS du nouveau génome.
+        - chemin_cache (str): Fichier SQLite du cache des %id, None pour un cache en mémoire.
+
+    Return:
+        - None.
+    """
+    cache_identite.configurer(chemin=chemin_cache)
+    mesures.configurer()
+    etat_worker.update(g=g, index=prefiltre.index_kmers(g))
 
-    for i in range(0, len(g1), sous_tab):
-        cpt += 1
-        if i == len(g1) - sous_tab - restant:
-            t1 = threading.Thread(target=petitfils, args=(g1[i:], g2, g3, n1, n2, n3, cpt*100))
-        else:
-            t1 = threading.Thread(target=petitfils, args=(g1[i:i + sous_tab], g2, g3, n1, n2, n3, cpt*100))
-        t1.start()
-    t1.join()
+
+def etendre(noms: list, nouveau: str, nb_workers: int = None, chemin_cache: str = None) -> list:
+    """
+    Fonction qui ajoute un génome aux clusters existants sans refaire la comparaison de tous contre tous.
+    Seules les CDS du nouveau génome sont comparées aux clusters. Les clusters sans homologue dans le nouveau
+    génome quittent le CoreGenome.
+
+    Les résultats sont écrits dans le dossier CoreGenome (voir ecrire_clusters).
+
+    Argument:
+        - noms (list): noms des génomes déjà présents dans les clusters, dans l'ordre des colonnes.
+        - nouveau (str): nom du génome à ajouter.
+        - nb_workers (int): nombre de processus, par défaut le nombre de coeurs.
+        - chemin_cache (str): Fichier SQLite conservant les %id déjà calculés, None pour un cache en mémoire.
+
+    Return:
+        - clusters (list): les clusters étendus.
+    """
+    nb_workers = nb_workers or os.cpu_count()
+    g = extraction.cds()[nouveau]
+    clusters = lire_clusters()
+
+    bornes = np.linspace(0, len(clusters), nb_workers * 8 + 1).astype(int)
+    mesures.vider()
+    with ProcessPoolExecutor(nb_workers, initializer=initialiser_extension, initargs=(g, chemin_cache)) as executeur:
+        futures = [executeur.submit(extension, clusters[debut:fin]) for debut, fin in zip(bornes[:-1], bornes[1:])]
+        trouves = [indice for future in futures for indice in future.result()]
+    mesures.agreger(progression={'clusters': len(clusters), 'souche': nouveau})
+
+    clusters = [cluster + [g[indice]] for cluster, indice in zip(clusters, trouves) if indice is not None]
+    ecrire_clusters(noms + [nouveau], clusters)
+
+    return clusters
+
+
+def initialiser_orthologie(genomes: list, chemin_cache: str, proteines: list = None) -> None:
+    """
+    Fonction exécutée une fois par processus: garde les CDS de tous les génomes.
+    Les index des kmers sont construits à la demande (voir aretes).
+
+    Argument:
+        - genomes (list): CDS de chaque génome.
+        - chemin_cache (str): Fichier SQLite du cache des %id, None pour un cache en mémoire.
+        - proteines (list): protéines de chaque génome, None pour ne pas utiliser le filtre protéique.
+
+    Return:
+        - None.
+    """
+    cache_identite.configurer(chemin=chemin_cache)
+    mesures.configurer()
+    etat_worker.update(genomes=genomes, index={}, proteines=proteines, index_proteiques={})
 
 
-def mise_en_forme(n1: str, n2: str, n3: str) -> None:
+def aretes(a: int, b: int, debut: int, fin: int, seuil: float = 94) -> list:
+    """
+    Fonction exécutée par un processus: cherche, pour les CDS debut à fin du génome a, toutes les CDS du génome b
+    dépassant le %id demandé. Seuls les candidats du préfiltre (et du filtre protéique s'il est actif) sont alignés.
+
+    Argument:
+        - a (int): indice du génome requête.
+        - b (int): indice du génome cible.
+        - debut (int): indice de la première CDS du génome a à traiter.
+        - fin (int): indice suivant la dernière CDS du génome a à traiter.
+        - seuil (float): %id à dépasser.
+
+    Return:
+        - (list): les triplets (i, j, %id) des couples retenus.
+    """
+    genomes = etat_worker['genomes']
+    if b not in etat_worker['index']:
+        etat_worker['index'][b] = prefiltre.index_kmers(genomes[b])
+    index = etat_worker['index'][b]
+    proteines = etat_worker['proteines']
+    if proteines is not None and b not in etat_worker['index_proteiques']:
+        etat_worker['index_proteiques'][b] = index_proteines(proteines[b])
+
+    trouves = []
+    for i in range(debut, fin):
+        candidats = prefiltre.candidats(genomes[a][i], index, seuil)
+        if proteines is not None:
+            candidats = filtre_proteique(proteines[a][i], candidats, etat_worker['index_proteiques'][b], proteines[b], seuil)
+        mesures.compter('cds')
+        mesures.compter('couples_hors_fenetre', prefiltre.hors_fenetre(len(genomes[a][i]), index, seuil))
+        mesures.compter('couples_ecartes', len(genomes[b]) - len(candidats))
+
+        for j in candidats.tolist():
+            pourc_id = cache_identite.pourcentage_identite(genomes[a][i], genomes[b][j], seuil)
+            if pourc_id > seuil:
+                trouves.append((i, j, pourc_id))
+        mesures.publier()
+
+    mesures.publier(forcer=True)
+    return trouves
+
+
+def meilleurs_hits(couples: list) -> tuple:
+    """
+    Fonction qui garde, pour chaque CDS de chacun des deux génomes, son meilleur hit dans l'autre.
+    A %id égal, la CDS d'indice le plus petit est retenue: le résultat ne dépend pas de l'ordre des couples.
+
+    Argument:
+        - couples (list): les triplets (i, j, %id) entre les génomes a et b.
+
+    Return:
+        - (tuple): les dictionnaires i:j (de a vers b) et j:i (de b vers a).
+    """
+    meilleurs_ab, meilleurs_ba = {}, {}
+    for i, j, pourc_id in couples:
+        if i not in meilleurs_ab or (-pourc_id, j) < meilleurs_ab[i]:
+            meilleurs_ab[i] = (-pourc_id, j)
+        if j not in meilleurs_ba or (-pourc_id, i) < meilleurs_ba[j]:
+            meilleurs_ba[j] = (-pourc_id, i)
+
+    return {i: j for i, (_, j) in meilleurs_ab.items()}, {j: i for j, (_, i) in meilleurs_ba.items()}
+
+
+def orthologues(nb_workers: int = None, chemin_cache: str = None, noms: list = None, proteique: bool = False) -> list:
+    """
+    Fonction de clustering par meilleurs hits réciproques (RBH), pour un nombre quelconque de génomes.
+
+    Pour chaque paire de génomes (a, b), tous les couples de CDS dépassant 94%id sont recherchés (voir aretes),
+    puis deux CDS sont dites orthologues si chacune est le meilleur hit de l'autre.
+    Un cluster est formé d'une CDS par génome, orthologues deux à deux (clique de meilleurs hits réciproques).
+    Contrairement à fils, le résultat ne dépend pas de l'ordre des CDS.
+
+    Les résultats sont écrits dans le dossier CoreGenome (voir ecrire_clusters).
+
+    Argument:
+        - nb_workers (int): nombre de processus, par défaut le nombre de coeurs.
+        - chemin_cache (str): Fichier SQLite conservant les %id déjà calculés, None pour un cache en mémoire.
+        - noms (list): noms des génomes à comparer, par défaut tous.
+        - proteique (bool): Filtre aussi les candidats sur leurs protéines (voir filtre_proteique).
+
+    Return:
+        - clusters (list): les clusters trouvés, dans l'ordre du premier génome.
+    """
+    nb_workers = nb_workers or os.cpu_count()
+
+    cds = extraction.cds()
+    noms = noms or list(cds.keys())
+    genomes = [cds[nom] for nom in noms]
+    proteines = None
+    if proteique:
+        faa = extraction.proteines()
+        proteines = [faa[nom] for nom in noms]
+    paires = [(a, b) for a in range(len(noms)) for b in range(a + 1, len(noms))]
+
+    mesures.vider()
+    with ProcessPoolExecutor(nb_workers, initializer=initialiser_orthologie, initargs=(genomes, chemin_cache, proteines)) as executeur:
+        futures = {
+            (a, b): [executeur.submit(aretes, a, b, debut, fin) for debut, fin in decoupage(genomes[a], nb_workers * 8)]
+            for a, b in paires
+        }
+        reciproques = {}
+        for a, b in paires:
+            meilleurs_ab, meilleurs_ba = meilleurs_hits([couple for future in futures[(a, b)] for couple in future.result()])
+            reciproques[(a, b)] = {i: j for i, j in meilleurs_ab.items() if meilleurs_ba[j] == i}
+            mesures.agreger(progression={'paires': len(reciproques), 'total': len(paires)})
+
+    clusters = []
+    for i in range(len(genomes[0])):
+        membres = [i] + [reciproques[(0, b)].get(i) for b in range(1, len(noms))]
+        if None in membres:
+            continue
+        if all(reciproques[(a, b)].get(membres[a]) == membres[b] for a, b in paires):
+            clusters.append([genome[x] for genome, x in zip(genomes, membres)])
+
+    ecrire_clusters(noms, clusters)
+
+    return clusters
+
+
+def mise_en_forme(*noms: str) -> None:
     """
     Fonction qui concatène les séquences codantes pour former une séquence continue.
     Bien que l'ordre des CDS soit aléatoire, chaque homologue est positionné au même niveau que les autres.
 
     Argument:
-        - n1 (str): Nom du Génome 1.
-        - n2 (str): Nom du Génome 2.
-        - n3 (str): Nom du Génome 3.
+        - noms (str): Noms des Génomes.
 
     Return:
         - None.
     """
-    with open(f"CoreGenome/core_genome_{n1}.txt", 'r') as fil:
-        seq1 = ""
-        for ligne in fil:
-            seq1 += ligne.replace('\n', '')
+    texte = []
+    for nom in noms:
+        with open(f"CoreGenome/core_genome_{nom}.txt", 'r') as fil:
+            texte.append(f">{nom}\n{fil.read().replace(chr(10), '')}")
 
-    with open(f"CoreGenome/core_genome_{n2}.txt", 'r') as fil:
-        seq2 = ""
-        for ligne in fil:
-            seq2 += ligne.replace('\n', '')
+    with open("CoreGenome/core_genome.txt", 'w') as fil:
+        fil.write("\n".join(texte))
 
-    with open(f"CoreGenome/core_genome_{n3}.txt", 'r') as fil:
-        seq3 = ""
-        for ligne in fil:
-            seq3 += ligne.replace('\n', '')
 
-    with open("CoreGenome/core_genome.txt", 'w') as fil:
-        fil.write(f">{n1}\n{seq1}\n>{n2}\n{seq2}\n>{n3}\n{seq3}")
+def alignement_etoile(sequences: list) -> tuple:
+    """
+    Fonction qui aligne un nombre quelconque de séquences par la méthode de l'étoile.
+    Chaque séquence est alignée à la première (Needleman et Wunsch, mêmes scores que l'alignement triple,
+    voir alignement_pair.sequences_ponderees),
+    puis les alignements sont fusionnés en gardant tous les gaps introduits dans la première.
 
+    Argument:
+        - sequences (list): Les séquences à aligner.
 
-def alignement() -> None:
+    Return:
+        - (tuple): Les séquences alignées.
     """
-    Fonction qui aligne les 3 CG et les sauvegarde dans CoreGenome au format FASTA.
+    lignes = [sequences[0]]
+
+    for sequence in sequences[1:]:
+        centre, aligne = alignement_pair.sequences_ponderees(sequences[0], sequence)
+        fusion = [[] for _ in range(len(lignes) + 1)]
+        i = j = 0
+
+        while i < len(lignes[0]) or j < len(centre):
+            if i < len(lignes[0]) and lignes[0][i] == '-':
+                colonne = [ligne[i] for ligne in lignes] + ['-']
+                i += 1
+            elif j < len(centre) and centre[j] == '-':
+                colonne = ['-'] * len(lignes) + [aligne[j]]
+                j += 1
+            else:
+                colonne = [ligne[i] for ligne in lignes] + [aligne[j]]
+                i, j = i + 1, j + 1
+            for ligne, caractere in zip(fusion, colonne):
+                ligne.append(caractere)
+
+        lignes = ["".join(ligne) for ligne in fusion]
+
+    return tuple(lignes)
+
+
+def alignement_cluster(*sequences: str, dossier: str = "CoreGenome/alignements") -> tuple:
+    """
+    Fonction qui aligne les CDS d'un cluster: alignement triple exact pour 3 génomes (voir alignement_triple),
+    méthode de l'étoile sinon.
+    Le résultat est gardé dans un fichier nommé d'après l'empreinte du cluster: un cluster déjà aligné
+    n'est jamais recalculé.
 
     Argument:
-        - None.
+        - sequences (str): CDS de chaque génome.
+        - dossier (str): Dossier des alignements déjà calculés.
+
+    Return:
+        - (tuple): Les CDS alignées.
+    """
+    chemin = f"{dossier}/{hashlib.sha1(';'.join(sequences).encode()).hexdigest()}.txt"
+
+    if os.path.exists(chemin):
+        with open(chemin, 'r') as fil:
+            return tuple(fil.read().split('\n'))
+
+    if len(sequences) == 3:
+        aligne = alignement_triple.alignement_global(*sequences)
+    else:
+        aligne = alignement_etoile(list(sequences))
+
+    os.makedirs(dossier, exist_ok=True)
+    with open(f"{chemin}.{os.getpid()}", 'w') as fil:
+        fil.write("\n".join(aligne))
+    os.replace(f"{chemin}.{os.getpid()}", chemin)
+
+    return aligne
+
+
+def alignement(mode: str = "clusters", nb_workers: int = None) -> None:
+    """
+    Fonction qui aligne les CG et les sauvegarde dans CoreGenome au format FASTA.
+
+    Deux modes:
+        - clusters: chaque cluster de CoreGenome/core_genome_clusters.txt est aligné séparément, en parallèle,
+          puis les blocs alignés sont concaténés dans l'ordre des clusters.
+        - global: les CG concaténés sont alignés en une seule fois.
+
+    Argument:
+        - mode (str): 'clusters' ou 'global'.
+        - nb_workers (int): nombre de processus du mode clusters, par défaut le nombre de coeurs.
 
     Return:
         - None.
     """
-    n1, n2, n3 = extraction.core_genome().keys()
-    cg1, cg2, cg3 = extraction.core_genome().values()
+    noms = list(extraction.core_genome().keys())
+
+    if mode == "global":
+        sequences = list(extraction.core_genome().values())
+        aligne = alignement_triple.alignement_global(*sequences) if len(sequences) == 3 else alignement_etoile(sequences)
+
+    else:
+        clusters = lire_clusters()
+
+        ordre = sorted(range(len(clusters)), key=lambda c: -np.prod([len(seq) for seq in clusters[c]], dtype=float))
+        with ProcessPoolExecutor(nb_workers or os.cpu_count()) as executeur:
+            futures = {c: executeur.submit(alignement_cluster, *clusters[c]) for c in ordre}
+            blocs = [futures[c].result() for c in range(len(clusters))]
 
-    align1, align2, align3 = alignement_triple.alignement_global(cg1, cg2, cg3)
+        aligne = ["".join(bloc[x] for bloc in blocs) for x in range(len(noms))]
 
     with open('CoreGenome/core_genome_alignement.txt', 'w') as fil:
-        fil.write(f">{n1}\n{align2}\n>{n2}\n{align2}\n>{n3}\n{align3}")
+        fil.write("\n".join(f">{nom}\n{sequence}" for nom, sequence in zip(noms, aligne)))
@@ -1,5 +1,9 @@
+import alignement_pair
+import esquisse
 import math
 import numpy as np
+import triangulaire
+from concurrent.futures import ProcessPoolExecutor
 
 
 def hamming(sequence1: str, sequence2: str) -> int:
@@ -67,21 +71,29 @@ def kmer(k: int, sequence: str) -> set:
     return mer
 
 
-def jaccard(k: int, sequence1: str, sequence2: str) -> float:
+def jaccard(k: int, sequence1: str, sequence2: str, taille_esquisse: int = None) -> float:
     """
     Fonction de calcul de la distance Jaccard entre deux séquences.
     Calcul en premier temps les ensembles de kmer propre à chaques séquences.
     Puis calcul la distance Jaccard grâce à la formule:
-        - (1-|AUB|/|A&B|)
+        - (1-|A&B|/|AUB|)
+
+    Si une taille d'esquisse est donnée, les ensembles sont remplacés par leurs esquisses MinHash
+    (voir esquisse.esquisse) et la distance est estimée.
 
     Argument:
         - k (int): Taille des mers considérés.
         - sequence1 (str): La première séquence.
         - sequence2 (str): La deuxième séquence.
+        - taille_esquisse (int): Nombre de valeurs par esquisse, None pour le calcul exact.
 
     Return:
          - (float): La distance Jaccard entre les deux séquences.
     """
+    if taille_esquisse is not None:
+        return 1 - esquisse.jaccard(esquisse.esquisse([sequence1], k, taille_esquisse),
+                                    esquisse.esquisse([sequence2], k, taille_esquisse))
+
     mer1 = kmer(k, sequence1)
     mer2 = kmer(k, sequence2)
 
@@ -108,30 +120,327 @@ def jukes_cantor(sequence1: str, sequence2: str) -> float:
     return (-3/4)*(math.log(1-(4/3)*p))
 
 
-def levenshtein(sequence1: str, sequence2: str) -> int:
+def levenshtein_masques(peq: dict, m: int, sequence2: str, distance_max: int = None) -> int:
+    """
+    Fonction de calcul de la distance Levenshtein par l'algorithme bit-parallèle de Myers (variante de Hyyrö).
+    Une colonne de la matrice est codée par deux entiers (différences verticales +1 et -1):
+    la mémoire est linéaire et chaque opération traite 64 cellules à la fois.
+
+    Arguments:
+        - peq (dict): Masques de la première séquence (voir alignement_pair.masques).
+        - m (int): Longueur de la première séquence.
+        - sequence2 (str): La deuxième séquence.
+        - distance_max (int): Distance au-delà de laquelle le calcul s'arrête, None pour un calcul complet.
+
+    Return:
+         - (int): La distance, ou distance_max + 1 si elle est dépassée.
+    """
+    n = len(sequence2)
+    if distance_max is not None and abs(m - n) > distance_max:
+        return distance_max + 1
+    if m == 0:
+        return n
+
+    masque = (1 << m) - 1
+    haut = 1 << (m - 1)
+    pv, mv, score = masque, 0, m
+
+    for j, caractere in enumerate(sequence2):
+        eq = peq.get(caractere, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & masque)
+        mh = pv & xh
+
+        if ph & haut:
+            score += 1
+        elif mh & haut:
+            score -= 1
+
+        ph = ((ph << 1) | 1) & masque
+        mh = (mh << 1) & masque
+        pv = mh | (~(xv | ph) & masque)
+        mv = ph & xv
+
+        if distance_max is not None and score - (n - j - 1) > distance_max:
+            return distance_max + 1
+
+    return score
+
+
+def levenshtein(sequence1: str, sequence2: str, distance_max: int = None) -> int:
     """
     Fonction de calcul de la distance Levenshtein entre deux séquences.
+    Voir levenshtein_masques: aucune matrice n'est construite.
 
     Argument:
         - sequence1 (str): La première séquence.
         - sequence2 (str): La deuxième séquence.
+        - distance_max (int): Distance au-delà de laquelle le calcul s'arrête, None pour un calcul complet.
 
     Return:
-         - (int): La distance Levenshtein entre les deux séquences.
+         - (int): La distance Levenshtein entre les deux séquences, ou distance_max + 1 si elle est dépassée.
     """
-    matrice = np.full((len(sequence1)+1, len(sequence2)+1), 0)
+    return levenshtein_masques(alignement_pair.masques(sequence1), len(sequence1), sequence2, distance_max)
 
-    for i in range(1, matrice.shape[0]):
-        matrice[i, 0] = matrice[i-1, 0] + 1
 
-    for i in range(1, matrice.shape[1]):
-        matrice[0, i] = matrice[0, i-1] + 1
+def levenshtein_lot(requete: str, cibles: list, distance_max: int = None) -> np.ndarray:
+    """
+    Fonction de calcul de la distance Levenshtein entre une séquence et un ensemble de séquences.
+    Les masques de la requête ne sont calculés qu'une fois.
+
+    Argument:
+        - requete (str): La séquence requête.
+        - cibles (list): Les séquences cibles.
+        - distance_max (int): Distance au-delà de laquelle le calcul s'arrête, None pour un calcul complet.
+
+    Return:
+         - (np.ndarray): Les distances, plafonnées à distance_max + 1.
+    """
+    peq = alignement_pair.masques(requete)
+    return np.array([levenshtein_masques(peq, len(requete), cible, distance_max) for cible in cibles], np.int64)
+
+
+TABLE_HAMMING = 1 - np.eye(256)
+TABLE_HAMMING_REVISITE = np.full((256, 256), 2.0)
+TABLE_HAMMING_REVISITE[np.ix_(list(b"AG"), list(b"AG"))] = 1
+TABLE_HAMMING_REVISITE[np.ix_(list(b"CT"), list(b"CT"))] = 1
+np.fill_diagonal(TABLE_HAMMING_REVISITE, 0)
+TABLES = {'hamming': TABLE_HAMMING, 'hamming_revisite': TABLE_HAMMING_REVISITE, 'jukes_cantor': TABLE_HAMMING}
+
+
+def encodage_alignement(sequences: list) -> np.ndarray:
+    """
+    Fonction qui encode un ensemble de séquences alignées en une matrice d'octets (séquences x colonnes).
+
+    Argument:
+        - sequences (list): Les séquences alignées, toutes de même longueur.
+
+    Return:
+        - (np.ndarray): La matrice (uint8).
+    """
+    return np.stack([np.frombuffer(sequence.encode('ascii'), np.uint8) for sequence in sequences])
+
+
+def codes_kmers(k: int, sequences: list) -> list:
+    """
+    Fonction de calcul des ensembles de kmers de plusieurs séquences, sous forme de tableaux d'entiers triés.
+    Chaque kmer est codé en base 'taille de l'alphabet', ce qui rend les intersections vectorisables.
+
+    Argument:
+        - k (int): Taille des mers considérés.
+        - sequences (list): Les séquences.
+
+    Return:
+         - (list): Pour chaque séquence, les codes uniques de ses kmers.
+    """
+    alphabet = np.unique(np.frombuffer("".join(sequences).encode('ascii'), np.uint8))
+    table = np.zeros(256, np.int64)
+    table[alphabet] = np.arange(len(alphabet))
+    base = max(len(alphabet), 2)
+
+    if base ** k >= 1 << 63:
+        return [np.unique(np.array([hash(mer) for mer in kmer(k, sequence)], np.int64)) for sequence in sequences]
+
+    ensembles = []
+    for sequence in sequences:
+        codes = table[np.frombuffer(sequence.encode('ascii'), np.uint8)]
+        nb = max(len(codes) - k + 1, 0)
+        mers = np.zeros(nb, np.int64)
+        for i in range(k):
+            mers = mers * base + codes[i:i + nb]
+        ensembles.append(np.unique(mers))
+
+    return ensembles
+
+
+def jukes_cantor_proportions(p: np.ndarray) -> np.ndarray:
+    """
+    Fonction de calcul vectorisé de la distance Jukes-Cantor à partir des proportions de nt différents:
+        - (-3/4)*(ln(1-4/3*p)
+
+    Argument:
+        - p (np.ndarray): Les proportions de nt différents.
+
+    Return:
+         - (np.ndarray): Les distances Jukes-Cantor.
+    """
+    argument = 1-(4/3)*np.asarray(p, float)
+    if (argument <= 0).any():
+        raise ValueError("Distance de Jukes-Cantor indéfinie: au moins 3/4 des sites diffèrent")
+
+    return (-3/4)*np.log(argument)
+
+
+etat_worker = {}
+
+
+def preparer(donnees, metrique: str):
+    """
+    Fonction qui prépare les données du calcul par blocs, une seule fois pour toute la matrice.
+    Pour les distances de type Hamming: la matrice indicatrice I_s de chaque état s (séquences x colonnes),
+    en float32 (les comptes restent exacts jusqu'à 2**24), et la table des coûts W entre ces états.
+
+    Arguments:
+        - donnees: matrice encodée (Hamming), ensembles de kmers (Jaccard) ou séquences (Levenshtein).
+        - metrique (str): Distance utilisée.
+
+    Return:
+        - Le nombre de séquences, les indicatrices et les coûts (Hamming), les données inchangées sinon.
+    """
+    if metrique not in TABLES:
+        return donnees
+
+    alphabet = np.flatnonzero(sum(np.bincount(ligne, minlength=256) for ligne in donnees))
+    couts = TABLES[metrique][np.ix_(alphabet, alphabet)].astype(np.float32)
+    indicatrices = [(donnees == etat).astype(np.float32) for etat in alphabet]
+
+    return len(donnees), indicatrices, couts
+
+
+def bloc_distances(donnees, metrique: str, debut: int, fin: int) -> np.ndarray:
+    """
+    Fonction de calcul des lignes debut à fin de la matrice des distances.
+
+    Pour les distances de type Hamming, avec I_s la matrice indicatrice de l'état s (séquences x colonnes)
+    et W la table des coûts entre états:
+        - D = Somme(W[s, t] * I_s @ I_t.T)
+    ce qui ramène le calcul à quelques produits matriciels. Seules les lignes debut à fin des I_s sont pondérées.
+
+    Arguments:
+        - donnees: données préparées (voir preparer).
+        - metrique (str): 'hamming', 'hamming_revisite', 'jukes_cantor', 'jaccard' ou 'levenshtein'.
+        - debut (int): Première ligne.
+        - fin (int): Ligne suivant la dernière.
+
+    Return:
+         - (np.ndarray): Les lignes de la matrice (float).
+    """
+    if metrique in TABLES:
+        n, indicatrices, couts = donnees
+        bloc = np.zeros((fin - debut, n))
+        for t, indicatrice in enumerate(indicatrices):
+            ponderee = sum(couts[s, t] * indicatrices[s][debut:fin] for s in range(len(indicatrices)) if couts[s, t])
+            if not np.isscalar(ponderee):
+                bloc += ponderee @ indicatrice.T
+        return bloc
+
+    bloc = np.zeros((fin - debut, len(donnees)))
+    if metrique == 'jaccard':
+        for i in range(debut, fin):
+            for j in range(i + 1, len(donnees)):
+                inter = len(np.intersect1d(donnees[i], donnees[j], assume_unique=True))
+                bloc[i - debut, j] = 1 - inter / (len(donnees[i]) + len(donnees[j]) - inter)
+
+    elif metrique == 'levenshtein':
+        for i in range(debut, fin):
+            bloc[i - debut, i + 1:] = levenshtein_lot(donnees[i], donnees[i + 1:])
+
+    else:
+        raise ValueError(f"Métrique inconnue: {metrique}")
+
+    return bloc
 
-    for i in range(1, matrice.shape[0]):
-        for j in range(1, matrice.shape[1]):
-            if sequence1[i-1] == sequence2[j-1]:
-                matrice[i, j] = matrice[i-1, j-1]
-            else:
-                matrice[i, j] = 1 + min(matrice[i-1, j], matrice[i, j-1], matrice[i-1, j-1])
 
-    return matrice[matrice.shape[0]-1, matrice.shape[1]-1]
+def initialiser_distances(donnees) -> None:
+    """
+    Fonction exécutée une fois par processus: garde les données préparées (voir preparer),
+    transmises une seule fois plutôt qu'avec chaque bloc.
+
+    Argument:
+        - donnees: données préparées.
+
+    Return:
+        - None.
+    """
+    etat_worker['donnees'] = donnees
+
+
+def bloc_worker(metrique: str, debut: int, fin: int) -> np.ndarray:
+    """
+    Fonction exécutée par un processus: calcule un bloc à partir des données gardées par initialiser_distances.
+
+    Arguments:
+        - metrique (str): Distance utilisée.
+        - debut (int): Première ligne.
+        - fin (int): Ligne suivant la dernière.
+
+    Return:
+         - (np.ndarray): Les lignes de la matrice (float).
+    """
+    return bloc_distances(etat_worker['donnees'], metrique, debut, fin)
+
+
+def blocs_distances(donnees, metrique: str, taches: list, nb_processus: int = 1):
+    """
+    Générateur des blocs de lignes de la matrice des distances (voir bloc_distances), dans l'ordre des tâches,
+    éventuellement calculés par plusieurs processus.
+    Les données sont préparées une seule fois (voir preparer) et transmises une fois à chaque processus.
+
+    Arguments:
+        - donnees: matrice encodée (Hamming), ensembles de kmers (Jaccard) ou séquences (Levenshtein).
+        - metrique (str): Distance utilisée.
+        - taches (list): Les bornes (debut, fin) de chaque bloc.
+        - nb_processus (int): Nombre de processus.
+
+    Yield:
+        - (np.ndarray): Les lignes de chaque bloc.
+    """
+    donnees = preparer(donnees, metrique)
+    if nb_processus > 1:
+        with ProcessPoolExecutor(nb_processus, initializer=initialiser_distances, initargs=(donnees,)) as executeur:
+            yield from executeur.map(bloc_worker, *zip(*[(metrique, debut, fin) for debut, fin in taches]))
+    else:
+        for debut, fin in taches:
+            yield bloc_distances(donnees, metrique, debut, fin)
+
+
+def matrice_distances(sequences: list, metrique: str, k: int = 5, nb_processus: int = 1, condensee: bool = False,
+                      chemin: str = None) -> np.ndarray:
+    """
+    Fonction de calcul de la matrice des distances entre toutes les paires de séquences.
+    L'alignement est encodé une seule fois, puis la matrice est calculée par blocs de lignes,
+    éventuellement répartis entre plusieurs processus.
+
+    Si la matrice est demandée condensée, le triangle supérieur de chaque bloc est recopié dès son calcul
+    dans une matrice float32 (voir triangulaire): la matrice N x N n'est jamais construite.
+
+    Argument:
+        - sequences (list): Les séquences (alignées pour les distances de type Hamming).
+        - metrique (str): 'hamming', 'hamming_revisite', 'jukes_cantor', 'jaccard' ou 'levenshtein'.
+        - k (int): Taille des mers considérés pour Jaccard.
+        - nb_processus (int): Nombre de processus.
+        - condensee (bool): Renvoie la matrice condensée plutôt que la matrice N x N.
+        - chemin (str): Fichier de la matrice condensée projetée en mémoire, None pour la garder en mémoire.
+
+    Return:
+         - matrice (np.ndarray): La matrice N x N des distances, ou la matrice condensée.
+    """
+    if metrique in TABLES:
+        donnees = encodage_alignement(sequences)
+    elif metrique == 'jaccard':
+        donnees = codes_kmers(k, sequences)
+    else:
+        donnees = list(sequences)
+
+    bornes = np.linspace(0, len(sequences), max(nb_processus, 1) * 4 + 1).astype(int)
+    taches = [(debut, fin) for debut, fin in zip(bornes[:-1], bornes[1:]) if debut < fin]
+
+    if condensee:
+        matrice = triangulaire.creer(len(sequences), chemin)
+        for (debut, _), bloc in zip(taches, blocs_distances(donnees, metrique, taches, nb_processus)):
+            if metrique == 'jukes_cantor':
+                bloc = jukes_cantor_proportions(np.triu(bloc, debut + 1) / donnees.shape[1])
+            triangulaire.ecrire_bloc(matrice, len(sequences), debut, bloc)
+        return matrice
+
+    blocs = list(blocs_distances(donnees, metrique, taches, nb_processus))
+    matrice = np.concatenate(blocs) if blocs else np.zeros((0, 0))
+    if metrique in ('jaccard', 'levenshtein'):
+        matrice = matrice + matrice.T
+
+    if metrique == 'jukes_cantor':
+        matrice = jukes_cantor_proportions(matrice / donnees.shape[1])
+        np.fill_diagonal(matrice, 0)
+
+    return matrice
@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+
+import fasta
+import prefiltre
+
+
+memoire = {}
+
+
+def hachage(codes: np.ndarray) -> np.ndarray:
+    """
+    Fonction de hachage (splitmix64) appliquée à chaque code de kmer.
+    Disperse uniformément les codes, ce qui rend les plus petites valeurs représentatives de l'ensemble.
+
+    Argument:
+        - codes (np.ndarray): Les codes des kmers (uint64).
+
+    Return:
+        - (np.ndarray): Les valeurs hachées (uint64).
+    """
+    z = codes.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def esquisse(sequences: list, k: int, taille: int = 10000) -> dict:
+    """
+    Fonction de calcul de l'esquisse MinHash (bottom-s) d'un ensemble de séquences (par exemple les contigs d'un
+    génome). Les kmers sont codés sur 2 bits par nucléotide, ceux contenant un caractère autre que A, C, G, T
+    sont ignorés, et aucun kmer ne chevauche deux séquences.
+
+    L'esquisse est un dictionnaire:
+        - k: Taille des mers.
+        - hachages: les 'taille' plus petites valeurs hachées distinctes, triées.
+        - complete: vrai si l'esquisse contient tous les kmers (le Jaccard sera alors exact).
+
+    Arguments:
+        - sequences (list): Les séquences.
+        - k (int): Taille des mers considérés (32 au plus).
+        - taille (int): Nombre de valeurs gardées.
+
+    Return:
+        - (dict): L'esquisse.
+    """
+    valeurs = [hachage(prefiltre.codes_kmers(prefiltre.encodage(sequence), k)) for sequence in sequences]
+    valeurs = np.unique(np.concatenate(valeurs)) if valeurs else np.empty(0, np.uint64)
+
+    return {'k': k, 'hachages': valeurs[:taille], 'complete': len(valeurs) <= taille}
+
+
+def esquisse_genome(strain: str, k: int, taille: int = 10000, repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui renvoie l'esquisse du génome complet (genomic.fna) d'une souche.
+    L'esquisse n'est calculée qu'une fois: elle est gardée en mémoire et dans le dossier caché '.esquisses'
+    du répertoire, puis recalculée uniquement si genomic.fna est modifié.
+
+    Arguments:
+        - strain (str): Nom du génome.
+        - k (int): Taille des mers considérés.
+        - taille (int): Nombre de valeurs gardées.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): L'esquisse.
+    """
+    source = f"{repertoire}/{strain}/genomic.fna"
+    chemin = f"{repertoire}/.esquisses/{strain}_k{k}_s{taille}.npz"
+    cle = (os.path.abspath(chemin), os.stat(source).st_mtime_ns)
+
+    if cle in memoire:
+        return memoire[cle]
+
+    if os.path.exists(chemin) and os.stat(chemin).st_mtime_ns >= cle[1]:
+        with np.load(chemin) as fichier:
+            resultat = {'k': k, 'hachages': fichier['hachages'], 'complete': bool(fichier['complete'])}
+    else:
+        resultat = esquisse([fasta.sequence(contig) for contig in fasta.lecture_fasta(source)], k, taille)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        np.savez(chemin, hachages=resultat['hachages'], complete=resultat['complete'])
+
+    memoire[cle] = resultat
+    return resultat
+
+
+def jaccard(esquisse1: dict, esquisse2: dict) -> float:
+    """
+    Fonction de calcul de l'indice de Jaccard entre deux ensembles à partir de leurs esquisses.
+    Si les deux esquisses sont complètes, l'indice est exact:
+        - |A&B| / |AUB|
+    Sinon il est estimé sur les s plus petites valeurs de l'union (s étant la plus petite taille d'esquisse):
+        - |esquisse(AUB) & A & B| / s
+
+    Arguments:
+        - esquisse1 (dict): Esquisse du premier ensemble.
+        - esquisse2 (dict): Esquisse du deuxième ensemble.
+
+    Return:
+        - (float): L'indice de Jaccard.
+    """
+    h1, h2 = esquisse1['hachages'], esquisse2['hachages']
+
+    if esquisse1['complete'] and esquisse2['complete']:
+        inter = len(np.intersect1d(h1, h2, assume_unique=True))
+        union = len(h1) + len(h2) - inter
+        return inter / union if union else 1.0
+
+    taille = min(len(h) for h, complete in ((h1, esquisse1['complete']), (h2, esquisse2['complete'])) if not complete)
+    union = np.union1d(h1, h2)[:taille]
+    communs = np.intersect1d(np.intersect1d(h1, h2, assume_unique=True), union, assume_unique=True)
+
+    return len(communs) / len(union) if len(union) else 1.0
+
+
+def matrice_jaccard(souches: list, k: int, taille: int = 10000, repertoire: str = 'Donnees') -> np.ndarray:
+    """
+    Fonction de calcul de la matrice des distances de Jaccard (1 - J) entre génomes complets.
+    Seules les esquisses sont utilisées: aucune séquence n'est relue une fois les esquisses en cache.
+
+    Arguments:
+        - souches (list): Noms des génomes.
+        - k (int): Taille des mers considérés.
+        - taille (int): Nombre de valeurs gardées par esquisse.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - matrice (np.ndarray): La matrice N x N des distances.
+    """
+    esquisses = [esquisse_genome(strain, k, taille, repertoire) for strain in souches]
+    matrice = np.zeros((len(souches), len(souches)))
+
+    for i in range(len(souches)):
+        for j in range(i + 1, len(souches)):
+            matrice[i, j] = matrice[j, i] = 1 - jaccard(esquisses[i], esquisses[j])
+
+    return matrice
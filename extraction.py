@@ -1,37 +1,121 @@
+import numpy as np
 import os
+import re
+import annotation
+import fasta
+import stockage
 
 
-def cds() -> dict:
+ENTIER = re.compile(r"\d+")
+
+
+def cds_enregistrements(repertoire: str = 'Donnees') -> dict:
     """
-    Fonction qui prend les CDS sous format FASTA et qui crée un dictionnaire avec clé:valeur
+    Fonction qui lit les CDS de chaque génome en gardant leurs en-têtes, avec clé:valeur
 
     clé: Nom du génome.
-    valeur: liste contenant l'ensemble des CDS.
+    valeur: liste des enregistrements (voir fasta.lecture_fasta).
 
     Argument:
-        - None
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): structure contenant les enregistrements.
+    """
+    return {strain: list(fasta.lecture_fasta(f"{repertoire}/{strain}/cds.fna")) for strain in fasta.souches(repertoire)}
+
+
+def cds(repertoire: str = 'Donnees', source: str = 'stockage') -> dict:
+    """
+    Fonction qui prend les CDS et qui crée un dictionnaire avec clé:valeur
+
+    clé: Nom du génome.
+    valeur: liste contenant l'ensemble des CDS.
+
+    Les CDS sont lues depuis le stockage binaire du répertoire (voir stockage.ouvrir), construit à partir
+    des fichiers FASTA au premier appel, ou découpées dans genomic.fna d'après genomic.gff (voir annotation.ouvrir),
+    dans l'ordre du génome comme dans cds.fna.
+
+    Arguments:
+        - repertoire (str): Répertoire des données.
+        - source (str): 'stockage' (cds.fna) ou 'gff' (genomic.gff et genomic.fna).
 
     Return:
         - donnees_cds (dict): structure contenant les CDS.
     """
-    donnee_cds = {}
-    for strain in os.listdir('Donnees'):
-        donnee_cds[strain] = []
-        with open(f"Donnees/{strain}/cds.fna", 'r') as filin:
-            coding = ""
-            for ligne in filin:
-                if ligne[0] == ">":
-                    donnee_cds[strain].append(coding)
-                    coding = ""
-                else:
-                    coding += ligne.replace('\n', '')
-            donnee_cds[strain].append(coding)
-        donnee_cds[strain] = donnee_cds[strain][1:]
+    if source == 'gff':
+        donnees_cds = {}
+        for strain in fasta.souches(repertoire):
+            genome = annotation.ouvrir(strain, repertoire)
+            donnees_cds[strain] = [annotation.sequence_cds(genome, indice) for indice in range(len(genome['index']['debut']))]
+        return donnees_cds
+
+    stock = stockage.ouvrir(repertoire)
+
+    return {
+        strain: [stockage.lire(stock, indice) for indice in stockage.indices(stock, strain)]
+        for strain in stock['souches']
+    }
+
+
+def proteines(repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui prend les protéines de chaque génome (protein.faa) et qui crée un dictionnaire avec clé:valeur
+
+    clé: Nom du génome.
+    valeur: liste des protéines, dans l'ordre des CDS renvoyées par la fonction cds.
+
+    Chaque protéine est reliée à sa CDS par le protein_id de l'en-tête de la CDS.
+    Une CDS sans protéine (pseudogène, génome sans protein.faa) correspond à None.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - donnees_proteines (dict): structure contenant les protéines.
+    """
+    stock = stockage.ouvrir(repertoire)
+    donnees_proteines = {}
+
+    for strain in stock['souches']:
+        chemin = f"{repertoire}/{strain}/protein.faa"
+        faa = {}
+        if os.path.isfile(chemin):
+            faa = {enregistrement['identifiant']: fasta.sequence(enregistrement) for enregistrement in fasta.lecture_fasta(chemin)}
+        donnees_proteines[strain] = [faa.get(stock['protein_id'][indice]) for indice in stockage.indices(stock, strain)]
 
-    return donnee_cds
+    return donnees_proteines
 
 
-def core_genome() -> dict:
+def positions(repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui relève la position de chaque CDS sur son génome, d'après les en-têtes de cds.fna,
+    et qui crée un dictionnaire avec clé:valeur
+
+    clé: Nom du génome.
+    valeur: liste des couples (contig, début), dans l'ordre des CDS renvoyées par la fonction cds.
+
+    Le contig est tiré de l'identifiant (lcl|<contig>_cds_...), le début est la première position du champ location.
+    Une CDS sans location est placée en début de contig.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - donnees_positions (dict): structure contenant les positions.
+    """
+    donnees_positions = {}
+    for strain, enregistrements in cds_enregistrements(repertoire).items():
+        donnees_positions[strain] = []
+        for enregistrement in enregistrements:
+            contig = enregistrement['identifiant'].split('|')[-1].rsplit('_cds_', 1)[0]
+            debut = ENTIER.search(enregistrement['metadonnees'].get('location', ''))
+            donnees_positions[strain].append((contig, int(debut.group()) if debut else 0))
+
+    return donnees_positions
+
+
+def core_genome(chemin: str = 'CoreGenome/core_genome.txt') -> dict:
     """
     Fonction qui prend les CG sous format FASTA et qui crée un dictionnaire avec clé:valeur
 
@@ -39,20 +123,15 @@ def core_genome() -> dict:
     valeur: CG.
 
     Argument:
-        - None
+        - chemin (str): Fichier FASTA des CG.
 
     Return:
         - donnees_cg (dict): structure contenant les CG.
     """
-    donnees_cg = {}
-    with open('CoreGenome/core_genome.txt', 'r') as fil:
-        for ligne in fil:
-            donnees_cg[ligne.replace('\n', '')[1:]] = fil.__next__().replace('\n', '')
+    return {enregistrement['identifiant']: fasta.sequence(enregistrement) for enregistrement in fasta.lecture_fasta(chemin)}
 
-    return donnees_cg
 
-
-def core_genome_align() -> dict:
+def core_genome_align(chemin: str = 'CoreGenome/core_genome_alignement.txt') -> dict:
     """
     Fonction qui prend les CG alignés sous format FASTA et qui crée un dictionnaire avec clé:valeur
 
@@ -60,22 +139,58 @@ def core_genome_align() -> dict:
     valeur: CG aligné.
 
     Argument:
-        - None
+        - chemin (str): Fichier FASTA des CG alignés.
 
     Return:
         - donnees_cg_align (dict): structure contenant les CG alignés.
     """
-    donnees_cg_align = {}
-    with open('CoreGenome/core_genome_alignement.txt', 'r') as fil:
-        for ligne in fil:
-            donnees_cg_align[ligne.replace('\n', '')[1:]] = fil.__next__().replace('\n', '')
+    return {enregistrement['identifiant']: fasta.sequence(enregistrement) for enregistrement in fasta.lecture_fasta(chemin)}
+
 
-    return donnees_cg_align
+def vue_alignement(enregistrement: dict) -> np.ndarray:
+    """
+    Fonction qui renvoie la séquence d'un enregistrement FASTA sous forme de tableau d'octets.
+    Si la séquence tient sur une seule ligne, le tableau est une simple vue sur le fichier projeté en mémoire.
 
+    Argument:
+        - enregistrement (dict): Enregistrement produit par fasta.lecture_fasta.
 
-def caracteres() -> dict:
+    Return:
+        - (np.ndarray): La séquence (uint8).
     """
-    Fonction qui prend les CG alignés en dictionnaire avec clé:valeur et qui séléctionne les caractères informatifs
+    octets = np.frombuffer(enregistrement['bloc'], np.uint8)
+    fin = len(octets)
+    while fin > 0 and octets[fin - 1] in (10, 13):
+        fin -= 1
+    octets = octets[:fin]
+
+    if (octets == 10).any():
+        return np.frombuffer(fasta.sequence(enregistrement).encode(), np.uint8)
+
+    return octets
+
+
+def colonnes_informatives(matrice: np.ndarray) -> np.ndarray:
+    """
+    Fonction qui sélectionne les colonnes informatives d'un bloc d'alignement (génomes x colonnes).
+    Une colonne est retenue si elle ne présente pas de gap et possède au moins 2 états différents.
+
+    Argument:
+        - matrice (np.ndarray): Bloc de l'alignement (uint8).
+
+    Return:
+        - (np.ndarray): Masque booléen des colonnes retenues.
+    """
+    gaps = (matrice == ord('-')).any(axis=0)
+    tri = np.sort(matrice, axis=0)
+    etats = 1 + (tri[1:] != tri[:-1]).sum(axis=0)
+
+    return ~gaps & (etats != 1)
+
+
+def caracteres(chemin: str = 'CoreGenome/core_genome_alignement.txt', taille_bloc: int = 1 << 20) -> tuple:
+    """
+    Fonction qui prend les CG alignés et qui séléctionne les caractères informatifs
     dans le but de réaliser une phylogénie.
 
     Ces caractères ont:
@@ -83,30 +198,34 @@ def caracteres() -> dict:
         - ne présente pas de gap
         - au moins 2 états identiques
 
+    L'alignement (N génomes) est lu par blocs de colonnes depuis le fichier projeté en mémoire:
+    il n'est jamais chargé entièrement.
+
     clé: Nom du génome.
-    valeur: CG aligné.
+    valeur: caractères retenus.
 
     Argument:
-        - None
+        - chemin (str): Fichier FASTA des CG alignés.
+        - taille_bloc (int): Nombre de colonnes traitées à la fois.
 
     Return:
         - carac (dict): structure contenant les caractères.
+        - colonnes (np.ndarray): indices des colonnes retenues.
     """
-    cg = core_genome_align()
-    carac = {gid: "" for gid in cg.keys()}
-    sequences = list(cg.values())
-    for i in range(len(sequences[0])):
-        etats = set()
-        for seq in sequences:
-            etats = etats.union(seq[i])
-        if '-' not in etats and len(etats) != 1:
-            for gid, seq in cg.items():
-                carac[gid] += f"{seq[i]}"
+    enregistrements = list(fasta.lecture_fasta(chemin))
+    vues = {enregistrement['identifiant']: vue_alignement(enregistrement) for enregistrement in enregistrements}
+    longueur = min(len(vue) for vue in vues.values())
+
+    colonnes = []
+    for debut in range(0, longueur, taille_bloc):
+        matrice = np.stack([vue[debut:debut + taille_bloc] for vue in vues.values()])
+        colonnes.append(np.flatnonzero(colonnes_informatives(matrice)) + debut)
+    colonnes = np.concatenate(colonnes) if colonnes else np.empty(0, np.int64)
+
+    carac = {gid: vue[colonnes].tobytes().decode() for gid, vue in vues.items()}
 
     with open('CoreGenome/caracteres.txt', 'w') as filout:
-        texte = ""
         for gid, car in carac.items():
-            texte += f">{gid}\n{car}\n"
-        filout.write(texte)
+            filout.write(f">{gid}\n{car}\n")
 
-    return carac
+    return carac, colonnes
@@ -0,0 +1,78 @@
+import mmap
+import os
+import re
+
+
+METADONNEE = re.compile(r"\[([^=\]]+)=([^\]]*)\]")
+
+
+def lecture_fasta(chemin: str):
+    """
+    Générateur qui parcourt un fichier FASTA projeté en mémoire (mmap).
+    Aucune ligne n'est concaténée: chaque enregistrement pointe sur son bloc de séquence dans le fichier.
+
+    Chaque enregistrement est un dictionnaire:
+        - identifiant: premier mot de l'en-tête.
+        - description: reste de l'en-tête.
+        - metadonnees: champs [clé=valeur] de l'en-tête (locus_tag, protein_id, location...).
+        - bloc: vue (memoryview) sur les lignes de la séquence, retours à la ligne compris.
+
+    Argument:
+        - chemin (str): Chemin du fichier FASTA.
+
+    Yield:
+        - (dict): Un enregistrement par séquence.
+    """
+    with open(chemin, 'rb') as fil:
+        if os.fstat(fil.fileno()).st_size == 0:
+            return
+        projection = mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+
+    vue = memoryview(projection)
+    taille = len(projection)
+    debut = projection.find(b'>')
+
+    while debut != -1:
+        fin_entete = projection.find(b'\n', debut)
+        fin_entete = taille if fin_entete == -1 else fin_entete
+        suivant = projection.find(b'\n>', fin_entete)
+        fin = taille if suivant == -1 else suivant + 1
+
+        entete = projection[debut + 1:fin_entete].decode().rstrip('\r')
+        identifiant, _, description = entete.partition(' ')
+
+        yield {
+            'identifiant': identifiant,
+            'description': description,
+            'metadonnees': dict(METADONNEE.findall(description)),
+            'bloc': vue[min(fin_entete + 1, fin):fin],
+        }
+
+        debut = -1 if suivant == -1 else suivant + 1
+
+
+def sequence(enregistrement: dict) -> str:
+    """
+    Fonction qui renvoie la séquence d'un enregistrement FASTA sans ses retours à la ligne.
+
+    Argument:
+        - enregistrement (dict): Enregistrement produit par lecture_fasta.
+
+    Return:
+        - (str): La séquence.
+    """
+    return bytes(enregistrement['bloc']).translate(None, b'\r\n').decode()
+
+
+def souches(repertoire: str = 'Donnees') -> list:
+    """
+    Fonction qui liste, par ordre alphabétique, les génomes disponibles.
+    Un génome est un sous-dossier du répertoire contenant un fichier cds.fna.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (list): Les noms des génomes.
+    """
+    return sorted(strain for strain in os.listdir(repertoire) if os.path.isfile(f"{repertoire}/{strain}/cds.fna"))
@@ -0,0 +1,345 @@
+import numpy as np
+
+import distance
+import fasta
+import prefiltre
+
+
+NUCLEOTIDES = np.frombuffer(b"ACGTN", np.uint8)
+memoire = {}
+
+
+def lecture_genome(strain: str, repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui encode l'assemblage complet (genomic.fna) d'une souche.
+    Les contigs sont mis bout à bout, séparés par un caractère invalide: aucun kmer ne chevauche deux contigs.
+    L'encodage n'est fait qu'une fois par processus.
+
+    Le génome est un dictionnaire:
+        - contigs: identifiants des contigs.
+        - debuts: position de départ de chaque contig dans la séquence concaténée.
+        - codes: la séquence concaténée encodée (voir prefiltre.encodage).
+        - longueur: nombre total de nucléotides.
+
+    Arguments:
+        - strain (str): Nom du génome.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): Le génome.
+    """
+    cle = (repertoire, strain)
+    if cle in memoire:
+        return memoire[cle]
+
+    contigs, debuts, blocs = [], [], []
+    position = 0
+    for enregistrement in fasta.lecture_fasta(f"{repertoire}/{strain}/genomic.fna"):
+        brut = np.frombuffer(bytes(enregistrement['bloc']).translate(None, b'\r\n'), np.uint8)
+        contigs.append(enregistrement['identifiant'])
+        debuts.append(position)
+        blocs.append(prefiltre.TABLE_NUCLEOTIDES[brut])
+        blocs.append(np.full(1, 4, np.uint8))
+        position += len(brut) + 1
+
+    codes = np.concatenate(blocs) if blocs else np.empty(0, np.uint8)
+    memoire[cle] = {
+        'contigs': contigs,
+        'debuts': np.array(debuts, np.int64),
+        'codes': codes,
+        'longueur': int((codes != 4).sum()),
+    }
+
+    return memoire[cle]
+
+
+def complement_inverse(codes: np.ndarray) -> np.ndarray:
+    """
+    Fonction qui renvoie le brin complémentaire inverse d'une séquence encodée (A<->T, C<->G).
+    Les caractères invalides restent invalides.
+
+    Argument:
+        - codes (np.ndarray): La séquence encodée.
+
+    Return:
+        - (np.ndarray): Le complémentaire inverse.
+    """
+    inverse = codes[::-1]
+    return np.where(inverse == 4, 4, 3 - inverse).astype(np.uint8)
+
+
+def kmers_uniques(codes: np.ndarray, k: int) -> tuple:
+    """
+    Fonction qui renvoie les kmers présents une seule fois dans une séquence, triés, avec leur position.
+    La table triée des kmers joue le rôle d'un tableau des suffixes tronqué à la profondeur k:
+    les kmers répétés (éléments mobiles, ARN ribosomiques...) sont écartés car ils ne localisent rien.
+
+    Arguments:
+        - codes (np.ndarray): La séquence encodée.
+        - k (int): Taille des mers considérés (32 au plus).
+
+    Return:
+        - (tuple): Les codes (uint64, triés) des kmers uniques et leurs positions.
+    """
+    mers, positions = prefiltre.kmers_positions(codes, k)
+    valeurs, premiers, nombres = np.unique(mers, return_index=True, return_counts=True)
+    uniques = nombres == 1
+
+    return valeurs[uniques], positions[premiers[uniques]]
+
+
+def ancres(kmers1: tuple, kmers2: tuple) -> tuple:
+    """
+    Fonction qui renvoie les kmers uniques communs à deux séquences (ancres).
+
+    Arguments:
+        - kmers1 (tuple): Kmers uniques de la première séquence (voir kmers_uniques).
+        - kmers2 (tuple): Kmers uniques de la deuxième séquence.
+
+    Return:
+        - (tuple): Positions des ancres dans la première et dans la deuxième séquence.
+    """
+    _, indices1, indices2 = np.intersect1d(kmers1[0], kmers2[0], assume_unique=True, return_indices=True)
+    return kmers1[1][indices1], kmers2[1][indices2]
+
+
+def correspondances_maximales(positions1: np.ndarray, positions2: np.ndarray, k: int) -> np.ndarray:
+    """
+    Fonction qui fusionne les ancres consécutives d'une même diagonale en correspondances exactes maximales (MEM).
+    Deux ancres se suivent si elles sont décalées d'un nucléotide sur les deux séquences.
+
+    Arguments:
+        - positions1 (np.ndarray): Positions des ancres dans la première séquence.
+        - positions2 (np.ndarray): Positions des ancres dans la deuxième séquence.
+        - k (int): Taille des mers.
+
+    Return:
+        - (np.ndarray): Les MEM (debut1, debut2, longueur), triées par debut1.
+    """
+    if len(positions1) == 0:
+        return np.empty((0, 3), np.int64)
+
+    diagonales = positions2 - positions1
+    ordre = np.lexsort((positions1, diagonales))
+    p1, p2, d = positions1[ordre], positions2[ordre], diagonales[ordre]
+
+    coupures = np.flatnonzero((np.diff(d) != 0) | (np.diff(p1) != 1)) + 1
+    premiers = np.concatenate(([0], coupures))
+    derniers = np.concatenate((coupures - 1, [len(p1) - 1]))
+
+    mems = np.stack([p1[premiers], p2[premiers], p1[derniers] - p1[premiers] + k], axis=1)
+    return mems[np.argsort(mems[:, 0], kind='stable')]
+
+
+def chainage(mems: np.ndarray, ecart_max: int = 500) -> list:
+    """
+    Fonction qui enchaîne les MEM colinéaires en régions partagées.
+    Les MEM sont parcourues par position croissante sur la première séquence. Une MEM prolonge une chaîne si:
+        - elle commence après la fin de la chaîne sur les deux séquences (à un chevauchement de k près)
+        - l'écart sur chaque séquence et le changement de diagonale restent inférieurs à ecart_max
+    Les chaînes sont rangées par bande de diagonale: chaque MEM ne consulte que 3 bandes.
+
+    Arguments:
+        - mems (np.ndarray): Les MEM (debut1, debut2, longueur), triées par debut1.
+        - ecart_max (int): Ecart maximal entre deux MEM d'une chaîne.
+
+    Return:
+        - chaines (list): Les chaînes, chacune étant la liste de ses MEM.
+    """
+    chaines, bandes = [], {}
+
+    for debut1, debut2, longueur in mems.tolist():
+        bande = (debut2 - debut1) // ecart_max
+        meilleure = None
+
+        for voisine in (bande - 1, bande, bande + 1):
+            # Les chaînes finissant trop tôt ne peuvent plus être prolongées: elles quittent la bande
+            actives = [c for c in bandes.get(voisine, ()) if chaines[c][-1][0] + chaines[c][-1][2] >= debut1 - ecart_max]
+            bandes[voisine] = actives
+            for c in actives:
+                fin1, fin2 = chaines[c][-1][0] + chaines[c][-1][2], chaines[c][-1][1] + chaines[c][-1][2]
+                ecart1, ecart2 = debut1 - fin1, debut2 - fin2
+                if (-longueur < ecart1 <= ecart_max and -longueur < ecart2 <= ecart_max
+                        and abs(ecart1 - ecart2) <= ecart_max and (meilleure is None or fin1 > meilleure[0])):
+                    meilleure = (fin1, c, voisine)
+
+        if meilleure is None:
+            chaines.append([(debut1, debut2, longueur)])
+            bandes.setdefault(bande, []).append(len(chaines) - 1)
+            continue
+
+        fin1, c, ancienne = meilleure
+        fin2 = chaines[c][-1][1] + chaines[c][-1][2]
+        recouvrement = max(0, fin1 - debut1, fin2 - debut2)
+        if recouvrement < longueur:
+            chaines[c].append((debut1 + recouvrement, debut2 + recouvrement, longueur - recouvrement))
+        if ancienne != bande:
+            bandes[ancienne].remove(c)
+            bandes.setdefault(bande, []).append(c)
+
+    return chaines
+
+
+def texte(codes: np.ndarray) -> str:
+    """
+    Fonction qui décode une séquence encodée (les caractères invalides deviennent N).
+
+    Argument:
+        - codes (np.ndarray): La séquence encodée.
+
+    Return:
+        - (str): La séquence.
+    """
+    return NUCLEOTIDES[codes].tobytes().decode()
+
+
+def identite_chaine(chaine: list, codes1: np.ndarray, codes2: np.ndarray) -> tuple:
+    """
+    Fonction qui estime l'alignement d'une chaîne: les MEM sont identiques, les intervalles entre deux MEM
+    sont comparés position par position s'ils ont la même longueur (substitutions), par la distance
+    de Levenshtein sinon.
+
+    Arguments:
+        - chaine (list): Les MEM de la chaîne.
+        - codes1 (np.ndarray): La première séquence encodée.
+        - codes2 (np.ndarray): La deuxième séquence encodée.
+
+    Return:
+        - (tuple): Longueur alignée et nombre de différences.
+    """
+    longueur = sum(mem[2] for mem in chaine)
+    differences = 0
+
+    for (d1, d2, l), (s1, s2, _) in zip(chaine[:-1], chaine[1:]):
+        intervalle1, intervalle2 = codes1[d1 + l:s1], codes2[d2 + l:s2]
+        if len(intervalle1) == len(intervalle2):
+            differences += int((intervalle1 != intervalle2).sum())
+        else:
+            differences += distance.levenshtein(texte(intervalle1), texte(intervalle2))
+        longueur += max(len(intervalle1), len(intervalle2))
+
+    return longueur, differences
+
+
+def contig(genome: dict, position: int) -> tuple:
+    """
+    Fonction qui convertit une position de la séquence concaténée en (contig, position dans le contig).
+
+    Arguments:
+        - genome (dict): Le génome (voir lecture_genome).
+        - position (int): Position dans la séquence concaténée.
+
+    Return:
+        - (tuple): Identifiant du contig et position (à partir de 0).
+    """
+    indice = int(np.searchsorted(genome['debuts'], position, 'right')) - 1
+    return genome['contigs'][indice], position - int(genome['debuts'][indice])
+
+
+def couverture(intervalles: list) -> int:
+    """
+    Fonction qui calcule le nombre de positions couvertes par une liste d'intervalles [debut, fin[.
+
+    Argument:
+        - intervalles (list): Les intervalles.
+
+    Return:
+        - (int): Nombre de positions couvertes.
+    """
+    total, courant = 0, -1
+    for debut, fin in sorted(intervalles):
+        debut = max(debut, courant)
+        if fin > debut:
+            total += fin - debut
+            courant = fin
+
+    return total
+
+
+def comparaison(strain1: str, strain2: str, k: int = 21, ecart_max: int = 500, longueur_min: int = 1000,
+                repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction de comparaison de deux génomes complets par graines et extension:
+        - graines: kmers uniques communs (voir kmers_uniques, ancres), sur les deux brins du génome 2
+        - correspondances exactes maximales (voir correspondances_maximales)
+        - chaînage des MEM colinéaires en régions partagées (voir chainage)
+        - estimation de l'identité de chaque région (voir identite_chaine)
+
+    Toutes les étapes sont linéaires ou quasi linéaires: deux génomes bactériens sont comparés en quelques secondes.
+
+    Le résultat est un dictionnaire:
+        - ani: identité nucléotidique moyenne (%) des régions partagées.
+        - alignes: nombre de nucléotides alignés.
+        - couverture1, couverture2: proportion (%) de chaque génome couverte par les régions partagées.
+        - regions: liste des régions (contig1, debut1, fin1, contig2, debut2, fin2, brin, %id).
+
+    Arguments:
+        - strain1 (str): Nom du premier génome.
+        - strain2 (str): Nom du deuxième génome.
+        - k (int): Taille des graines.
+        - ecart_max (int): Ecart maximal entre deux MEM d'une région.
+        - longueur_min (int): Longueur minimale d'une région.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): La comparaison.
+    """
+    genome1, genome2 = lecture_genome(strain1, repertoire), lecture_genome(strain2, repertoire)
+    kmers1 = kmers_uniques(genome1['codes'], k)
+    taille2 = len(genome2['codes'])
+
+    alignes, differences, regions, intervalles1, intervalles2 = 0, 0, [], [], []
+
+    for brin, codes2 in (('+', genome2['codes']), ('-', complement_inverse(genome2['codes']))):
+        mems = correspondances_maximales(*ancres(kmers1, kmers_uniques(codes2, k)), k)
+
+        for chaine in chainage(mems, ecart_max):
+            debut1, fin1 = chaine[0][0], chaine[-1][0] + chaine[-1][2]
+            debut2, fin2 = chaine[0][1], chaine[-1][1] + chaine[-1][2]
+            if fin1 - debut1 < longueur_min:
+                continue
+
+            longueur, erreurs = identite_chaine(chaine, genome1['codes'], codes2)
+            alignes += longueur
+            differences += erreurs
+
+            if brin == '-':
+                debut2, fin2 = taille2 - fin2, taille2 - debut2
+            contig1, position1 = contig(genome1, debut1)
+            contig2, position2 = contig(genome2, debut2)
+            regions.append((contig1, position1, position1 + fin1 - debut1, contig2, position2, position2 + fin2 - debut2,
+                            brin, round(100 * (1 - erreurs / longueur), 4)))
+            intervalles1.append((debut1, fin1))
+            intervalles2.append((debut2, fin2))
+
+    return {
+        'ani': 100 * (1 - differences / alignes) if alignes else 0.0,
+        'alignes': alignes,
+        'couverture1': 100 * couverture(intervalles1) / genome1['longueur'] if genome1['longueur'] else 0.0,
+        'couverture2': 100 * couverture(intervalles2) / genome2['longueur'] if genome2['longueur'] else 0.0,
+        'regions': regions,
+    }
+
+
+def matrice_ani(souches: list = None, k: int = 21, repertoire: str = 'Donnees') -> tuple:
+    """
+    Fonction de calcul des ANI entre tous les génomes complets, et de la matrice des distances associée
+    (100 - ANI, symétrisée par la moyenne des deux sens).
+
+    Arguments:
+        - souches (list): Noms des génomes, par défaut tous ceux du répertoire.
+        - k (int): Taille des graines.
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (tuple): Les noms des génomes et la matrice N x N des distances.
+    """
+    souches = souches or fasta.souches(repertoire)
+    matrice = np.zeros((len(souches), len(souches)))
+
+    for i in range(len(souches)):
+        for j in range(len(souches)):
+            if i != j:
+                matrice[i, j] = 100 - comparaison(souches[i], souches[j], k, repertoire=repertoire)['ani']
+
+    return souches, (matrice + matrice.T) / 2
@@ -0,0 +1,185 @@
+import json
+import os
+import time
+
+
+configuration = {'dossier': 'Rapports/mesures', 'intervalle': 5.0, 'echantillon': 64}
+compteurs = {}
+durees = {}
+etat = {'appels': 0, 'publication': 0.0}
+
+
+def configurer(dossier: str = 'Rapports/mesures', intervalle: float = 5.0, echantillon: int = 64) -> None:
+    """
+    Fonction qui paramètre les mesures du processus courant et les remet à zéro.
+
+    Arguments:
+        - dossier (str): Dossier des instantanés de chaque processus.
+        - intervalle (float): Délai minimal (en secondes) entre deux instantanés d'un même processus.
+        - echantillon (int): Une durée d'alignement sur 'echantillon' est mesurée.
+
+    Return:
+        - None.
+    """
+    configuration.update(dossier=dossier, intervalle=intervalle, echantillon=echantillon)
+    compteurs.clear()
+    durees.clear()
+    etat.update(appels=0, publication=0.0)
+
+
+def compter(nom: str, nombre: int = 1) -> None:
+    """
+    Fonction qui incrémente un compteur du processus courant.
+
+    Arguments:
+        - nom (str): Nom du compteur.
+        - nombre (int): Valeur ajoutée.
+
+    Return:
+        - None.
+    """
+    compteurs[nom] = compteurs.get(nom, 0) + nombre
+
+
+def echantillonner() -> bool:
+    """
+    Fonction qui indique si la mesure en cours doit être chronométrée (une sur 'echantillon').
+
+    Argument:
+        - None.
+
+    Return:
+        - (bool): Vrai si la durée doit être mesurée.
+    """
+    etat['appels'] += 1
+    return etat['appels'] % configuration['echantillon'] == 0
+
+
+def duree(longueur: int, secondes: float) -> None:
+    """
+    Fonction qui note la durée d'un alignement.
+    Les durées sont regroupées par classe de longueur (puissance de 2 supérieure ou égale).
+
+    Arguments:
+        - longueur (int): Longueur de la plus grande séquence alignée.
+        - secondes (float): Durée de l'alignement.
+
+    Return:
+        - None.
+    """
+    classe = 1 << max(0, longueur - 1).bit_length()
+    nombre, total = durees.get(classe, (0, 0.0))
+    durees[classe] = (nombre + 1, total + secondes)
+
+
+def instantane() -> dict:
+    """
+    Fonction qui renvoie l'état des mesures du processus courant.
+
+    L'instantané est un dictionnaire:
+        - pid: le processus.
+        - date: date de l'instantané (secondes depuis l'époque).
+        - compteurs: structure nom:valeur.
+        - durees: structure classe de longueur:[nombre de mesures, durée totale].
+
+    Argument:
+        - None.
+
+    Return:
+        - (dict): L'instantané.
+    """
+    return {
+        'pid': os.getpid(),
+        'date': time.time(),
+        'compteurs': dict(compteurs),
+        'durees': {str(classe): list(valeurs) for classe, valeurs in durees.items()},
+    }
+
+
+def publier(forcer: bool = False) -> None:
+    """
+    Fonction qui écrit l'instantané du processus courant dans le dossier des mesures (écriture atomique).
+    Hors forçage, rien n'est écrit si le dernier instantané date de moins de 'intervalle' secondes:
+    la fonction peut être appelée à chaque itération.
+
+    Argument:
+        - forcer (bool): Ecrit l'instantané quel que soit le délai.
+
+    Return:
+        - None.
+    """
+    maintenant = time.monotonic()
+    if not forcer and maintenant - etat['publication'] < configuration['intervalle']:
+        return
+    etat['publication'] = maintenant
+
+    dossier = configuration['dossier']
+    os.makedirs(dossier, exist_ok=True)
+    with open(f"{dossier}/{os.getpid()}.json.tmp", 'w') as fil:
+        json.dump(instantane(), fil)
+    os.replace(f"{dossier}/{os.getpid()}.json.tmp", f"{dossier}/{os.getpid()}.json")
+
+
+def vider() -> None:
+    """
+    Fonction qui supprime les instantanés d'un calcul précédent.
+
+    Argument:
+        - None.
+
+    Return:
+        - None.
+    """
+    dossier = configuration['dossier']
+    if os.path.isdir(dossier):
+        for nom in os.listdir(dossier):
+            os.remove(f"{dossier}/{nom}")
+
+
+def agreger(sortie: str = 'Rapports/mesures.json', progression: dict = None) -> dict:
+    """
+    Fonction qui additionne les instantanés de tous les processus et écrit le bilan au format JSON.
+
+    Le bilan est un dictionnaire:
+        - date: date du bilan.
+        - processus: nombre de processus ayant publié.
+        - progression: avancement fourni par l'appelant (par exemple tâches terminées et total).
+        - compteurs: structure nom:valeur, tous processus confondus.
+        - durees: structure classe de longueur:{nombre, moyenne} des durées d'alignement échantillonnées.
+
+    Arguments:
+        - sortie (str): Fichier du bilan.
+        - progression (dict): Avancement du calcul.
+
+    Return:
+        - bilan (dict): Le bilan.
+    """
+    dossier = configuration['dossier']
+    total, temps, processus = {}, {}, 0
+
+    for nom in sorted(os.listdir(dossier)) if os.path.isdir(dossier) else []:
+        if not nom.endswith('.json'):
+            continue
+        with open(f"{dossier}/{nom}", 'r') as fil:
+            mesure = json.load(fil)
+        processus += 1
+        for cle, valeur in mesure['compteurs'].items():
+            total[cle] = total.get(cle, 0) + valeur
+        for classe, (nombre, secondes) in mesure['durees'].items():
+            n, s = temps.get(classe, (0, 0.0))
+            temps[classe] = (n + nombre, s + secondes)
+
+    bilan = {
+        'date': time.time(),
+        'processus': processus,
+        'progression': progression or {},
+        'compteurs': total,
+        'durees': {classe: {'nombre': n, 'moyenne': s / n} for classe, (n, s) in sorted(temps.items(), key=lambda x: int(x[0]))},
+    }
+
+    os.makedirs(os.path.dirname(sortie) or '.', exist_ok=True)
+    with open(f"{sortie}.tmp", 'w') as fil:
+        json.dump(bilan, fil, indent=1)
+    os.replace(f"{sortie}.tmp", sortie)
+
+    return bilan
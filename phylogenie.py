@@ -1,98 +1,391 @@
-import random
 import distance
+import io
 import numpy as np
 import extraction
+import triangulaire
 
 
-def consensus(sequence1: str, sequence2: str) -> str:
+def profil(sequences: np.ndarray, alphabet: np.ndarray) -> np.ndarray:
+    """
+    Fonction de calcul du profil d'un ensemble de séquences alignées: le nombre de chaque état par colonne.
+
+    Argument:
+        - sequences (np.ndarray): Les séquences encodées (séquences x colonnes, uint8).
+        - alphabet (np.ndarray): Les états possibles (uint8).
+
+    Return:
+         - (np.ndarray): Le profil (colonnes x états).
+    """
+    sequences = np.atleast_2d(sequences)
+    return np.stack([(sequences == etat).sum(axis=0) for etat in alphabet], axis=1).astype(np.int32)
+
+
+def consensus_profil(comptes: np.ndarray, alphabet: np.ndarray, graine: int = 0) -> np.ndarray:
+    """
+    Fonction de calcul de la séquence consensus d'un profil.
+    L'état le plus fréquent de chaque colonne est retenu, un nucléotide étant préféré face à un gap.
+    Les égalités sont départagées par un tirage reproductible: une même graine donne toujours le même consensus.
+
+    Argument:
+        - comptes (np.ndarray): Le profil (colonnes x états).
+        - alphabet (np.ndarray): Les états du profil (uint8).
+        - graine (int): Graine du tirage des égalités.
+
+    Return:
+         - (np.ndarray): La séquence consensus encodée (uint8).
+    """
+    nucleotides = np.where(alphabet == ord('-'), 0, comptes)
+    maximum = nucleotides.max(axis=1, keepdims=True)
+    priorites = np.random.default_rng(graine).random(comptes.shape)
+    choix = np.argmax(np.where(nucleotides == maximum, priorites, -1), axis=1)
+
+    cons = alphabet[choix]
+    cons[maximum[:, 0] == 0] = ord('-')
+
+    return cons
+
+
+def consensus(sequence1: str, sequence2: str, graine: int = 0) -> str:
     """
     Fonction de calcul de la séquence consensus entre 2 séquences.
     Un nucléotide sera préféré face à un gap.
-    L'aléatoire choisira l'un des deux nucléotides s'ils sont différents.
+    Un tirage reproductible (voir consensus_profil) choisira l'un des deux nucléotides s'ils sont différents.
 
     Argument:
         - sequence1 (str): La première séquence.
         - sequence2 (str): La deuxième séquence.
+        - graine (int): Graine du tirage des égalités.
 
     Return:
          - cons (str): La séquence consensus.
     """
-    cons = ""
-    for i in range(len(sequence1)):
-        if sequence1[i] == sequence2[i]:
-            cons += sequence1[i]
-        elif sequence1[i] == '-':
-            cons += sequence2[i]
-        elif sequence2[i] == '-':
-            cons += sequence1[i]
+    sequences = distance.encodage_alignement([sequence1, sequence2])
+    alphabet = np.union1d(np.unique(sequences), [ord('-')]).astype(np.uint8)
+
+    return consensus_profil(profil(sequences, alphabet), alphabet, graine).tobytes().decode()
+
+
+def minimum_net(condensee: np.ndarray, n: int, U: np.ndarray) -> tuple:
+    """
+    Fonction qui cherche le minimum de la matrice net, bloc par bloc de la matrice condensée
+    (voir triangulaire.blocs), sans construire la matrice net complète:
+        - D*(A, B) = D(A, B) - U(A) - U(B)
+
+    Les noeuds déjà reliés ont une distance infinie à tous les autres et ne sont jamais retenus.
+
+    Arguments:
+        - condensee (np.ndarray): La matrice condensée des distances.
+        - n (int): Dimension de la matrice.
+        - U (np.ndarray): La difference net de chaque noeud.
+
+    Return:
+         - (tuple): Les indices (i, j) du minimum, avec i < j.
+    """
+    meilleur, position = np.inf, 0
+
+    for debut, fin, lignes, colonnes in triangulaire.blocs(n):
+        net = condensee[debut:fin] - U[lignes] - U[colonnes]
+        m = int(np.argmin(net))
+        if net[m] < meilleur:
+            meilleur, position = net[m], debut + m
+
+    return triangulaire.indices(n, position)
+
+
+def minimum_net_rapide(actifs: np.ndarray, U: np.ndarray, tri: list, valeurs: list, naissance: np.ndarray) -> tuple:
+    """
+    Fonction qui cherche le minimum de la matrice net en parcourant les lignes triées (borne de RapidNJ).
+    Pour une ligne i triée par distance croissante:
+        - D*(i, j) >= D(i, j) - U(i) - max(U)
+    dès que cette borne dépasse le meilleur minimum connu, le reste de la ligne est ignoré.
+
+    Une ligne n'est triée qu'à la création de son noeud: les entrées désignant un noeud plus récent que la ligne
+    sont périmées et ignorées, le couple étant couvert par la ligne du noeud le plus récent.
+    Les distances des entrées valides n'ont pas changé depuis le tri: la matrice n'est pas relue.
+
+    Arguments:
+        - actifs (np.ndarray): Masque des noeuds encore à relier.
+        - U (np.ndarray): La difference net de chaque noeud.
+        - tri (list): Pour chaque ligne, les colonnes triées par distance croissante.
+        - valeurs (list): Pour chaque ligne, les distances triées.
+        - naissance (np.ndarray): Itération de création de chaque noeud.
+
+    Return:
+         - (tuple): Les indices (i, j) du minimum, avec i < j.
+    """
+    meilleur, mi, mj = np.inf, 0, 0
+    umax = U[actifs].max()
+
+    for i in np.flatnonzero(actifs):
+        limite = np.searchsorted(valeurs[i], meilleur + U[i] + umax, 'right')
+        colonnes = tri[i][:limite]
+        valides = actifs[colonnes] & (naissance[colonnes] <= naissance[i]) & (colonnes != i)
+        colonnes = colonnes[valides]
+        if len(colonnes):
+            net = valeurs[i][:limite][valides] - U[i] - U[colonnes]
+            m = np.argmin(net)
+            if net[m] < meilleur:
+                meilleur, mi, mj = net[m], i, colonnes[m]
+
+    return min(mi, mj), max(mi, mj)
+
+
+def ecrire_newick(fil, arbre: dict) -> None:
+    """
+    Fonction qui écrit un arbre au format NEWICK, morceau par morceau: la phylogénie n'est jamais
+    construite en une seule chaîne. Le parcours utilise une pile, la profondeur de l'arbre n'est pas limitée.
+
+    Arguments:
+        - fil: Fichier ouvert en écriture.
+        - arbre (dict): L'arbre (voir neighbor_joining_arbre).
+
+    Return:
+        - None.
+    """
+    noms, enfants = arbre['noms'], arbre['enfants']
+    pile = [] if arbre['racine'] is None else [arbre['racine']]
+
+    while pile:
+        element = pile.pop()
+        if isinstance(element, str):
+            fil.write(element)
+        elif element < len(noms):
+            fil.write(noms[element])
         else:
-            cons += random.choice([sequence1[i], sequence2[i]])
+            gauche, branche_g, droite, branche_d = enfants[element - len(noms)]
+            pile.extend([")", f":{branche_d}", droite, ", ", f":{branche_g}", gauche, "("])
 
-    return cons
 
+def newick(arbre: dict) -> str:
+    """
+    Fonction qui renvoie un arbre au format NEWICK (voir ecrire_newick).
+
+    Argument:
+        - arbre (dict): L'arbre.
 
-def neighbor_joining(data: dict) -> str:
+    Return:
+         - (str): La phylogénie au format NEWICK.
     """
-    Fonction de calcul de la phylogénie entre 3 coregenomes avec la méthode NJ (neighbor joining).
-    Calcul en premier temps la matrice des distances.
+    tampon = io.StringIO()
+    ecrire_newick(tampon, arbre)
 
-    Puis la difference net:
-        - U(A) = Somme(D(A, G)) pour tout G appartenant aux Génomes étudiés.
+    return tampon.getvalue()
 
-    Puis calcul la matrice net:
-        - D*(A, B) = D(A, B) - U(A) - U(B)
 
-    Puis la distance entre les feuilles et le noeud K:
+def neighbor_joining_arbre(noms: list, matrice: np.ndarray, rapide: bool = False, sequences: np.ndarray = None,
+                           graine: int = 0, chemin: str = None) -> dict:
+    """
+    Fonction de calcul de la phylogénie entre N génomes avec la méthode NJ (neighbor joining) à partir
+    de leur matrice des distances.
+
+    A chaque itération, parmi les r noeuds restants:
+        - U(A) = Somme(D(A, G)) / (r-2) pour tout G restant.
+        - D*(A, B) = D(A, B) - U(A) - U(B), dont on relie le minimum (A, B) en un noeud K.
         - D(A, K) = (D(A, B) + U(A) - U(B)) / 2
+        - D(G, K) = (D(G, A) + D(G, B) - D(A, B)) / 2
+
+    Les distances sont gardées dans une copie condensée en float32 de la matrice (voir triangulaire),
+    mise à jour sur place: K prend la ligne de A, la ligne de B passe à l'infini,
+    et les sommes des lignes sont mises à jour sans être recalculées.
+
+    Si les séquences alignées sont données, chaque noeud garde le profil de ses feuilles: le profil de K est la
+    somme de ceux de A et B, et D(G, K) est la distance Jukes-Cantor entre les consensus de G et de K.
+
+    L'arbre est un dictionnaire:
+        - noms: noms des feuilles, numérotées de 0 à N-1.
+        - enfants: pour chaque noeud interne (numéroté à partir de N), (gauche, branche, droite, branche).
+        - racine: numéro de la racine, None pour un arbre vide.
+
+    Argument:
+        - noms (list): Noms des génomes.
+        - matrice (np.ndarray): La matrice des distances, N x N ou condensée (voir triangulaire.condenser).
+        - rapide (bool): Recherche du minimum par lignes triées (voir minimum_net_rapide), sans parcourir la
+          matrice complète à chaque itération.
+        - sequences (np.ndarray): Séquences alignées encodées (génomes x colonnes), None pour la formule classique.
+        - graine (int): Graine du tirage des égalités des consensus.
+        - chemin (str): Fichier de la copie de travail projetée en mémoire, None pour la garder en mémoire.
+
+    Return:
+         - arbre (dict): La phylogénie.
+    """
+    n = len(noms)
+    arbre = {'noms': list(noms), 'enfants': [], 'racine': None if n == 0 else 0}
+    if n < 2:
+        return arbre
+
+    condensee = triangulaire.condenser(matrice, chemin)
+    noeuds = list(range(n))
+    actifs = np.ones(n, bool)
+    sommes = triangulaire.sommes(condensee, n)
+    naissance = np.zeros(n, np.int64)
+    tri, valeurs = [], []
+    if rapide:
+        for i in range(n):
+            distances_i = triangulaire.ligne(condensee, n, i)
+            tri.append(np.argsort(distances_i, kind='stable'))
+            valeurs.append(distances_i[tri[i]])
+    if sequences is not None:
+        alphabet = np.union1d(np.unique(sequences), [ord('-')]).astype(np.uint8)
+        profils = [profil(sequence, alphabet) for sequence in sequences]
+        consensus_noeuds = np.array(sequences, np.uint8)
+
+    for iteration in range(1, n - 1):
+        restants = n - iteration + 1
+        U = sommes / (restants - 2)
+
+        if rapide:
+            mi, mj = minimum_net_rapide(actifs, U, tri, valeurs, naissance)
+        else:
+            mi, mj = minimum_net(condensee, n, U)
+
+        ligne_i, ligne_j = triangulaire.ligne(condensee, n, mi), triangulaire.ligne(condensee, n, mj)
+        branche_i = (ligne_i[mj] + U[mi] - U[mj]) / 2
+        branche_j = ligne_i[mj] - branche_i
+        arbre['enfants'].append((noeuds[mi], round(branche_i, 4), noeuds[mj], round(branche_j, 4)))
+        noeuds[mi] = n + len(arbre['enfants']) - 1
+
+        if sequences is None:
+            nouvelle = (ligne_i + ligne_j - ligne_i[mj]) / 2
+        else:
+            profils[mi] = profils[mi] + profils[mj]
+            consensus_noeuds[mi] = consensus_profil(profils[mi], alphabet, graine)
+            differences = (consensus_noeuds != consensus_noeuds[mi]).mean(axis=1)
+            nouvelle = distance.jukes_cantor_proportions(np.where(actifs, differences, 0))
+        actifs[mj] = False
+        nouvelle[~actifs] = np.inf
+        nouvelle[mi] = 0
+
+        sommes[actifs] += nouvelle[actifs] - ligne_i[actifs] - ligne_j[actifs]
+        sommes[mi] = nouvelle[actifs].sum()
+        sommes[mj] = 0
+        triangulaire.remplacer_ligne(condensee, n, mi, nouvelle)
+        triangulaire.remplacer_ligne(condensee, n, mj, np.full(n, np.inf))
+
+        if rapide:
+            naissance[mi] = iteration
+            tri[mi] = np.argsort(nouvelle, kind='stable')
+            valeurs[mi] = nouvelle[tri[mi]]
+
+    restants = np.flatnonzero(actifs)
+    if len(restants) == 1:
+        arbre['racine'] = noeuds[restants[0]]
+        return arbre
+
+    a, b = restants
+    if noeuds[a] >= n and noeuds[b] < n:
+        a, b = b, a
+    val = round(triangulaire.ligne(condensee, n, a)[b] / 2, 4)
+    arbre['enfants'].append((noeuds[a], val, noeuds[b], val))
+    arbre['racine'] = n + len(arbre['enfants']) - 1
+
+    return arbre
+
+
+def neighbor_joining_matrice(noms: list, matrice: np.ndarray, rapide: bool = False, sequences: np.ndarray = None,
+                             graine: int = 0) -> str:
+    """
+    Fonction de calcul de la phylogénie NJ entre N génomes à partir de leur matrice des distances
+    (voir neighbor_joining_arbre).
+
+    Argument:
+        - noms (list): Noms des génomes.
+        - matrice (np.ndarray): La matrice des distances, N x N ou condensée.
+        - rapide (bool): Recherche du minimum par lignes triées (voir minimum_net_rapide).
+        - sequences (np.ndarray): Séquences alignées encodées (génomes x colonnes), None pour la formule classique.
+        - graine (int): Graine du tirage des égalités des consensus.
+
+    Return:
+         - phylo (str): La phylogénie au format NEWICK.
+    """
+    return newick(neighbor_joining_arbre(noms, matrice, rapide, sequences, graine))
+
+
+def neighbor_joining(data: dict, rapide: bool = False, profils: bool = False, graine: int = 0) -> str:
+    """
+    Fonction de calcul de la phylogénie entre N coregenomes avec la méthode NJ (neighbor joining).
+    Calcul en premier temps la matrice des distances de Jukes-Cantor, puis l'arbre (voir neighbor_joining_matrice).
 
     Les résultats sont disponibles dans le répertoire Neighbor Joining.
     Ils incluent la matrice des distances, la matrice net et enfin la phylogénie associée
 
     Argument:
         - data (dict): Dictionnaire sous la forme Nom:CGaligné.
+        - rapide (bool): Recherche du minimum par lignes triées (voir minimum_net_rapide).
+        - profils (bool): Distances des noeuds internes calculées sur les consensus de leurs profils.
+        - graine (int): Graine du tirage des égalités des consensus.
 
     Return:
          - phylo (str): La phylogénie au format NEWICK.
     """
-    annuaire = {indice: genome for indice, genome in enumerate(data.keys())}
-    matrice_dist = np.full((len(data), len(data)), 0, float)
-    matrice_net = np.full((len(data), len(data)), 0, float)
-    U = [0 for _ in range(len(annuaire))]
-    minimum = 1000000
-    mi, mj = 0, 0
+    matrice_dist = distance.matrice_distances(list(data.values()), 'jukes_cantor', condensee=True)
+    sequences = distance.encodage_alignement(list(data.values())) if profils else None
+
+    return neighbor_joining_matrice(list(data.keys()), matrice_dist, rapide, sequences, graine)
 
-    for i in range(matrice_dist.shape[0]):
-        for j in range(i+1, matrice_dist.shape[1]):
-            matrice_dist[i, j] = distance.jukes_cantor(data[annuaire[i]], data[annuaire[j]])
-            matrice_dist[j, i] = matrice_dist[i, j].copy()
-        U[i] = sum(matrice_dist[i])/(len(annuaire)-2)
 
-    for i in range(matrice_net.shape[0]):
-        for j in range(i+1, matrice_net.shape[1]):
-            matrice_net[i, j] = matrice_dist[i, j] - U[i] - U[j]
-            matrice_net[j, i] = matrice_net[i, j].copy()
-            if matrice_net[i, j] < minimum:
-                mi, mj = i, j
-                minimum = matrice_net[i, j]
+def upgma_arbre(noms: list, matrice: np.ndarray, chemin: str = None) -> dict:
+    """
+    Fonction de calcul de la phylogénie entre N génomes avec la méthode UPGMA à partir de leur matrice des distances.
 
-    cons = consensus(data[annuaire[mi]], data[annuaire[mj]])
-    phylo = f"({annuaire[mi]}:{round((matrice_dist[mi, mj]+U[mi]-U[mj])/2, 4)}, {annuaire[mj]}:{round((matrice_dist[mi, mj]+U[mj]-U[mi])/2, 4)})"
+    A chaque itération, les deux groupes A et B les plus proches sont reliés en un noeud K à la hauteur D(A, B) / 2,
+    puis la distance de tout groupe C à K est la moyenne pondérée par la taille des groupes:
+        - D(C, K) = (|A| * D(C, A) + |B| * D(C, B)) / (|A| + |B|)
 
-    del data[annuaire[mi]], data[annuaire[mj]]
+    Les distances sont gardées dans une copie condensée en float32 de la matrice (voir triangulaire),
+    mise à jour sur place: K prend la ligne de A, la ligne de B passe à l'infini. Le minimum est donc
+    directement celui de la matrice condensée.
 
-    val = round(distance.jukes_cantor(cons, list(data.values())[0]), 4)
+    Argument:
+        - noms (list): Noms des génomes.
+        - matrice (np.ndarray): La matrice des distances, N x N ou condensée (voir triangulaire.condenser).
+        - chemin (str): Fichier de la copie de travail projetée en mémoire, None pour la garder en mémoire.
+
+    Return:
+         - arbre (dict): La phylogénie (voir neighbor_joining_arbre).
+    """
+    n = len(noms)
+    condensee = triangulaire.condenser(matrice, chemin)
+    arbre = {'noms': list(noms), 'enfants': [], 'racine': None if n == 0 else 0}
+    noeuds = list(range(n))
+    tailles = np.ones(n)
+    hauteurs = np.zeros(n)
 
-    phylo = f"({list(data.keys())[0]}:{val/2}, {phylo}:{val/2})"
+    for _ in range(n - 1):
+        mi, mj = triangulaire.indices(n, int(np.argmin(condensee)))
 
-    return phylo
+        ligne_i, ligne_j = triangulaire.ligne(condensee, n, mi), triangulaire.ligne(condensee, n, mj)
+        hauteur = ligne_i[mj] / 2
+        arbre['enfants'].append((noeuds[mi], round(hauteur - hauteurs[mi], 4), noeuds[mj], round(hauteur - hauteurs[mj], 4)))
+        noeuds[mi] = arbre['racine'] = n + len(arbre['enfants']) - 1
+
+        nouvelle = (tailles[mi] * ligne_i + tailles[mj] * ligne_j) / (tailles[mi] + tailles[mj])
+        triangulaire.remplacer_ligne(condensee, n, mi, nouvelle)
+        triangulaire.remplacer_ligne(condensee, n, mj, np.full(n, np.inf))
+        tailles[mi] += tailles[mj]
+        hauteurs[mi] = hauteur
+
+    return arbre
+
+
+def upgma_matrice(noms: list, matrice: np.ndarray) -> str:
+    """
+    Fonction de calcul de la phylogénie UPGMA entre N génomes à partir de leur matrice des distances
+    (voir upgma_arbre).
+
+    Argument:
+        - noms (list): Noms des génomes.
+        - matrice (np.ndarray): La matrice des distances, N x N ou condensée.
+
+    Return:
+         - phylo (str): La phylogénie au format NEWICK.
+    """
+    return newick(upgma_arbre(noms, matrice))
 
 
 def upgma(data: dict) -> str:
     """
-    Fonction de calcul de la phylogénie entre 3 coregenomes avec la méthode UPGMA.
-    Calcul en premier temps la matrice des distances.
-    Puis calcul la distance du dernier:
-        - D(C, (A,B)) = D(C, A) * 0.5 + D(C, B) * 0.5
+    Fonction de calcul de la phylogénie entre N coregenomes avec la méthode UPGMA.
+    Calcul en premier temps la matrice des distances de Jukes-Cantor, puis l'arbre (voir upgma_matrice).
 
     Les résultats sont disponibles dans le répertoire UPGMA.
     Ils incluent la matrice des distances et la phylogénie associée
@@ -103,29 +396,10 @@ def upgma(data: dict) -> str:
     Return:
          - phylo (str): La phylogénie au format NEWICK.
     """
-    phylo = ""
-    annuaire = {indice: genome for indice, genome in enumerate(data.keys())}
-    annuaire_inverse = {genome: indice for indice, genome in enumerate(data.keys())}
-    matrice_dist = np.full((len(data), len(data)), 0, float)
-    minimum = 1000000
-    mi, mj = 0, 1
-
-    for i in range(matrice_dist.shape[0]):
-        for j in range(i+1, matrice_dist.shape[1]):
-            matrice_dist[i, j] = distance.jukes_cantor(data[annuaire[i]], data[annuaire[j]])
-            matrice_dist[j, i] = matrice_dist[i, j].copy()
-            if matrice_dist[i, j] < minimum:
-                mi, mj = i, j
-                minimum = matrice_dist[i, j]
-
-    phylo += f"({annuaire[mi]}:{round(matrice_dist[mi, mj] / 2, 4)}, {annuaire[mj]}:{round(matrice_dist[mi, mj] / 2, 4)})"
-    data = list(data.keys())
-    data.remove(annuaire[mi])
-    data.remove(annuaire[mj])
-    val = round((matrice_dist[annuaire_inverse[data[0]], mi] + matrice_dist[annuaire_inverse[data[0]], mj])/2, 4)
-    phylo = f"({data[0]}:{val}, {phylo}:{val})"
+    matrice_dist = distance.matrice_distances(list(data.values()), 'jukes_cantor', condensee=True)
 
-    return phylo
+    return upgma_matrice(list(data.keys()), matrice_dist)
 
 
-neighbor_joining(extraction.caracteres())
+if __name__ == '__main__':
+    print(neighbor_joining(extraction.caracteres()[0]))
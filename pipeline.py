@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+
+import core_genome
+import distance
+import extraction
+import fasta
+import phylogenie
+import triangulaire
+
+
+MANIFESTE = "CoreGenome/pipeline.json"
+CACHE = "CoreGenome/identites.sqlite"
+FENETRE = 10
+
+
+def empreinte_fichier(chemin: str) -> str:
+    """
+    Fonction de calcul de l'empreinte SHA-1 du contenu d'un fichier, lu par blocs.
+
+    Argument:
+        - chemin (str): Le fichier.
+
+    Return:
+        - (str): L'empreinte hexadécimale, None si le fichier n'existe pas.
+    """
+    if not os.path.exists(chemin):
+        return None
+
+    empreinte = hashlib.sha1()
+    with open(chemin, 'rb') as fil:
+        for bloc in iter(lambda: fil.read(1 << 20), b''):
+            empreinte.update(bloc)
+
+    return empreinte.hexdigest()
+
+
+def lire_manifeste() -> dict:
+    """
+    Fonction qui lit le manifeste du pipeline.
+
+    Le manifeste est un dictionnaire:
+        - souches: génomes du CoreGenome, dans l'ordre des colonnes des clusters.
+        - sources: empreinte du fichier cds.fna de chaque génome.
+        - etapes: pour chaque étape terminée, l'empreinte de ses entrées et paramètres et celle de chaque sortie.
+
+    Argument:
+        - None.
+
+    Return:
+        - (dict): Le manifeste, vide si le pipeline n'a jamais tourné.
+    """
+    if not os.path.exists(MANIFESTE):
+        return {'souches': [], 'sources': {}, 'etapes': {}}
+
+    with open(MANIFESTE, 'r') as fil:
+        return json.load(fil)
+
+
+def ecrire_manifeste(manifeste: dict) -> None:
+    """
+    Fonction qui sauvegarde le manifeste du pipeline (écriture atomique).
+
+    Argument:
+        - manifeste (dict): Le manifeste.
+
+    Return:
+        - None.
+    """
+    with open(f"{MANIFESTE}.{os.getpid()}", 'w') as fil:
+        json.dump(manifeste, fil, indent=1)
+    os.replace(f"{MANIFESTE}.{os.getpid()}", MANIFESTE)
+
+
+def a_jour(manifeste: dict, nom: str, empreinte: str) -> bool:
+    """
+    Fonction qui indique si une étape peut être sautée:
+    ses entrées et paramètres n'ont pas changé et ses sorties sont intactes.
+
+    Arguments:
+        - manifeste (dict): Le manifeste.
+        - nom (str): Nom de l'étape.
+        - empreinte (str): Empreinte des entrées et paramètres de l'étape.
+
+    Return:
+        - (bool): Vrai si l'étape est à jour.
+    """
+    etat = manifeste['etapes'].get(nom)
+
+    return (etat is not None and etat['empreinte'] == empreinte
+            and all(empreinte_fichier(chemin) == valeur for chemin, valeur in etat['sorties'].items()))
+
+
+def etape(manifeste: dict, nom: str, entrees: list, parametres: dict, sorties: list, fonction, forcer: bool = False) -> bool:
+    """
+    Fonction qui exécute une étape du pipeline si elle n'est pas à jour, puis note ses sorties dans le manifeste.
+    Les entrées d'une étape étant les sorties de la précédente, toute étape recalculée entraîne les suivantes.
+
+    Arguments:
+        - manifeste (dict): Le manifeste.
+        - nom (str): Nom de l'étape.
+        - entrees (list): Fichiers lus par l'étape.
+        - parametres (dict): Paramètres de l'étape.
+        - sorties (list): Fichiers écrits par l'étape.
+        - fonction (callable): Fonction réalisant l'étape.
+        - forcer (bool): Exécute l'étape même si elle est à jour.
+
+    Return:
+        - (bool): Vrai si l'étape a été exécutée.
+    """
+    contenu = json.dumps([{chemin: empreinte_fichier(chemin) for chemin in entrees}, parametres], sort_keys=True)
+    empreinte = hashlib.sha1(contenu.encode()).hexdigest()
+
+    if not forcer and a_jour(manifeste, nom, empreinte):
+        return False
+
+    fonction()
+
+    manifeste['etapes'][nom] = {'empreinte': empreinte, 'sorties': {chemin: empreinte_fichier(chemin) for chemin in sorties}}
+    ecrire_manifeste(manifeste)
+
+    return True
+
+
+def clustering(manifeste: dict, nb_workers: int = None, forcer: bool = False, mode: str = 'premier') -> list:
+    """
+    Étape de clustering. En mode 'rbh', les clusters sont recalculés sur tous les génomes dès que l'un d'eux
+    change (voir core_genome.orthologues), les %id déjà connus étant lus dans le cache.
+    En mode 'premier' ou 'syntenie' (clusters étendus de proche en proche le long du génome, voir core_genome.syntenie),
+    trois cas:
+        - les génomes et leurs CDS n'ont pas changé: rien n'est refait.
+        - des génomes ont été ajoutés, les autres sont inchangés: seules les CDS des nouveaux génomes sont
+          comparées aux clusters existants (voir core_genome.etendre).
+        - sinon: clustering complet des 3 premiers génomes (voir core_genome.fils), repris là où il s'était arrêté
+          en cas d'interruption, puis extension aux suivants.
+
+    Arguments:
+        - manifeste (dict): Le manifeste.
+        - nb_workers (int): nombre de processus, par défaut le nombre de coeurs.
+        - forcer (bool): Refait le clustering complet.
+        - mode (str): 'premier' (premier hit, voir core_genome.fils), 'syntenie' (premier hit au voisinage
+          du dernier cluster trouvé) ou 'rbh' (meilleurs hits réciproques).
+
+    Return:
+        - noms (list): génomes du CoreGenome, dans l'ordre des colonnes des clusters.
+    """
+    sources = {strain: empreinte_fichier(f"Donnees/{strain}/cds.fna") for strain in fasta.souches()}
+    anciens = manifeste['souches']
+    attendue = hashlib.sha1(json.dumps({strain: sources.get(strain) for strain in anciens}, sort_keys=True).encode()).hexdigest()
+
+    incremental = (not forcer and len(anciens) >= 3 and manifeste.get('mode', 'premier') == mode
+                   and a_jour(manifeste, 'clustering', attendue))
+
+    if incremental and (mode != 'rbh' or list(sources) == anciens):
+        noms = list(anciens)
+    elif mode == 'rbh':
+        noms = list(sources)
+        core_genome.orthologues(nb_workers, CACHE, noms)
+        etat_clusters(manifeste, noms, sources, mode)
+    else:
+        noms = list(sources)[:3]
+        empreinte = hashlib.sha1(json.dumps([sources[strain] for strain in noms] + [mode]).encode()).hexdigest()
+        reprise = f"CoreGenome/reprise_{empreinte[:12]}.jsonl"
+        core_genome.fils(nb_workers, CACHE, noms, reprise, fenetre=FENETRE if mode == 'syntenie' else None)
+        os.remove(reprise)
+        etat_clusters(manifeste, noms, sources, mode)
+
+    for nouveau in [strain for strain in sources if strain not in noms]:
+        core_genome.etendre(noms, nouveau, nb_workers, CACHE)
+        noms.append(nouveau)
+        etat_clusters(manifeste, noms, sources, mode)
+
+    return noms
+
+
+def etat_clusters(manifeste: dict, noms: list, sources: dict, mode: str = 'premier') -> None:
+    """
+    Fonction qui note dans le manifeste les clusters qui viennent d'être écrits (point de reprise).
+
+    Arguments:
+        - manifeste (dict): Le manifeste.
+        - noms (list): génomes des clusters, dans l'ordre des colonnes.
+        - sources (dict): empreinte du fichier cds.fna de chaque génome.
+        - mode (str): mode de clustering.
+
+    Return:
+        - None.
+    """
+    sorties = ["CoreGenome/core_genome_clusters.txt"] + [f"CoreGenome/core_genome_{nom}.txt" for nom in noms]
+
+    manifeste['souches'] = list(noms)
+    manifeste['mode'] = mode
+    manifeste['sources'] = {strain: sources[strain] for strain in noms}
+    manifeste['etapes']['clustering'] = {
+        'empreinte': hashlib.sha1(json.dumps(manifeste['sources'], sort_keys=True).encode()).hexdigest(),
+        'sorties': {chemin: empreinte_fichier(chemin) for chemin in sorties},
+    }
+    ecrire_manifeste(manifeste)
+
+
+def phylogenies(metrique: str = 'hamming') -> None:
+    """
+    Fonction qui calcule les phylogénies NJ et UPGMA des caractères informatifs.
+    La matrice des distances ({metrique}.phy, format PHYLIP) et l'arbre ({metrique}.nwk, format NEWICK)
+    sont écrits au fil du calcul dans les répertoires Neighbor Joining et UPGMA: seule la matrice condensée
+    est gardée en mémoire (voir triangulaire).
+    Les fichiers {metrique}.txt (matrice numpy puis arbre) des versions précédentes ne sont plus écrits.
+
+    Argument:
+        - metrique (str): Distance utilisée (voir distance.matrice_distances).
+
+    Return:
+        - None.
+    """
+    carac = extraction.core_genome('CoreGenome/caracteres.txt')
+    noms = list(carac.keys())
+    matrice_dist = distance.matrice_distances(list(carac.values()), metrique, condensee=True)
+
+    arbres = {
+        'Neighbor Joining': phylogenie.neighbor_joining_arbre(noms, matrice_dist),
+        'UPGMA': phylogenie.upgma_arbre(noms, matrice_dist),
+    }
+    for dossier, arbre in arbres.items():
+        os.makedirs(dossier, exist_ok=True)
+        with open(f"{dossier}/{metrique}.phy", 'w') as fil:
+            triangulaire.ecrire(fil, matrice_dist, noms)
+        with open(f"{dossier}/{metrique}.nwk", 'w') as fil:
+            phylogenie.ecrire_newick(fil, arbre)
+            fil.write(";\n")
+
+
+def executer(nb_workers: int = None, metrique: str = 'hamming', forcer: bool = False, mode: str = 'premier') -> None:
+    """
+    Fonction qui enchaîne les étapes du CoreGenome:
+        - clustering (core_genome.fils et core_genome.etendre, ou core_genome.orthologues)
+        - mise en forme (core_genome.mise_en_forme)
+        - alignement (core_genome.alignement)
+        - caractères informatifs (extraction.caracteres)
+        - phylogénies (phylogenies)
+
+    Chaque étape note l'empreinte de ses entrées, de ses paramètres et de ses sorties dans CoreGenome/pipeline.json.
+    Une étape dont rien n'a changé est sautée: relancer le pipeline après une interruption
+    reprend à la première étape inachevée.
+
+    Argument:
+        - nb_workers (int): nombre de processus, par défaut le nombre de coeurs.
+        - metrique (str): Distance utilisée pour les phylogénies.
+        - forcer (bool): Refait toutes les étapes.
+        - mode (str): mode de clustering, 'premier', 'syntenie' ou 'rbh' (voir clustering).
+
+    Return:
+        - None.
+    """
+    os.makedirs("CoreGenome", exist_ok=True)
+    manifeste = lire_manifeste()
+
+    noms = clustering(manifeste, nb_workers, forcer, mode)
+    fichiers = [f"CoreGenome/core_genome_{nom}.txt" for nom in noms]
+
+    etape(manifeste, 'mise_en_forme', fichiers, {'souches': noms}, ["CoreGenome/core_genome.txt"],
+          lambda: core_genome.mise_en_forme(*noms), forcer)
+    etape(manifeste, 'alignement', ["CoreGenome/core_genome_clusters.txt", "CoreGenome/core_genome.txt"], {},
+          ["CoreGenome/core_genome_alignement.txt"], lambda: core_genome.alignement(nb_workers=nb_workers), forcer)
+    etape(manifeste, 'caracteres', ["CoreGenome/core_genome_alignement.txt"], {}, ["CoreGenome/caracteres.txt"],
+          extraction.caracteres, forcer)
+    etape(manifeste, 'phylogenie', ["CoreGenome/caracteres.txt"], {'metrique': metrique},
+          [f"{dossier}/{metrique}.{extension}" for dossier in ('Neighbor Joining', 'UPGMA') for extension in ('phy', 'nwk')],
+          lambda: phylogenies(metrique), forcer)
+
+
+if __name__ == '__main__':
+    executer()
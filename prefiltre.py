@@ -0,0 +1,370 @@
+import numpy as np
+
+
+TABLE_NUCLEOTIDES = np.full(256, 4, np.uint8)
+TABLE_NUCLEOTIDES[np.frombuffer(b"ACGTacgt", np.uint8)] = [0, 1, 2, 3, 0, 1, 2, 3]
+
+# Alphabet réduit à 10 classes d'acides aminés (Murphy et al., 2000)
+CLASSES_ACIDES_AMINES = ["LVIM", "C", "A", "G", "ST", "P", "FYW", "EDNQ", "KR", "H"]
+TABLE_ACIDES_AMINES = np.full(256, 10, np.uint8)
+TABLE_ACIDES_AMINES[np.frombuffer("".join(CLASSES_ACIDES_AMINES).encode(), np.uint8)] = np.repeat(
+    np.arange(len(CLASSES_ACIDES_AMINES)), [len(acides) for acides in CLASSES_ACIDES_AMINES])
+TABLE_ACIDES_AMINES[np.frombuffer("".join(CLASSES_ACIDES_AMINES).lower().encode(), np.uint8)] = np.repeat(
+    np.arange(len(CLASSES_ACIDES_AMINES)), [len(acides) for acides in CLASSES_ACIDES_AMINES])
+
+# alphabet: (table d'encodage, bits par caractère, code des caractères à écarter)
+ALPHABETS = {
+    'nucleotides': (TABLE_NUCLEOTIDES, 2, 4),
+    'proteines': (TABLE_ACIDES_AMINES, 4, 10),
+}
+
+
+def encodage(sequence: str, alphabet: str = 'nucleotides') -> np.ndarray:
+    """
+    Fonction qui encode une séquence en tableau d'entiers.
+        - nucleotides: A, C, G et T valent respectivement 0, 1, 2 et 3, tout autre caractère vaut 4.
+        - proteines: chaque acide aminé vaut l'indice de sa classe (voir CLASSES_ACIDES_AMINES),
+          tout autre caractère vaut 10.
+
+    Arguments:
+        - sequence (str): La séquence à encoder.
+        - alphabet (str): 'nucleotides' ou 'proteines'.
+
+    Return:
+        - (np.ndarray): La séquence encodée (uint8).
+    """
+    return ALPHABETS[alphabet][0][np.frombuffer(sequence.encode('ascii'), np.uint8)]
+
+
+def kmers_positions(codes: np.ndarray, k: int, bits: int = 2, invalide: int = 4) -> tuple:
+    """
+    Fonction qui calcule le code entier de chaque kmer d'une séquence encodée, avec sa position.
+    Les fenêtres contenant un caractère invalide sont écartées.
+
+    Arguments:
+        - codes (np.ndarray): La séquence encodée.
+        - k (int): Taille des mers considérés.
+        - bits (int): Nombre de bits par caractère.
+        - invalide (int): Code des caractères à écarter.
+
+    Return:
+        - (tuple): Les codes (uint64) des kmers valides et leurs positions de départ, dans l'ordre de la séquence.
+    """
+    nb_fenetres = len(codes) - k + 1
+    if nb_fenetres <= 0:
+        return np.empty(0, np.uint64), np.empty(0, np.int64)
+
+    mers = np.zeros(nb_fenetres, np.uint64)
+    for i in range(k):
+        mers <<= np.uint64(bits)
+        mers |= codes[i:i + nb_fenetres].astype(np.uint64)
+
+    invalides = np.concatenate(([0], np.cumsum(codes == invalide)))
+    positions = np.flatnonzero(invalides[k:] == invalides[:nb_fenetres])
+
+    return mers[positions], positions
+
+
+def codes_kmers(codes: np.ndarray, k: int, bits: int = 2, invalide: int = 4) -> np.ndarray:
+    """
+    Fonction qui calcule le code entier de chaque kmer d'une séquence encodée.
+    Les fenêtres contenant un caractère invalide sont écartées.
+
+    Arguments:
+        - codes (np.ndarray): La séquence encodée.
+        - k (int): Taille des mers considérés.
+        - bits (int): Nombre de bits par caractère.
+        - invalide (int): Code des caractères à écarter.
+
+    Return:
+        - (np.ndarray): Les codes (uint64) des kmers valides, dans l'ordre de la séquence.
+    """
+    return kmers_positions(codes, k, bits, invalide)[0]
+
+
+def longueurs_compatibles(longueur1, longueur2, seuil: float = 94):
+    """
+    Fonction qui indique si deux longueurs permettent d'atteindre le %id demandé.
+    Le %id étant calculé sur la plus grande des deux séquences, il faut:
+        - min(l1, l2) / max(l1, l2) > seuil / 100
+
+    Arguments:
+        - longueur1 (int | np.ndarray): Longueur(s) de la première séquence.
+        - longueur2 (int | np.ndarray): Longueur(s) de la deuxième séquence.
+        - seuil (float): Le %id à dépasser.
+
+    Return:
+        - (bool | np.ndarray): Vrai si le seuil reste atteignable.
+    """
+    return np.minimum(longueur1, longueur2) * 100 > seuil * np.maximum(longueur1, longueur2)
+
+
+def seuil_kmers(longueur1, longueur2, fenetres1: int, k: int, seuil: float = 94):
+    """
+    Fonction de calcul du nombre minimal de kmers de la séquence 1 retrouvés dans la séquence 2
+    si les deux séquences dépassent le %id demandé (lemme des q-grammes).
+
+    Avec L le nombre d'identités minimal, u1 = l1 - L et u2 = l2 - L:
+        - chaque nucléotide non apparié de la séquence 1 détruit au plus k kmers
+        - chaque nucléotide non apparié de la séquence 2 détruit au plus k-1 kmers
+
+    Arguments:
+        - longueur1 (int): Longueur de la séquence 1.
+        - longueur2 (int | np.ndarray): Longueur(s) de la séquence 2.
+        - fenetres1 (int): Nombre de kmers valides de la séquence 1.
+        - k (int): Taille des mers considérés.
+        - seuil (float): Le %id à dépasser.
+
+    Return:
+        - (int | np.ndarray): Le nombre minimal de kmers partagés.
+    """
+    identites = np.floor(seuil * np.maximum(longueur1, longueur2) / 100).astype(np.int64) + 1
+    u1 = longueur1 - identites
+    u2 = longueur2 - identites
+
+    return fenetres1 - k * u1 - (k - 1) * u2
+
+
+def seuil_proteique(seuil: float = 94) -> float:
+    """
+    Fonction qui convertit un %id nucléique en %id protéique correspondant.
+    Un nucléotide différent modifie au plus un codon, donc au plus un acide aminé:
+        - %id protéique > 100 - 3 * (100 - %id nucléique)
+
+    Cette borne suppose des CDS en phase: une insertion ou une délétion décalant le cadre de lecture
+    modifie toute la suite de la protéine. Le filtre protéique n'est donc pas sans perte.
+
+    Argument:
+        - seuil (float): Le %id nucléique.
+
+    Return:
+        - (float): Le %id protéique.
+    """
+    return 100 - 3 * (100 - seuil)
+
+
+def fenetre(longueur: int, index: dict, seuil: float = 94) -> tuple:
+    """
+    Fonction qui renvoie la fenêtre des longueurs compatibles avec la requête dans les longueurs triées de l'index.
+    Les séquences compatibles (voir longueurs_compatibles) ont une longueur l2 telle que:
+        - seuil * l / 100 < l2 < 100 * l / seuil
+    elles sont donc contiguës une fois triées par longueur: deux recherches dichotomiques suffisent.
+
+    Arguments:
+        - longueur (int): Longueur de la requête.
+        - index (dict): L'index inversé.
+        - seuil (float): Le %id à dépasser.
+
+    Return:
+        - (tuple): Les bornes (debut, fin) de la fenêtre dans index['ordre'].
+    """
+    triees = index['longueurs_triees']
+    debut = max(0, int(np.searchsorted(triees, seuil * longueur / 100, 'right')) - 1)
+    fin = min(len(triees), int(np.searchsorted(triees, 100 * longueur / seuil if seuil else np.inf, 'left')) + 1)
+
+    # Les bornes flottantes sont élargies d'une case puis vérifiées exactement
+    while debut < fin and not longueurs_compatibles(longueur, triees[debut], seuil):
+        debut += 1
+    while fin > debut and not longueurs_compatibles(longueur, triees[fin - 1], seuil):
+        fin -= 1
+
+    return debut, fin
+
+
+def hors_fenetre(longueur: int, index: dict, seuil: float = 94) -> int:
+    """
+    Fonction qui compte les séquences de l'index écartées par leur seule longueur, sans jamais être examinées.
+
+    Arguments:
+        - longueur (int): Longueur de la requête.
+        - index (dict): L'index inversé.
+        - seuil (float): Le %id à dépasser.
+
+    Return:
+        - (int): Nombre de séquences hors de la fenêtre des longueurs compatibles.
+    """
+    debut, fin = fenetre(longueur, index, seuil)
+    return len(index['longueurs']) - (fin - debut)
+
+
+def index_kmers(sequences: list, k: int = 8, alphabet: str = 'nucleotides') -> dict:
+    """
+    Fonction qui construit un index inversé des kmers d'un ensemble de séquences.
+
+    Chaque occurrence (kmer, séquence) est codée par une clé: numéro du kmer dans 'codes' * nombre de séquences
+    + rang de la séquence dans l'ordre des longueurs. Une fois les clés triées, les séquences possédant un même kmer
+    sont contiguës et rangées par longueur: la fenêtre des longueurs compatibles s'y retrouve par dichotomie.
+
+    L'index est un dictionnaire:
+        - k: Taille des mers.
+        - alphabet: 'nucleotides' ou 'proteines' (voir encodage).
+        - codes: codes distincts des kmers, triés.
+        - cles: clés triées des occurrences (kmer, séquence).
+        - ensembles: pour chaque séquence, les codes distincts de ses kmers, triés.
+        - longueurs: longueur de chaque séquence.
+        - ordre: indices des séquences triées par longueur.
+        - rangs: rang de chaque séquence dans cet ordre.
+        - longueurs_triees: longueurs dans cet ordre.
+
+    Arguments:
+        - sequences (list): Les séquences à indexer.
+        - k (int): Taille des mers considérés.
+        - alphabet (str): 'nucleotides' ou 'proteines'.
+
+    Return:
+        - index (dict): L'index inversé.
+    """
+    _, bits, invalide = ALPHABETS[alphabet]
+    codes, cibles = [], []
+    for indice, sequence in enumerate(sequences):
+        mers = np.unique(codes_kmers(encodage(sequence, alphabet), k, bits, invalide))
+        codes.append(mers)
+        cibles.append(np.full(len(mers), indice, np.int64))
+
+    ensembles = codes
+    codes = np.concatenate(codes) if codes else np.empty(0, np.uint64)
+    cibles = np.concatenate(cibles) if cibles else np.empty(0, np.int64)
+
+    longueurs = np.array([len(sequence) for sequence in sequences], np.int64)
+    ordre_longueurs = np.argsort(longueurs, kind='stable')
+    rangs = np.empty(len(sequences), np.int64)
+    rangs[ordre_longueurs] = np.arange(len(sequences))
+
+    codes, numeros = np.unique(codes, return_inverse=True)
+    cles = np.sort(numeros.astype(np.int64) * len(sequences) + rangs[cibles])
+
+    return {
+        'k': k,
+        'alphabet': alphabet,
+        'codes': codes,
+        'cles': cles,
+        'ensembles': ensembles,
+        'longueurs': longueurs,
+        'ordre': ordre_longueurs,
+        'rangs': rangs,
+        'longueurs_triees': longueurs[ordre_longueurs],
+    }
+
+
+def numeros_kmers(mers: np.ndarray, index: dict) -> np.ndarray:
+    """
+    Fonction qui renvoie le numéro dans l'index (position dans index['codes']) des kmers de la requête présents
+    dans l'index. Les kmers absents de toutes les séquences indexées sont écartés.
+
+    Arguments:
+        - mers (np.ndarray): Codes des kmers de la requête.
+        - index (dict): L'index inversé.
+
+    Return:
+        - (np.ndarray): Les numéros des kmers présents.
+    """
+    numeros = np.searchsorted(index['codes'], mers)
+    presents = numeros < len(index['codes'])
+    presents[presents] = index['codes'][numeros[presents]] == mers[presents]
+
+    return numeros[presents].astype(np.int64)
+
+
+def kmers_partages(mers: np.ndarray, index: dict, debut: int = 0, fin: int = None) -> np.ndarray:
+    """
+    Fonction qui compte, pour chaque séquence de rangs debut à fin dans l'ordre des longueurs,
+    le nombre de kmers de la requête qu'elle contient. Un kmer présent plusieurs fois dans la requête est compté
+    autant de fois.
+
+    Pour chaque kmer, seules les occurrences de la fenêtre sont lues: deux dichotomies dans les clés
+    (voir index_kmers) les délimitent, le reste de l'index n'est jamais parcouru.
+
+    Arguments:
+        - mers (np.ndarray): Codes des kmers de la requête.
+        - index (dict): L'index inversé.
+        - debut (int): Rang de la première séquence.
+        - fin (int): Rang suivant la dernière séquence, None pour aller jusqu'à la plus longue.
+
+    Return:
+        - (np.ndarray): Nombre de kmers partagés par séquence de la fenêtre, dans l'ordre des longueurs.
+    """
+    nombre = len(index['longueurs'])
+    fin = nombre if fin is None else fin
+    bases = numeros_kmers(mers, index) * nombre
+
+    gauche = np.searchsorted(index['cles'], bases + debut, 'left')
+    droite = np.searchsorted(index['cles'], bases + fin, 'left')
+    tailles = droite - gauche
+    total = int(tailles.sum())
+
+    if total == 0:
+        return np.zeros(fin - debut, np.int64)
+
+    decalage = np.repeat(gauche - np.cumsum(tailles) + tailles, tailles)
+    positions = decalage + np.arange(total)
+
+    return np.bincount(index['cles'][positions] - np.repeat(bases, tailles) - debut, minlength=fin - debut)
+
+
+def kmers_presents(mers: np.ndarray, index: dict, indices: np.ndarray) -> np.ndarray:
+    """
+    Fonction qui compte, pour quelques séquences de l'index seulement, le nombre de kmers de la requête
+    qu'elles contiennent. Les kmers de la requête sont cherchés dans l'ensemble trié de chaque séquence
+    (voir index_kmers): le coût dépend du nombre de séquences examinées, pas de la taille de l'index.
+    Un kmer présent plusieurs fois dans la requête est compté autant de fois.
+
+    Arguments:
+        - mers (np.ndarray): Codes des kmers de la requête.
+        - index (dict): L'index inversé.
+        - indices (np.ndarray): Indices des séquences à examiner.
+
+    Return:
+        - (np.ndarray): Nombre de kmers partagés par séquence, dans l'ordre de 'indices'.
+    """
+    partages = np.zeros(len(indices), np.int64)
+    for x, indice in enumerate(indices.tolist()):
+        ensemble = index['ensembles'][indice]
+        if len(ensemble) and len(mers):
+            positions = np.minimum(np.searchsorted(ensemble, mers), len(ensemble) - 1)
+            partages[x] = np.count_nonzero(ensemble[positions] == mers)
+
+    return partages
+
+
+def candidats(sequence: str, index: dict, seuil: float = 94, parmi: np.ndarray = None) -> np.ndarray:
+    """
+    Fonction qui sélectionne les séquences de l'index pouvant dépasser le %id demandé avec la requête.
+    Une séquence est retenue si:
+        - les longueurs sont compatibles avec le seuil: seule la fenêtre des longueurs compatibles est parcourue
+          (voir fenetre)
+        - elle partage assez de kmers avec la requête
+
+    Aucun couple écarté ne peut dépasser le seuil: le filtre ne perd aucun homologue.
+    Si les séquences à examiner sont données, les kmers ne sont comptés que pour elles (voir kmers_presents).
+
+    Arguments:
+        - sequence (str): La séquence requête.
+        - index (dict): L'index inversé.
+        - seuil (float): Le %id à dépasser.
+        - parmi (np.ndarray): Indices des seules séquences à examiner, None pour tout l'index.
+
+    Return:
+        - (np.ndarray): Indices croissants des séquences candidates (dans l'ordre de 'parmi' s'il est donné).
+    """
+    longueur = len(sequence)
+    if parmi is None:
+        debut, fin = fenetre(longueur, index, seuil)
+        compatibles = index['ordre'][debut:fin]
+    else:
+        parmi = np.asarray(parmi, np.int64)
+        compatibles = parmi[longueurs_compatibles(longueur, index['longueurs'][parmi], seuil)]
+    if len(compatibles) == 0:
+        return np.empty(0, np.int64)
+
+    _, bits, invalide = ALPHABETS[index['alphabet']]
+    mers = codes_kmers(encodage(sequence, index['alphabet']), index['k'], bits, invalide)
+    minimum = seuil_kmers(longueur, index['longueurs'][compatibles], len(mers), index['k'], seuil)
+    retenus = minimum <= 0
+
+    if not retenus.all():
+        if parmi is None:
+            retenus |= kmers_partages(mers, index, debut, fin) >= minimum
+        else:
+            retenus |= kmers_presents(mers, index, compatibles) >= minimum
+
+    return np.sort(compatibles[retenus]) if parmi is None else compatibles[retenus]
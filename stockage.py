@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+
+import fasta
+import prefiltre
+
+
+FORMAT = 2
+NUCLEOTIDES = np.frombuffer(b"ACGT", np.uint8)
+INDEX = np.dtype([('souche', np.int32), ('debut', np.int64), ('longueur', np.int64)])
+EXCEPTIONS = np.dtype([('position', np.int64), ('caractere', np.uint8)])
+
+
+def sources(repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui relève la taille et la date de modification des fichiers cds.fna de chaque génome.
+    Sert à savoir si le stockage est encore à jour.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - (dict): structure Nom du génome:[taille, date].
+    """
+    etat = {}
+    for strain in fasta.souches(repertoire):
+        infos = os.stat(f"{repertoire}/{strain}/cds.fna")
+        etat[strain] = [infos.st_size, infos.st_mtime_ns]
+
+    return etat
+
+
+def convertir(repertoire: str = 'Donnees') -> None:
+    """
+    Fonction qui convertit une fois pour toutes les CDS FASTA d'un répertoire en stockage binaire.
+    Le stockage est écrit dans le dossier caché '.stockage' du répertoire:
+        - nucleotides.npy: les CDS mises bout à bout, 4 nucléotides par octet (2 bits: A=0, C=1, G=2, T=3).
+        - index.npy: pour chaque CDS, l'indice du génome, la position de départ et la longueur (en nucléotides).
+        - exceptions.npy: position et caractère des nucléotides autres que A, C, G, T (minuscules comprises).
+        - metadonnees.json: version du format, génomes, fichiers sources, locus_tag, protein_id et location de chaque CDS.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - None.
+    """
+    dossier = f"{repertoire}/.stockage"
+    os.makedirs(dossier, exist_ok=True)
+
+    noms = fasta.souches(repertoire)
+    metadonnees = {'format': FORMAT, 'souches': noms, 'sources': sources(repertoire), 'locus_tag': [], 'protein_id': [], 'location': []}
+    codes, index, exceptions = [], [], []
+    position = 0
+
+    for indice, strain in enumerate(noms):
+        for enregistrement in fasta.lecture_fasta(f"{repertoire}/{strain}/cds.fna"):
+            brut = np.frombuffer(bytes(enregistrement['bloc']).translate(None, b'\r\n'), np.uint8)
+            code = prefiltre.TABLE_NUCLEOTIDES[brut]
+            autres = np.flatnonzero((code == 4) | (brut >= ord('a')))
+            if len(autres):
+                exceptions.append(np.rec.fromarrays([autres + position, brut[autres]], dtype=EXCEPTIONS))
+                code = np.where(code == 4, 0, code).astype(np.uint8)
+
+            codes.append(code)
+            index.append((indice, position, len(code)))
+            position += len(code)
+            for champ in ('locus_tag', 'protein_id', 'location'):
+                metadonnees[champ].append(enregistrement['metadonnees'].get(champ))
+
+    codes = np.concatenate(codes) if codes else np.empty(0, np.uint8)
+    codes = np.concatenate([codes, np.zeros(-len(codes) % 4, np.uint8)]).reshape(-1, 4)
+    paquets = (codes[:, 0] << 6) | (codes[:, 1] << 4) | (codes[:, 2] << 2) | codes[:, 3]
+
+    np.save(f"{dossier}/nucleotides.npy", paquets.astype(np.uint8))
+    np.save(f"{dossier}/index.npy", np.array(index, INDEX))
+    np.save(f"{dossier}/exceptions.npy", np.concatenate(exceptions) if exceptions else np.empty(0, EXCEPTIONS))
+    with open(f"{dossier}/metadonnees.json", 'w') as fil:
+        json.dump(metadonnees, fil)
+
+
+def ouvrir(repertoire: str = 'Donnees') -> dict:
+    """
+    Fonction qui ouvre le stockage binaire d'un répertoire, en le (re)construisant s'il est absent, périmé
+    ou d'une version antérieure du format.
+    Les tableaux sont projetés en mémoire: rien n'est lu tant qu'une CDS n'est pas demandée.
+
+    Le stockage est un dictionnaire:
+        - nucleotides, index, exceptions: tableaux projetés en mémoire (voir convertir).
+        - souches, locus_tag, protein_id, location: métadonnées.
+
+    Argument:
+        - repertoire (str): Répertoire des données.
+
+    Return:
+        - stock (dict): Le stockage.
+    """
+    dossier = f"{repertoire}/.stockage"
+    chemin = f"{dossier}/metadonnees.json"
+
+    metadonnees = None
+    if os.path.exists(chemin):
+        with open(chemin, 'r') as fil:
+            metadonnees = json.load(fil)
+
+    if metadonnees is None or metadonnees.get('format') != FORMAT or metadonnees['sources'] != sources(repertoire):
+        convertir(repertoire)
+        with open(chemin, 'r') as fil:
+            metadonnees = json.load(fil)
+
+    stock = {nom: np.load(f"{dossier}/{nom}.npy", mmap_mode='r') for nom in ('nucleotides', 'index', 'exceptions')}
+    stock.update({cle: valeur for cle, valeur in metadonnees.items() if cle not in ('sources', 'format')})
+
+    return stock
+
+
+def indices(stock: dict, strain: str) -> np.ndarray:
+    """
+    Fonction qui renvoie les indices des CDS d'un génome dans le stockage.
+
+    Arguments:
+        - stock (dict): Le stockage.
+        - strain (str): Nom du génome.
+
+    Return:
+        - (np.ndarray): Les indices des CDS, dans l'ordre du fichier FASTA.
+    """
+    return np.flatnonzero(stock['index']['souche'] == stock['souches'].index(strain))
+
+
+def lire(stock: dict, indice: int) -> str:
+    """
+    Fonction qui décode une CDS du stockage, sans lire les autres.
+
+    Arguments:
+        - stock (dict): Le stockage.
+        - indice (int): Indice de la CDS.
+
+    Return:
+        - (str): La CDS.
+    """
+    debut, longueur = int(stock['index']['debut'][indice]), int(stock['index']['longueur'][indice])
+    paquets = np.asarray(stock['nucleotides'][debut // 4:(debut + longueur + 3) // 4])
+
+    codes = np.stack([paquets >> 6, (paquets >> 4) & 3, (paquets >> 2) & 3, paquets & 3], axis=1).ravel()
+    nucleotides = NUCLEOTIDES[codes[debut % 4:debut % 4 + longueur]]
+
+    exceptions = stock['exceptions']
+    if len(exceptions):
+        gauche, droite = np.searchsorted(exceptions['position'], [debut, debut + longueur])
+        nucleotides[exceptions['position'][gauche:droite] - debut] = exceptions['caractere'][gauche:droite]
+
+    return nucleotides.tobytes().decode()
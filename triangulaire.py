@@ -0,0 +1,210 @@
+import numpy as np
+
+
+def taille(n: int) -> int:
+    """
+    Fonction qui renvoie le nombre de valeurs du triangle supérieur (diagonale exclue) d'une matrice N x N.
+
+    Argument:
+        - n (int): Dimension de la matrice.
+
+    Return:
+        - (int): n * (n - 1) / 2.
+    """
+    return n * (n - 1) // 2
+
+
+def position(n: int, i, j):
+    """
+    Fonction qui renvoie la position de la case (i, j), i < j, dans la matrice condensée.
+    Les lignes du triangle supérieur sont mises bout à bout: la ligne i commence à i * n - i * (i + 1) / 2.
+
+    Arguments:
+        - n (int): Dimension de la matrice.
+        - i (int | np.ndarray): Ligne(s).
+        - j (int | np.ndarray): Colonne(s), supérieures à i.
+
+    Return:
+        - (int | np.ndarray): La ou les positions.
+    """
+    return i * n - i * (i + 1) // 2 + j - i - 1
+
+
+def indices(n: int, p: int) -> tuple:
+    """
+    Fonction qui renvoie la case (i, j), i < j, correspondant à une position de la matrice condensée.
+
+    Arguments:
+        - n (int): Dimension de la matrice.
+        - p (int): La position.
+
+    Return:
+        - (tuple): Les indices (i, j).
+    """
+    debuts = position(n, np.arange(n), np.arange(n) + 1)
+    i = int(np.searchsorted(debuts, p, 'right')) - 1
+
+    return i, p - int(debuts[i]) + i + 1
+
+
+def creer(n: int, chemin: str = None) -> np.ndarray:
+    """
+    Fonction qui crée une matrice condensée de distances nulles, en float32: la moitié de la mémoire
+    d'une matrice N x N pour une précision de 7 chiffres significatifs.
+    Si un chemin est donné, la matrice est un fichier .npy projeté en mémoire: seules les pages utilisées
+    sont chargées.
+
+    Arguments:
+        - n (int): Dimension de la matrice.
+        - chemin (str): Fichier de la matrice, None pour la garder en mémoire.
+
+    Return:
+        - (np.ndarray): La matrice condensée.
+    """
+    if chemin is None:
+        return np.zeros(taille(n), np.float32)
+
+    return np.lib.format.open_memmap(chemin, 'w+', np.float32, (taille(n),))
+
+
+def ecrire_bloc(condensee: np.ndarray, n: int, debut: int, bloc: np.ndarray) -> None:
+    """
+    Fonction qui recopie dans la matrice condensée le triangle supérieur d'un bloc de lignes complètes.
+
+    Arguments:
+        - condensee (np.ndarray): La matrice condensée.
+        - n (int): Dimension de la matrice.
+        - debut (int): Première ligne du bloc.
+        - bloc (np.ndarray): Les lignes debut à debut + len(bloc) de la matrice N x N.
+
+    Return:
+        - None.
+    """
+    for i, valeurs in enumerate(bloc, debut):
+        condensee[position(n, i, i + 1):position(n, i, n)] = valeurs[i + 1:]
+
+
+def condenser(matrice: np.ndarray, chemin: str = None) -> np.ndarray:
+    """
+    Fonction qui convertit une matrice N x N symétrique, ou recopie une matrice déjà condensée.
+
+    Arguments:
+        - matrice (np.ndarray): La matrice N x N, ou condensée.
+        - chemin (str): Fichier de la copie (voir creer), None pour la garder en mémoire.
+
+    Return:
+        - (np.ndarray): La matrice condensée.
+    """
+    matrice = np.asarray(matrice)
+    if matrice.ndim == 1:
+        n = int(round((1 + np.sqrt(1 + 8 * len(matrice))) / 2))
+        condensee = creer(n, chemin)
+        condensee[:] = matrice
+        return condensee
+
+    condensee = creer(len(matrice), chemin)
+    ecrire_bloc(condensee, len(matrice), 0, matrice)
+
+    return condensee
+
+
+def ligne(condensee: np.ndarray, n: int, i: int) -> np.ndarray:
+    """
+    Fonction qui renvoie la ligne i de la matrice N x N (diagonale nulle).
+
+    Arguments:
+        - condensee (np.ndarray): La matrice condensée.
+        - n (int): Dimension de la matrice.
+        - i (int): La ligne.
+
+    Return:
+        - (np.ndarray): Les n distances (float).
+    """
+    valeurs = np.zeros(n)
+    valeurs[:i] = condensee[position(n, np.arange(i), i)]
+    valeurs[i + 1:] = condensee[position(n, i, i + 1):position(n, i, n)]
+
+    return valeurs
+
+
+def remplacer_ligne(condensee: np.ndarray, n: int, i: int, valeurs: np.ndarray) -> None:
+    """
+    Fonction qui remplace la ligne (et donc la colonne) i de la matrice, la diagonale étant ignorée.
+
+    Arguments:
+        - condensee (np.ndarray): La matrice condensée.
+        - n (int): Dimension de la matrice.
+        - i (int): La ligne.
+        - valeurs (np.ndarray): Les n nouvelles distances.
+
+    Return:
+        - None.
+    """
+    condensee[position(n, np.arange(i), i)] = valeurs[:i]
+    condensee[position(n, i, i + 1):position(n, i, n)] = valeurs[i + 1:]
+
+
+def sommes(condensee: np.ndarray, n: int) -> np.ndarray:
+    """
+    Fonction de calcul de la somme de chaque ligne de la matrice, en un seul parcours de la matrice condensée.
+
+    Arguments:
+        - condensee (np.ndarray): La matrice condensée.
+        - n (int): Dimension de la matrice.
+
+    Return:
+        - (np.ndarray): Les n sommes (float).
+    """
+    total = np.zeros(n)
+    for i in range(n - 1):
+        valeurs = np.asarray(condensee[position(n, i, i + 1):position(n, i, n)], float)
+        total[i] += valeurs.sum()
+        total[i + 1:] += valeurs
+
+    return total
+
+
+def blocs(n: int, taille_bloc: int = 1 << 18):
+    """
+    Générateur qui découpe la matrice condensée en blocs de lignes entières d'environ taille_bloc valeurs,
+    avec la ligne et la colonne de chaque valeur: les calculs sur toute la matrice restent vectorisés
+    sans jamais construire de tableau N x N.
+
+    Arguments:
+        - n (int): Dimension de la matrice.
+        - taille_bloc (int): Nombre de valeurs visé par bloc.
+
+    Yield:
+        - (tuple): Les positions (debut, fin) du bloc, puis les lignes et colonnes de ses valeurs (np.ndarray).
+    """
+    debuts = position(n, np.arange(n), np.arange(n) + 1)
+    i = 0
+    while i < n - 1:
+        fin_ligne = min(max(int(np.searchsorted(debuts, debuts[i] + taille_bloc, 'left')), i + 1), n - 1)
+
+        rangs = np.arange(i, fin_ligne)
+        debut, fin = int(debuts[i]), int(debuts[fin_ligne - 1]) + n - fin_ligne
+        lignes = np.repeat(rangs, n - 1 - rangs)
+        colonnes = np.arange(fin - debut) - np.repeat(debuts[i:fin_ligne] - debut - rangs - 1, n - 1 - rangs)
+
+        yield debut, fin, lignes, colonnes
+        i = fin_ligne
+
+
+def ecrire(fil, condensee: np.ndarray, noms: list) -> None:
+    """
+    Fonction qui écrit la matrice au format PHYLIP (nombre de génomes, puis une ligne par génome),
+    ligne par ligne: la matrice N x N n'est jamais construite.
+
+    Arguments:
+        - fil: Fichier ouvert en écriture.
+        - condensee (np.ndarray): La matrice condensée.
+        - noms (list): Noms des génomes.
+
+    Return:
+        - None.
+    """
+    fil.write(f"{len(noms)}\n")
+    for i, nom in enumerate(noms):
+        valeurs = "\t".join(f"{valeur:.6g}" for valeur in ligne(condensee, len(noms), i))
+        fil.write(f"{nom}\t{valeurs}\n")